@@ -0,0 +1,123 @@
+import base64
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from cryptography.fernet import Fernet
+
+from config.config import get_db_connection, get_db_cursor, release_db_connection, settings
+
+_ciphers: Dict[bytes, Fernet] = {}
+_ciphers_lock = threading.Lock()
+
+
+def get_cipher(encryption_key: Optional[bytes] = None) -> Fernet:
+    """The process-wide Fernet instance for a key (ENCRYPTION_KEY by default)"""
+    key = encryption_key or os.getenv("ENCRYPTION_KEY").encode()
+    with _ciphers_lock:
+        cipher = _ciphers.get(key)
+        if cipher is None:
+            cipher = _ciphers[key] = Fernet(key)
+        return cipher
+
+
+def decrypt_token(encrypted_token: str) -> str:
+    """Decrypt a token stored in user_linked_accounts"""
+    if not encrypted_token:
+        raise ValueError("Encrypted token cannot be empty")
+    try:
+        return get_cipher().decrypt(base64.urlsafe_b64decode(encrypted_token.encode())).decode()
+    except Exception as e:
+        raise ValueError(f"Token decryption failed: {str(e)}")
+
+
+@dataclass(frozen=True)
+class LinkedAccount:
+    platform: str
+    account_id: str
+    account_name: Optional[str]
+    access_token: str
+    page_id: Optional[str]
+    instagram_id: Optional[str]
+
+
+class CredentialProvider:
+    """
+    Decrypted credentials of each user's linked social accounts.
+
+    The accounts of a user are read and decrypted once, then served from
+    memory for CREDENTIAL_CACHE_TTL_SECONDS, so publishing and analytics do
+    not hit the database and Fernet on every call. The OAuth connect and
+    disconnect routes call invalidate() so a new or removed account is seen
+    straight away. Only the most recently linked account per platform is
+    kept, as before; if its token cannot be decrypted, that platform is left
+    out (the user's other platforms still load) until it is linked again.
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl if ttl is not None else settings.CREDENTIAL_CACHE_TTL_SECONDS
+        self.cache: Dict[int, Tuple[float, Dict[str, LinkedAccount]]] = {}
+        # Bumped on every invalidation, so a load that raced one is not cached
+        self.versions: Dict[int, int] = {}
+        self.lock = threading.Lock()
+
+    def _load(self, user_id: int) -> Dict[str, LinkedAccount]:
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            cursor.execute("""
+                SELECT platform, account_id, account_name, access_token, page_id, instagram_id
+                FROM user_linked_accounts
+                WHERE user_id = %s
+                ORDER BY created_at DESC
+            """, (user_id,))
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+        accounts = {}
+        seen = set()
+        for platform, account_id, account_name, access_token, page_id, instagram_id in rows:
+            if platform in seen:
+                continue
+            seen.add(platform)
+            try:
+                token = decrypt_token(access_token)
+            except ValueError as e:
+                # Not falling back to an older row: it may be another account
+                print(f"⚠️ Skipping {platform} account {account_id} of user {user_id}: {e}")
+                continue
+            accounts[platform] = LinkedAccount(platform, account_id, account_name,
+                                               token, page_id, instagram_id)
+        return accounts
+
+    def get_accounts(self, user_id: int) -> Dict[str, LinkedAccount]:
+        """Linked accounts of a user, by platform (blocking: run it in a thread from async code)"""
+        with self.lock:
+            cached = self.cache.get(user_id)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+            version = self.versions.get(user_id, 0)
+
+        accounts = self._load(user_id)
+        with self.lock:
+            if self.versions.get(user_id, 0) == version:
+                self.cache[user_id] = (time.monotonic() + self.ttl, accounts)
+        return accounts
+
+    def get(self, user_id: int, platform: str) -> Optional[LinkedAccount]:
+        return self.get_accounts(user_id).get(platform.lower())
+
+    def invalidate(self, user_id: int, platform: Optional[str] = None):
+        """Drop a user's cached credentials after an account is linked or removed"""
+        with self.lock:
+            self.versions[user_id] = self.versions.get(user_id, 0) + 1
+            self.cache.pop(user_id, None)
+        print(f"[INFO] Cleared cached credentials for user {user_id}" + (f" ({platform})" if platform else ""))
+
+
+# Shared credential provider for the app
+credential_provider = CredentialProvider()
@@ -1,7 +1,7 @@
 import base64
 import secrets
 from datetime import datetime
-from cryptography.fernet import Fernet
+from auth.credentials import get_cipher
 from fastapi import Request, HTTPException
 from fastapi.responses import RedirectResponse
 import requests
@@ -22,7 +22,8 @@ META_CONFIG = {
 
 class MetaOAuth:
     def __init__(self, encryption_key: bytes):
-        self.cipher_suite = Fernet(encryption_key)
+        # One Fernet instance per key for the whole process
+        self.cipher_suite = get_cipher(encryption_key)
 
     def _encrypt_token(self, token: str) -> str:
         """Securely encrypt access token"""
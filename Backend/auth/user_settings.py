@@ -15,6 +15,9 @@ from .linkedin_oauth import LinkedInOAuth
 
 from .meta_oauth import MetaOAuth
 
+from .credentials import credential_provider
+from components.insightsBIData.analytics_cache import analytics_cache
+
 router = APIRouter()
 templates = Jinja2Templates(directory="/static/templates")
 
@@ -779,6 +782,8 @@ async def linkedin_callback(
         ))
         
         conn.commit()
+        credential_provider.invalidate(user["user_id"], "linkedin")
+        analytics_cache.invalidate(user["user_id"])
         return RedirectResponse(url="/user_settings?linkedin_success=1")
         
     except HTTPException as e:
@@ -810,6 +815,8 @@ async def disconnect_linkedin(
         
         result = cursor.fetchone()
         conn.commit()
+        credential_provider.invalidate(user["user_id"], "linkedin")
+        analytics_cache.invalidate(user["user_id"])
         
         if result:
             return {
@@ -887,6 +894,8 @@ async def meta_callback(
             ))
         
         conn.commit()
+        credential_provider.invalidate(user["user_id"], "meta")
+        analytics_cache.invalidate(user["user_id"])
         return RedirectResponse(url="/user_settings?meta_success=1")
         
     except HTTPException as e:
@@ -931,6 +940,8 @@ async def disconnect_meta(
         
         result = cursor.fetchone()
         conn.commit()
+        credential_provider.invalidate(user["user_id"], result[0] if result else "meta")
+        analytics_cache.invalidate(user["user_id"])
         
         if result:
             return {
@@ -0,0 +1,284 @@
+"""
+Load test: publish throughput and tail latency against the social API stand-in
+(mocks/social_api_stub.py), without touching real accounts.
+
+Two paths can be measured:
+    client  publishes straight through the PublishingClient (Graph batching,
+            container polling, LinkedIn upload relay)
+    outbox  queues the publishes in the publish outbox, the way the posting
+            scheduler does, and lets several outbox workers (one per app
+            replica) drain it; latency is from enqueue to settled. Needs the
+            database from .env. Its jobs have their own key prefix, so the
+            app's workers never claim them and its workers never claim the
+            app's jobs; they are removed afterwards. The rate governor runs
+            with no quotas: its locking and bookkeeping are measured, but no
+            job is deferred.
+
+Run from the Backend folder (the stand-in is started in-process unless
+--stub-url points at a running one):
+    python benchmarks/bench_publishing.py --publishes 500 --concurrency 50
+    python benchmarks/bench_publishing.py --mode outbox --workers 3 --publishes 300
+    python benchmarks/bench_publishing.py --latency-ms 120 --error-rate 0.02 --rate-limit 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_MIX = "instagram:post,instagram:story,facebook:text,facebook:image,linkedin:text,linkedin:image"
+
+
+def start_stub(port):
+    """Serve the stand-in from a background thread"""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config("mocks.social_api_stub:app", host="127.0.0.1", port=port,
+                                           log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def stub_request(stub_url, method, path, payload=None):
+    async with aiohttp.ClientSession() as session:
+        async with session.request(method, f"{stub_url}{path}", json=payload) as response:
+            return await response.json()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def instagram_publish(client, account_id, token, kind, media_url, caption):
+    """Create, wait for and publish one container (what InstagramContainerManager does, minus the database)"""
+    from components.publishing.client import PublishError
+
+    async def flow():
+        params = client.instagram_container_params(kind, media_url, caption)
+        container_id = await client.instagram_create_container(account_id, token, params)
+        deadline = time.monotonic() + 60
+        while True:
+            status_code = await client.instagram_container_status(container_id, token)
+            if status_code == "FINISHED":
+                break
+            if status_code in ("ERROR", "EXPIRED") or time.monotonic() >= deadline:
+                raise PublishError(f"Container {container_id} not published ({status_code})")
+            await asyncio.sleep(0.5)
+        media_id = await client.instagram_publish_container(account_id, token, container_id)
+        return media_id, {"id": media_id, "container_id": container_id}
+
+    return await client._run("instagram", kind, flow)
+
+
+def make_publish(client, stub_url, platform, kind, index, accounts, media_bytes):
+    """One publish call of the mix, spread over `accounts` accounts (one token each)"""
+    account = index % accounts
+    token = f"stub-token-{platform}-{account}"
+    media_url = f"{stub_url}/media/{index}.jpg?bytes={media_bytes}"
+    caption = f"Load test post {index}"
+    if platform == "instagram":
+        account_id = f"1784140{account:07d}"
+        return instagram_publish(client, account_id, token, kind, media_url, None if kind == "story" else caption)
+    if platform == "facebook":
+        page_id = f"10{account:08d}"
+        if kind == "image":
+            return client.facebook_image(page_id, token, media_url, caption)
+        return client.facebook_text(page_id, token, caption)
+    author = f"urn:li:person:stub{account}"
+    if kind == "image":
+        return client.linkedin_image(token, author, media_url, caption)
+    return client.linkedin_text(token, author, caption)
+
+
+def report(title, latencies, outcomes, errors, elapsed, stub_stats):
+    total = sum(outcomes.values())
+    print(f"\n{title}")
+    print(f"  {total} publishes in {elapsed:.2f}s -> {total / elapsed:.1f} publishes/s")
+    print(f"  succeeded {outcomes['ok']}, failed {outcomes['failed']}")
+    if latencies:
+        print(f"  latency ms: p50 {percentile(latencies, 50):.0f}  p95 {percentile(latencies, 95):.0f}  "
+              f"p99 {percentile(latencies, 99):.0f}  max {max(latencies):.0f}  "
+              f"mean {statistics.mean(latencies):.0f}")
+    for error, count in errors.most_common(5):
+        print(f"  {count} x {error[:120]}")
+    interesting = {key: value for key, value in stub_stats.items()
+                   if key.startswith(("graph batch", "graph 429", "graph 500", "linkedin 429", "linkedin 500",
+                                      "published", "media downloads"))}
+    print(f"  stand-in: {interesting}")
+
+
+async def run_client(args, mix):
+    from components.publishing.client import PublishingClient
+
+    client = PublishingClient(graph_base=f"{args.stub_url}/v22.0", linkedin_base=f"{args.stub_url}/linkedin",
+                              max_connections=args.concurrency * 2, per_host_limit=args.concurrency * 2)
+    limit = asyncio.Semaphore(args.concurrency)
+    latencies, outcomes, errors = [], Counter(), Counter()
+
+    async def one(index):
+        platform, kind = mix[index % len(mix)]
+        async with limit:
+            started = time.perf_counter()
+            result = await make_publish(client, args.stub_url, platform, kind, index, args.accounts, args.media_bytes)
+            latencies.append((time.perf_counter() - started) * 1000)
+        outcomes["ok" if result else "failed"] += 1
+        if not result:
+            errors[result.error] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one(index) for index in range(args.publishes)])
+    elapsed = time.perf_counter() - started
+    await client.close()
+    return latencies, outcomes, errors, elapsed
+
+
+async def run_outbox(args, mix):
+    from config.config import get_db_connection, get_db_cursor, release_db_connection
+    from components.publishing.client import PublishingClient
+    from components.publishing.outbox import PublishOutbox
+    from components.publishing.rate_governor import RateGovernor
+
+    client = PublishingClient(graph_base=f"{args.stub_url}/v22.0", linkedin_base=f"{args.stub_url}/linkedin",
+                              max_connections=args.concurrency * 2, per_host_limit=args.concurrency * 2)
+
+    async def publisher(job):
+        payload = job["payload"]
+        return await make_publish(client, args.stub_url, job["platform"], payload["kind"], payload["index"],
+                                  args.accounts, args.media_bytes)
+
+    class LoadTestOutbox(PublishOutbox):
+        async def _rate_account(self, job):
+            # The stand-in accounts are not linked to any user
+            return f"stub-{job['payload']['index'] % args.accounts}"
+
+    run_id = uuid.uuid4().hex[:8]
+    governor = RateGovernor(quotas={})
+    workers = [LoadTestOutbox(publisher, poll_interval=0.2, max_attempts=args.max_attempts, backoff_seconds=0.5,
+                              governor=governor, key_prefix=f"loadtest-{run_id}-")
+               for _ in range(args.workers)]
+    workers[0].ensure_schema()
+    governor.ensure_schema()
+    # Negative content ids never match a real content item
+    jobs = [{
+        "content_id": -(index + 1),
+        "user_id": 0,
+        "company_id": None,
+        "platform": mix[index % len(mix)][0],
+        "payload": {"kind": mix[index % len(mix)][1], "index": index},
+        "idempotency_key": f"loadtest-{run_id}-{index}",
+    } for index in range(args.publishes)]
+
+    def settled_jobs():
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            cursor.execute("""
+                SELECT status, last_error, EXTRACT(EPOCH FROM updated_at - created_at) * 1000
+                FROM publish_outbox
+                WHERE idempotency_key LIKE %s AND status IN ('succeeded', 'dead')
+            """, (f"loadtest-{run_id}-%",))
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    def cleanup():
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            cursor.execute("DELETE FROM publish_outbox WHERE idempotency_key LIKE %s", (f"loadtest-{run_id}-%",))
+            conn.commit()
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    try:
+        for offset in range(0, len(jobs), 50):
+            await asyncio.to_thread(workers[0].enqueue_many, jobs[offset:offset + 50])
+        for worker in workers:
+            worker.notify()
+        while True:
+            rows = await asyncio.to_thread(settled_jobs)
+            if len(rows) >= len(jobs) or time.perf_counter() - started > args.timeout:
+                break
+            await asyncio.sleep(0.5)
+        elapsed = time.perf_counter() - started
+    finally:
+        for worker in workers:
+            await worker.stop()
+        await client.close()
+        await asyncio.to_thread(cleanup)
+
+    outcomes = Counter("ok" if status == "succeeded" else "failed" for status, _, _ in rows)
+    errors = Counter(error for status, error, _ in rows if status == "dead")
+    latencies = [float(latency) for _, _, latency in rows]
+    if len(rows) < len(jobs):
+        print(f"⚠️ {len(jobs) - len(rows)} jobs did not settle within {args.timeout}s")
+    return latencies, outcomes, errors, elapsed
+
+
+async def main(args):
+    mix = [tuple(item.split(":")) for item in args.mix.split(",")]
+    await stub_request(args.stub_url, "POST", "/_stub/reset")
+    await stub_request(args.stub_url, "POST", "/_stub/config", {
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "error_rate": args.error_rate,
+        "rate_limit": args.rate_limit,
+        "container_seconds": args.container_seconds,
+    })
+    print(f"Publishing {args.publishes} posts ({args.mode} path, concurrency {args.concurrency}, "
+          f"{args.accounts} accounts per platform) against {args.stub_url}")
+    print(f"Stand-in: {args.latency_ms:.0f}ms + ~{args.jitter_ms:.0f}ms tail, error rate {args.error_rate}, "
+          f"rate limit {args.rate_limit or 'off'} per token/min, containers ready after {args.container_seconds}s")
+
+    if args.mode == "outbox":
+        latencies, outcomes, errors, elapsed = await run_outbox(args, mix)
+    else:
+        latencies, outcomes, errors, elapsed = await run_client(args, mix)
+    stub_stats = (await stub_request(args.stub_url, "GET", "/_stub/stats"))["stats"]
+    report(f"{args.mode} path", latencies, outcomes, errors, elapsed, stub_stats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mode", choices=["client", "outbox"], default="client")
+    parser.add_argument("--publishes", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--accounts", type=int, default=5, help="accounts per platform")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="comma-separated platform:kind entries")
+    parser.add_argument("--media-bytes", type=int, default=256 * 1024)
+    parser.add_argument("--workers", type=int, default=2, help="outbox workers (outbox mode)")
+    parser.add_argument("--max-attempts", type=int, default=5, help="outbox attempts per job (outbox mode)")
+    parser.add_argument("--timeout", type=float, default=300, help="outbox drain timeout in seconds")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--rate-limit", type=int, default=0, help="calls per token per minute (0 = off)")
+    parser.add_argument("--container-seconds", type=float, default=1)
+    parser.add_argument("--stub-url", default=None, help="a running stand-in (default: start one)")
+    parser.add_argument("--port", type=int, default=8102)
+    args = parser.parse_args()
+
+    if args.stub_url is None:
+        start_stub(args.port)
+        args.stub_url = f"http://127.0.0.1:{args.port}"
+    args.stub_url = args.stub_url.rstrip("/")
+    asyncio.run(main(args))
@@ -0,0 +1,128 @@
+"""
+Benchmark: single-pass ffmpeg video finishing (with and without a cached audio
+bed) vs the OpenCV + moviepy path
+(with the original and the optimized OpenCV frame loop).
+
+Builds a synthetic clip the size of a minimax/video-01 output, a
+transparent logo, and finishes it both ways with the real background music.
+
+Run from the Backend folder:
+    python benchmarks/bench_video_finishing.py --seconds 6 --runs 3
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from components.media.video_finishing import (  # noqa: E402
+    BG_MUSIC_PATH,
+    ffmpeg_available,
+    finish_video,
+    legacy_finish_video,
+)
+from components.media.video_processing import create_enhanced_video  # noqa: E402
+from components.media.audio_beds import audio_bed_cache  # noqa: E402
+from components.media.frame_processor import create_enhanced_video_optimized  # noqa: E402
+
+
+def make_clip(path, width, height, fps, seconds):
+    """Moving gradient clip written with mp4v, like a downloaded generation"""
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    for i in range(int(fps * seconds)):
+        frame = np.empty((height, width, 3), dtype=np.uint8)
+        frame[..., 0] = (x + i * 3) % 256
+        frame[..., 1] = (y + i * 2) % 256
+        frame[..., 2] = ((x + y[:, :1]) / 2 + i) % 256
+        out.write(frame)
+    out.release()
+
+
+def make_logo(path):
+    logo = Image.new("RGBA", (800, 300), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(logo)
+    draw.rounded_rectangle((10, 10, 790, 290), radius=40, fill=(0, 179, 173, 255))
+    draw.ellipse((40, 60, 220, 240), fill=(44, 27, 71, 255))
+    logo.save(path)
+
+
+def time_run(func, *args):
+    started = time.perf_counter()
+    ok = func(*args)
+    return time.perf_counter() - started, ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=720)
+    parser.add_argument("--height", type=int, default=1280)
+    parser.add_argument("--fps", type=int, default=25)
+    parser.add_argument("--seconds", type=float, default=6)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    if not ffmpeg_available():
+        print("ffmpeg not found (install it or imageio-ffmpeg)")
+        return 1
+
+    music = BG_MUSIC_PATH if os.path.exists(BG_MUSIC_PATH) else None
+    with tempfile.TemporaryDirectory() as tmp:
+        clip = os.path.join(tmp, "clip.mp4")
+        logo = os.path.join(tmp, "logo.png")
+        make_clip(clip, args.width, args.height, args.fps, args.seconds)
+        make_logo(logo)
+        print(f"Clip: {args.width}x{args.height} @ {args.fps}fps, {args.seconds}s, music: {music or 'none'}")
+
+        # OpenCV frame loop alone, without the moviepy audio pass
+        for name, func in (("opencv frames", create_enhanced_video),
+                           ("opencv frames (optimized)", create_enhanced_video_optimized)):
+            times = []
+            for run in range(args.runs):
+                elapsed, ok = time_run(func, clip, logo, os.path.join(tmp, f"frames_{run}.mp4"))
+                if ok:
+                    times.append(elapsed)
+            if times:
+                print(f"{name:>26}: median {statistics.median(times):6.2f}s")
+
+        results = {}
+        legacy = lambda *a: legacy_finish_video(*a, optimized=False)
+        music_filter = lambda *a: finish_video(*a, use_audio_bed=False)
+        if music:
+            # Steady state: the bed for this length is already cached
+            audio_bed_cache.prewarm(music, [args.seconds + 2])
+        for name, func in (("opencv+moviepy", legacy),
+                           ("ffmpeg music filter", music_filter),
+                           ("ffmpeg single pass", finish_video)):
+            times, size = [], 0
+            for run in range(args.runs):
+                output = os.path.join(tmp, f"{name.replace(' ', '_')}_{run}.mp4")
+                elapsed, ok = time_run(func, clip, logo, output, music)
+                if not ok:
+                    print(f"{name}: run {run} failed")
+                    continue
+                times.append(elapsed)
+                size = os.path.getsize(output)
+            results[name] = (times, size)
+
+    print("\n=== Results ===")
+    for name, (times, size) in results.items():
+        if times:
+            print(f"{name:>20}: median {statistics.median(times):6.2f}s  "
+                  f"min {min(times):6.2f}s  output {size / 1024:8.1f} KB")
+    legacy, single = results.get("opencv+moviepy"), results.get("ffmpeg single pass")
+    if legacy and single and legacy[0] and single[0]:
+        print(f"{'speedup':>20}: {statistics.median(legacy[0]) / statistics.median(single[0]):.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
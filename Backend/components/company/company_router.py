@@ -9,6 +9,7 @@ from pydantic import BaseModel
 from typing import List, Optional
 import cloudinary.uploader
 from fastapi.middleware.cors import CORSMiddleware
+from components.media.overlay_phrases import overlay_phrase_pool
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -254,6 +255,9 @@ async def delete_company(
         cursor.execute("DELETE FROM companies WHERE id = %s", (company_id,))
         cursor.connection.commit()
         
+        # Pooled overlay phrases belong to the company profile
+        overlay_phrase_pool.invalidate(company_id)
+        
         return JSONResponse(
             status_code=200,
             content={"success": True, "message": "Company deleted successfully"}
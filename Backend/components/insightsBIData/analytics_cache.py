@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from config.config import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_ENTRIES = 5000
+
+
+class AnalyticsCache:
+    """
+    Dashboard analytics per (user, platform, days), with stale-while-revalidate.
+
+    An entry younger than ANALYTICS_CACHE_FRESH_SECONDS is served as is. An
+    older one, up to ANALYTICS_CACHE_STALE_SECONDS, is still served right
+    away while a background task fetches it again. Concurrent requests for
+    the same key share one fetch, whether it is a refresh or a first load.
+    Error results are returned but not cached (a stale entry is served
+    instead when there is one).
+    """
+
+    def __init__(self, fresh_seconds: Optional[float] = None, stale_seconds: Optional[float] = None,
+                 max_entries: int = MAX_ENTRIES):
+        self.fresh_seconds = fresh_seconds if fresh_seconds is not None else settings.ANALYTICS_CACHE_FRESH_SECONDS
+        self.stale_seconds = stale_seconds if stale_seconds is not None else settings.ANALYTICS_CACHE_STALE_SECONDS
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.inflight: Dict[Hashable, asyncio.Task] = {}
+        self.counters = {"fresh": 0, "stale": 0, "miss": 0, "coalesced": 0}
+
+    def _store(self, key: Hashable, value: Any):
+        self.entries[key] = (time.monotonic(), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        current = asyncio.current_task()
+        try:
+            value = await loader()
+            if isinstance(value, dict) and "error" in value:
+                entry = self.entries.get(key)
+                return entry[1] if entry else value
+            # Not stored if the key was invalidated while this fetch was running
+            if self.inflight.get(key) is current:
+                self._store(key, value)
+            return value
+        finally:
+            if self.inflight.get(key) is current:
+                del self.inflight[key]
+
+    def _fetch(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """The running fetch for key, or a new one"""
+        task = self.inflight.get(key)
+        if task is not None:
+            self.counters["coalesced"] += 1
+            return task
+        task = self.inflight[key] = asyncio.get_running_loop().create_task(self._load(key, loader))
+        # Retrieve a failed fetch's exception even if nobody awaits it (background refreshes)
+        task.add_done_callback(self._log_failure)
+        return task
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self.entries.get(key)
+        if entry:
+            age = time.monotonic() - entry[0]
+            if age < self.fresh_seconds:
+                self.counters["fresh"] += 1
+                return entry[1]
+            if age < self.stale_seconds:
+                self.counters["stale"] += 1
+                self._fetch(key, loader)
+                return entry[1]
+
+        self.counters["miss"] += 1
+        # Shielded: a client that goes away does not cancel the fetch others are waiting on
+        return await asyncio.shield(self._fetch(key, loader))
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception():
+            logger.error(f"Analytics fetch failed: {task.exception()}")
+
+    def invalidate(self, user_id: int):
+        """Forget a user's analytics (e.g. after an account was linked or removed)"""
+        for key in [key for key in self.entries if key[0] == user_id]:
+            del self.entries[key]
+        for key in [key for key in self.inflight if key[0] == user_id]:
+            del self.inflight[key]
+
+
+# Shared analytics cache for the app
+analytics_cache = AnalyticsCache()
@@ -6,12 +6,20 @@ import asyncio
 from typing import Dict, Any, Optional, List
 import logging
 import random
-from auth.meta_oauth import MetaOAuth
-import aiohttp
+from auth.credentials import credential_provider
+from config.config import settings
+from components.net.sessions import RetryPolicy, session_registry
 from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
+# One pooled Graph API session for every insights call (opened on app startup)
+GRAPH_SESSION = "graph_insights"
+session_registry.register(GRAPH_SESSION, limit=100, limit_per_host=20, timeout=30,
+                          retry=RetryPolicy(attempts=3, backoff_seconds=1))
+# Same Graph API version and host as publishing (GRAPH_API_BASE)
+GRAPH_API_BASE = settings.GRAPH_API_BASE.rstrip("/")
+
 # Global thread pool for blocking operations
 thread_pool = ThreadPoolExecutor(max_workers=10)
 
@@ -20,25 +28,27 @@ async def run_in_thread(func, *args):
     loop = asyncio.get_event_loop()
     return await loop.run_in_executor(thread_pool, func, *args)
 
+async def graph_get(url: str, params: dict) -> Optional[dict]:
+    """GET a Graph API URL through the shared session (retried on 429/5xx); the body on 200, else None"""
+    status, data = await session_registry.request_json(GRAPH_SESSION, "GET", url, params=params)
+    if status == 200 and isinstance(data, dict):
+        return data
+    if status is not None:
+        logger.error(f"API call failed: {status}")
+    return None
+
 # Facebook Analytics
 async def get_facebook_analytics(user_id: int, db_cursor, days: int = 30):
     """Get Facebook analytics for the user - handles token decryption internally"""
     try:
-        # Run database query in thread pool
-        facebook_account = await run_in_thread(
-            fetch_facebook_account, db_cursor, user_id
-        )
+        # Decrypted credentials, cached per user (loaded in the thread pool)
+        facebook_account = await run_in_thread(fetch_facebook_account, db_cursor, user_id)
         
         if not facebook_account:
             return {"error": "No Facebook account linked"}
         
-        # Decrypt the access token
-        ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY").encode()
-        meta_oauth = MetaOAuth(ENCRYPTION_KEY)
-        
-        encrypted_access_token = facebook_account[3]
-        access_token = meta_oauth._decrypt_token(encrypted_access_token)
-        page_id = facebook_account[4]
+        access_token = facebook_account.access_token
+        page_id = facebook_account.page_id
         
         # Fetch all data concurrently
         today = datetime.now()
@@ -83,30 +93,20 @@ async def get_facebook_analytics(user_id: int, db_cursor, days: int = 30):
         return {"error": str(e)}
 
 def fetch_facebook_account(cursor, user_id):
-    """Blocking function to fetch Facebook account"""
-    cursor.execute("""
-        SELECT platform, account_id, account_name, access_token, page_id, instagram_id
-        FROM user_linked_accounts 
-        WHERE user_id = %s AND platform = 'facebook'
-        ORDER BY created_at DESC LIMIT 1
-    """, (user_id,))
-    return cursor.fetchone()
+    """Blocking function to fetch the Facebook account (cursor kept for callers; the provider uses the pool)"""
+    return credential_provider.get(user_id, 'facebook')
 
 async def fetch_facebook_fan_count(page_id: str, access_token: str):
     """Fetch Facebook fan count asynchronously"""
     try:
-        async with aiohttp.ClientSession() as session:
-            url = f'https://graph.facebook.com/v22.0/{page_id}'
-            params = {
-                'fields': 'fan_count',
-                'access_token': access_token
-            }
-            
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return data.get('fan_count', 0)
-                return 0
+        url = f'{GRAPH_API_BASE}/{page_id}'
+        params = {
+            'fields': 'fan_count',
+            'access_token': access_token
+        }
+        
+        data = await graph_get(url, params)
+        return data.get('fan_count', 0) if data else 0
     except Exception as e:
         logger.error(f"Error fetching Facebook fan count: {e}")
         return 0
@@ -114,39 +114,37 @@ async def fetch_facebook_fan_count(page_id: str, access_token: str):
 async def fetch_facebook_insight(page_id: str, access_token: str, metric: str, since: str, until: str):
     """Fetch Facebook insight data asynchronously"""
     try:
-        async with aiohttp.ClientSession() as session:
-            url = f'https://graph.facebook.com/v22.0/{page_id}/insights'
-            params = {
-                'metric': metric,
-                'period': 'day',
-                'since': since,
-                'until': until,
-                'access_token': access_token
-            }
-            
-            async with session.get(url, params=params) as response:
-                if response.status != 200:
-                    return None
-                
-                data = await response.json()
-                data = data.get('data', [])
-                if not data:
-                    return None
-                
-                values = []
-                labels = []
-                
-                for item in data[0].get('values', []):
-                    end_time = item.get('end_time', '')
-                    if end_time:
-                        try:
-                            date = datetime.strptime(end_time.split('T')[0], '%Y-%m-%d')
-                            labels.append(date.strftime('%b %d'))
-                            values.append(item.get('value', 0))
-                        except ValueError:
-                            continue
-                
-                return {"labels": labels, "values": values}
+        url = f'{GRAPH_API_BASE}/{page_id}/insights'
+        params = {
+            'metric': metric,
+            'period': 'day',
+            'since': since,
+            'until': until,
+            'access_token': access_token
+        }
+        
+        data = await graph_get(url, params)
+        if not data:
+            return None
+        
+        data = data.get('data', [])
+        if not data:
+            return None
+        
+        values = []
+        labels = []
+        
+        for item in data[0].get('values', []):
+            end_time = item.get('end_time', '')
+            if end_time:
+                try:
+                    date = datetime.strptime(end_time.split('T')[0], '%Y-%m-%d')
+                    labels.append(date.strftime('%b %d'))
+                    values.append(item.get('value', 0))
+                except ValueError:
+                    continue
+        
+        return {"labels": labels, "values": values}
                 
     except Exception as e:
         logger.error(f"Error fetching Facebook {metric} data: {e}")
@@ -156,21 +154,14 @@ async def fetch_facebook_insight(page_id: str, access_token: str, metric: str, s
 async def get_instagram_analytics(user_id: int, db_cursor, days: int = 14):
     """Get Instagram analytics for the user - handles token decryption internally"""
     try:
-        # Run database query in thread pool
-        instagram_account = await run_in_thread(
-            fetch_instagram_account, db_cursor, user_id
-        )
+        # Decrypted credentials, cached per user (loaded in the thread pool)
+        instagram_account = await run_in_thread(fetch_instagram_account, db_cursor, user_id)
         
         if not instagram_account:
             return {"error": "No Instagram account linked"}
         
-        # Decrypt the access token
-        ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY").encode()
-        meta_oauth = MetaOAuth(ENCRYPTION_KEY)
-        
-        encrypted_access_token = instagram_account[3]
-        access_token = meta_oauth._decrypt_token(encrypted_access_token)
-        instagram_account_id = instagram_account[5]
+        access_token = instagram_account.access_token
+        instagram_account_id = instagram_account.instagram_id
         
         # Calculate date range
         today = datetime.now()
@@ -229,29 +220,19 @@ async def get_instagram_analytics(user_id: int, db_cursor, days: int = 14):
         return {"error": str(e)}
 
 def fetch_instagram_account(cursor, user_id):
-    """Blocking function to fetch Instagram account"""
-    cursor.execute("""
-        SELECT platform, account_id, account_name, access_token, page_id, instagram_id
-        FROM user_linked_accounts 
-        WHERE user_id = %s AND platform = 'instagram'
-        ORDER BY created_at DESC LIMIT 1
-    """, (user_id,))
-    return cursor.fetchone()
+    """Blocking function to fetch the Instagram account (cursor kept for callers; the provider uses the pool)"""
+    return credential_provider.get(user_id, 'instagram')
 
 async def fetch_instagram_account_info(account_id: str, access_token: str):
     """Fetch Instagram account basic information asynchronously"""
     try:
-        async with aiohttp.ClientSession() as session:
-            url = f"https://graph.facebook.com/v19.0/{account_id}"
-            params = {
-                'fields': 'id,username,name,followers_count,follows_count,media_count',
-                'access_token': access_token
-            }
-            
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                return None
+        url = f"{GRAPH_API_BASE}/{account_id}"
+        params = {
+            'fields': 'id,username,name,followers_count,follows_count,media_count',
+            'access_token': access_token
+        }
+        
+        return await graph_get(url, params)
                 
     except Exception as e:
         logger.error(f"Error fetching Instagram account info: {e}")
@@ -262,8 +243,7 @@ async def fetch_instagram_insights(account_id: str, access_token: str, since: st
     insights = {}
     
     try:
-        base_url = "https://graph.facebook.com/v19.0/"
-        url = f"{base_url}{account_id}/insights"
+        url = f"{GRAPH_API_BASE}/{account_id}/insights"
         
         # Define all metrics to fetch
         metrics = [
@@ -324,30 +304,8 @@ def process_instagram_insight(insights: dict, metric: str, data: dict):
             insights['total_views'] = views_info['total_value']['value']
 
 async def make_instagram_api_call(url: str, params: dict):
-    """Make Instagram API call with retry logic asynchronously"""
-    max_retries = 3
-    
-    async with aiohttp.ClientSession() as session:
-        for attempt in range(max_retries):
-            try:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    elif response.status == 429:  # Rate limited
-                        wait_time = 2 ** attempt
-                        await asyncio.sleep(wait_time)
-                        continue
-                    else:
-                        logger.error(f"API call failed: {response.status}")
-                        return None
-                        
-            except Exception as e:
-                logger.error(f"Exception in API call: {e}")
-                if attempt == max_retries - 1:
-                    return None
-                await asyncio.sleep(1)
-    
-    return None
+    """Make Instagram API call (the shared session's retry policy handles 429s and errors)"""
+    return await graph_get(url, params)
 
 async def generate_chart_labels(since: str, until: str) -> List[str]:
     """Generate chart labels for date range"""
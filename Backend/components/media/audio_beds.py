@@ -0,0 +1,137 @@
+import hashlib
+import logging
+import math
+import os
+import subprocess
+import tempfile
+import threading
+from typing import Dict, Iterable, Optional
+
+from components.media.ffmpeg_tools import get_ffmpeg_path
+
+logger = logging.getLogger(__name__)
+
+BED_DIR = os.path.join(tempfile.gettempdir(), "marketing_bot_audio_beds")
+BED_VOLUME = 0.3
+BED_BITRATE = "128k"
+BED_SAMPLE_RATE = 44100
+
+# minimax/video-01 clips run 6-10s, and every finished video gets the 2s logo outro
+COMMON_CLIP_SECONDS = (6, 8, 10)
+OUTRO_SECONDS = 2
+
+
+class AudioBedCache:
+    """
+    Pre-mixed background music beds, cached on disk by duration.
+
+    The music file is decoded and levelled once into a PCM master; beds are
+    looped/trimmed from the master and encoded to AAC once per whole-second
+    length. Video finishing then stream-copies a bed that is at least as long
+    as the video instead of looping, trimming and levelling the music for
+    every render. Keys include the music file's size and mtime, so replacing
+    the music invalidates its beds.
+    """
+
+    def __init__(self, bed_dir: str = BED_DIR, volume: float = BED_VOLUME):
+        self.bed_dir = bed_dir
+        self.volume = volume
+        self.beds: Dict[str, str] = {}
+        self.masters: Dict[str, str] = {}
+        self.lock = threading.Lock()
+        self.key_locks: Dict[str, threading.Lock] = {}
+        self.counters = {"hits": 0, "builds": 0, "errors": 0}
+
+    def _music_key(self, music_path: str) -> str:
+        stat = os.stat(music_path)
+        payload = f"{os.path.abspath(music_path)}:{stat.st_size}:{int(stat.st_mtime)}:{self.volume}"
+        return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self.lock:
+            return self.key_locks.setdefault(key, threading.Lock())
+
+    @staticmethod
+    def bed_seconds(duration: float) -> int:
+        """Beds come in whole seconds, rounded up so they always cover the video"""
+        return max(1, math.ceil(duration - 1e-3))
+
+    def _run(self, cmd: list):
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip()[-1000:])
+
+    def _master(self, music_path: str, music_key: str) -> str:
+        """Decode and level the music once into a PCM master"""
+        path = os.path.join(self.bed_dir, f"{music_key}_master.wav")
+        with self._key_lock(path):
+            if not os.path.exists(path):
+                os.makedirs(self.bed_dir, exist_ok=True)
+                tmp_path = f"{path}.{threading.get_ident()}.tmp.wav"
+                try:
+                    self._run([get_ffmpeg_path() or "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+                               "-i", music_path, "-vn", "-af", f"volume={self.volume}",
+                               "-ac", "2", "-ar", str(BED_SAMPLE_RATE), tmp_path])
+                    os.replace(tmp_path, path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                print(f"[INFO] Decoded background music master: {path}")
+        return path
+
+    def get_bed(self, music_path: str, duration: float) -> Optional[str]:
+        """AAC bed of at least `duration` seconds (built on a miss), or None if it cannot be built"""
+        if not music_path or not os.path.exists(music_path) or not get_ffmpeg_path():
+            return None
+
+        seconds = self.bed_seconds(duration)
+        music_key = self._music_key(music_path)
+        key = f"{music_key}_{seconds}s"
+        path = os.path.join(self.bed_dir, f"{key}.m4a")
+
+        if self.beds.get(key) and os.path.exists(path):
+            self.counters["hits"] += 1
+            return path
+
+        with self._key_lock(key):
+            if os.path.exists(path):
+                self.beds[key] = path
+                self.counters["hits"] += 1
+                return path
+
+            tmp_path = f"{path}.{threading.get_ident()}.tmp.m4a"
+            try:
+                master = self._master(music_path, music_key)
+                self._run([get_ffmpeg_path() or "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+                           "-stream_loop", "-1", "-i", master, "-t", str(seconds),
+                           "-c:a", "aac", "-b:a", BED_BITRATE, "-movflags", "+faststart", tmp_path])
+                os.replace(tmp_path, path)
+            except Exception as e:
+                self.counters["errors"] += 1
+                logger.error(f"Could not build {seconds}s audio bed from {music_path}: {e}")
+                return None
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+            self.beds[key] = path
+            self.counters["builds"] += 1
+            print(f"[INFO] Built {seconds}s background music bed: {path}")
+            return path
+
+    def prewarm(self, music_path: str, durations: Optional[Iterable[float]] = None):
+        """Build the beds for the common clip lengths (plus the outro)"""
+        if durations is None:
+            durations = [seconds + OUTRO_SECONDS for seconds in COMMON_CLIP_SECONDS]
+        for duration in durations:
+            self.get_bed(music_path, duration)
+
+    def prewarm_in_background(self, music_path: str, durations: Optional[Iterable[float]] = None):
+        threading.Thread(target=self.prewarm, args=(music_path, durations), daemon=True).start()
+
+    def stats(self) -> dict:
+        return {**self.counters, "cached_beds": len(self.beds)}
+
+
+# Shared cache for the app
+audio_bed_cache = AudioBedCache()
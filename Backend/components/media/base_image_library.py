@@ -0,0 +1,312 @@
+import hashlib
+import io
+import logging
+import math
+import re
+import threading
+import uuid
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cloudinary.uploader
+from PIL import Image
+
+from components.media.media_fetcher import media_fetcher
+from config.config import get_db_connection, get_db_cursor, release_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Cosine similarity above which a stored base image is reused instead of
+# calling the generator
+NEAR_MATCH_THRESHOLD = 0.8
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "in", "on", "at", "to", "for", "with", "by",
+    "from", "into", "is", "are", "be", "it", "its", "this", "that", "as", "very",
+    "image", "photo", "picture", "shot", "showing", "show", "realistic", "simple",
+    "scene", "high", "quality", "no", "text", "logo", "logos", "style",
+}
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lowercase, strip punctuation/stopwords and crude plurals so equivalent prompts compare equal"""
+    words = re.findall(r"[a-z0-9]+", (prompt or "").lower())
+    normalized = []
+    for word in words:
+        if word in STOPWORDS or len(word) < 2:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        normalized.append(word)
+    return " ".join(normalized)
+
+
+def prompt_hash(normalized_prompt: str) -> str:
+    return hashlib.sha1(normalized_prompt.encode()).hexdigest()
+
+
+class TfidfIndex:
+    """Small in-process TF-IDF index with an inverted list, scored by cosine similarity"""
+
+    def __init__(self):
+        self.docs: Dict[int, Counter] = {}
+        self.df: Counter = Counter()
+        self.postings: Dict[str, set] = {}
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, doc_id: int, normalized_prompt: str):
+        tf = Counter(normalized_prompt.split())
+        self.docs[doc_id] = tf
+        for term in tf:
+            self.df[term] += 1
+            self.postings.setdefault(term, set()).add(doc_id)
+
+    def _idf(self, term: str) -> float:
+        return math.log((1 + len(self.docs)) / (1 + self.df.get(term, 0))) + 1
+
+    def _vector(self, tf: Counter) -> Dict[str, float]:
+        vec = {term: (1 + math.log(count)) * self._idf(term) for term, count in tf.items()}
+        norm = math.sqrt(sum(w * w for w in vec.values())) or 1.0
+        return {term: w / norm for term, w in vec.items()}
+
+    def search(self, normalized_prompt: str, limit: int = 5) -> List[Tuple[int, float]]:
+        query_tf = Counter(normalized_prompt.split())
+        if not query_tf:
+            return []
+        query_vec = self._vector(query_tf)
+
+        # Only score documents sharing at least one term with the query
+        candidates = set()
+        for term in query_tf:
+            candidates |= self.postings.get(term, set())
+
+        scored = []
+        for doc_id in candidates:
+            doc_vec = self._vector(self.docs[doc_id])
+            score = sum(w * doc_vec.get(term, 0.0) for term, w in query_vec.items())
+            scored.append((doc_id, round(score, 4)))
+
+        scored.sort(key=lambda x: -x[1])
+        return scored[:limit]
+
+
+class BaseImageLibrary:
+    """
+    Library of base images from the image generator, keyed by company and
+    normalized prompt. The generator prompt carries the company's logo
+    description (brand colours included), so an image is only ever reused
+    for the company it was generated for. Images live on Cloudinary,
+    metadata in the base_image_library table, and one similarity index per
+    company in memory.
+    """
+
+    def __init__(self, threshold: float = NEAR_MATCH_THRESHOLD):
+        self.threshold = threshold
+        self.indexes: Dict[int, TfidfIndex] = {}
+        self.entries: Dict[int, dict] = {}
+        self.by_hash: Dict[Tuple[int, str], int] = {}
+        self.loaded = False
+        self.lock = threading.Lock()
+        self.counters = Counter()
+
+    # -------- Storage --------
+    def ensure_schema(self):
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS base_image_library (
+                    id SERIAL PRIMARY KEY,
+                    prompt TEXT NOT NULL,
+                    normalized_prompt TEXT NOT NULL,
+                    prompt_hash VARCHAR(40) NOT NULL,
+                    image_url TEXT NOT NULL,
+                    width INTEGER,
+                    height INTEGER,
+                    use_count INTEGER NOT NULL DEFAULT 0,
+                    created_at TIMESTAMP NOT NULL DEFAULT NOW()
+                )
+            """)
+            cursor.execute("ALTER TABLE base_image_library ADD COLUMN IF NOT EXISTS company_id INTEGER")
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_base_image_library_company_hash
+                ON base_image_library (company_id, prompt_hash)
+            """)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Could not create base_image_library table: {e}")
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    def load(self):
+        """Build the in-memory index from the table (once per process)"""
+        with self.lock:
+            if self.loaded:
+                return
+            conn = get_db_connection()
+            cursor = get_db_cursor(conn)
+            try:
+                cursor.execute("""
+                    SELECT id, company_id, prompt, normalized_prompt, prompt_hash, image_url, width, height
+                    FROM base_image_library
+                    WHERE company_id IS NOT NULL
+                    ORDER BY id
+                """)
+                for row in cursor.fetchall():
+                    self._index_entry({
+                        "id": row[0],
+                        "company_id": row[1],
+                        "prompt": row[2],
+                        "normalized_prompt": row[3],
+                        "prompt_hash": row[4],
+                        "image_url": row[5],
+                        "width": row[6],
+                        "height": row[7],
+                    })
+                self.loaded = True
+                print(f"[INFO] Base image library loaded with {len(self.entries)} images")
+            finally:
+                cursor.close()
+                release_db_connection(conn)
+
+    def _index_entry(self, entry: dict):
+        self.entries[entry["id"]] = entry
+        self.by_hash.setdefault((entry["company_id"], entry["prompt_hash"]), entry["id"])
+        self.indexes.setdefault(entry["company_id"], TfidfIndex()).add(entry["id"], entry["normalized_prompt"])
+
+    def add(self, company_id: int, prompt: str, image: Image.Image) -> Optional[dict]:
+        """Upload a freshly generated base image and add it to the company's library"""
+        normalized = normalize_prompt(prompt)
+        if not normalized:
+            return None
+
+        buffer = io.BytesIO()
+        image.convert("RGB").save(buffer, "JPEG", quality=90, optimize=True)
+        buffer.seek(0)
+        digest = prompt_hash(normalized)
+        upload_result = cloudinary.uploader.upload(
+            buffer,
+            public_id=f"base_library/{company_id}_{digest[:16]}_{uuid.uuid4().hex}",
+            resource_type="image"
+        )
+
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            cursor.execute("""
+                INSERT INTO base_image_library
+                    (company_id, prompt, normalized_prompt, prompt_hash, image_url, width, height)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                RETURNING id
+            """, (company_id, prompt, normalized, digest, upload_result["secure_url"], image.width, image.height))
+            entry_id = cursor.fetchone()[0]
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+        entry = {
+            "id": entry_id,
+            "company_id": company_id,
+            "prompt": prompt,
+            "normalized_prompt": normalized,
+            "prompt_hash": digest,
+            "image_url": upload_result["secure_url"],
+            "width": image.width,
+            "height": image.height,
+        }
+        with self.lock:
+            self._index_entry(entry)
+        return entry
+
+    def _record_use(self, entry_id: int):
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            cursor.execute("""
+                UPDATE base_image_library SET use_count = use_count + 1 WHERE id = %s
+            """, (entry_id,))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.warning(f"Could not record base image use: {e}")
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    # -------- Lookup --------
+    def search(self, company_id: int, prompt: str, limit: int = 5) -> List[dict]:
+        """Exact and near matches for a prompt among the company's images, best first"""
+        self.load()
+        normalized = normalize_prompt(prompt)
+        if not normalized:
+            return []
+
+        with self.lock:
+            matches = []
+            exact_id = self.by_hash.get((company_id, prompt_hash(normalized)))
+            if exact_id is not None:
+                matches.append({**self.entries[exact_id], "score": 1.0, "match": "exact"})
+
+            index = self.indexes.get(company_id)
+            for doc_id, score in (index.search(normalized, limit=limit) if index else []):
+                if doc_id == exact_id:
+                    continue
+                kind = "near" if score >= self.threshold else "similar"
+                matches.append({**self.entries[doc_id], "score": score, "match": kind})
+
+        return matches[:limit]
+
+    def get_or_generate(self, company_id: int, prompt: str, generate: Callable[[], Image.Image]) -> Tuple[Image.Image, dict]:
+        """
+        Reuse an exact or near match for the prompt from the company's images
+        when there is one, otherwise call the generator and store its output.
+
+        Returns:
+            (image, info) where info says whether the image was reused
+        """
+        self.counters["lookups"] += 1
+        matches = [m for m in self.search(company_id, prompt, limit=1) if m["match"] in ("exact", "near")]
+
+        if matches:
+            match = matches[0]
+            try:
+                image = media_fetcher.fetch_image(match["image_url"], mode="RGBA")
+                self.counters[f"{match['match']}_hits"] += 1
+                self._record_use(match["id"])
+                print(f"[INFO] Reusing base image {match['id']} ({match['match']}, score {match['score']})")
+                return image, {"reused": True, "library_id": match["id"], "match": match["match"], "score": match["score"]}
+            except Exception as e:
+                logger.warning(f"Could not load library image {match['id']}, generating instead: {e}")
+
+        self.counters["misses"] += 1
+        image = generate()
+        try:
+            entry = self.add(company_id, prompt, image)
+        except Exception as e:
+            logger.warning(f"Could not store base image in library: {e}")
+            entry = None
+        return image, {"reused": False, "library_id": entry["id"] if entry else None}
+
+    def stats(self) -> dict:
+        lookups = self.counters["lookups"]
+        hits = self.counters["exact_hits"] + self.counters["near_hits"]
+        return {
+            "library_size": len(self.entries),
+            "lookups": lookups,
+            "exact_hits": self.counters["exact_hits"],
+            "near_hits": self.counters["near_hits"],
+            "misses": self.counters["misses"],
+            "reuse_rate": round(hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+# Shared library for the app
+base_image_library = BaseImageLibrary()
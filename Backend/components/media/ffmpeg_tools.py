@@ -0,0 +1,18 @@
+import shutil
+from typing import Optional
+
+
+def get_ffmpeg_path() -> Optional[str]:
+    """ffmpeg on PATH, or the binary bundled with imageio-ffmpeg (installed with moviepy)"""
+    path = shutil.which("ffmpeg")
+    if path:
+        return path
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return None
+
+
+def ffmpeg_available() -> bool:
+    return get_ffmpeg_path() is not None
@@ -0,0 +1,152 @@
+import os
+from typing import Dict
+
+import cv2
+import numpy as np
+
+from components.media.video_processing import create_logo_frame
+from components.media.reel_cover import CoverPicker
+
+
+class FadeFrameProcessor:
+    """
+    Allocation-free fades for the OpenCV finishing path.
+
+    Fades are applied with 256-entry integer lookup tables (one per fade
+    step, built once) written into a reused output buffer, instead of a
+    float multiply plus astype per frame. The lookup reproduces the old
+    int(frame * alpha) truncation exactly.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.buffer = np.empty((height, width, 3), dtype=np.uint8)
+        self.luts: Dict[float, np.ndarray] = {}
+        self.ramp = np.arange(256, dtype=np.float64)
+
+    def lut(self, alpha: float) -> np.ndarray:
+        alpha = min(max(alpha, 0.0), 1.0)
+        table = self.luts.get(alpha)
+        if table is None:
+            table = (self.ramp * alpha).astype(np.uint8)
+            self.luts[alpha] = table
+        return table
+
+    def fade(self, frame: np.ndarray, alpha: float) -> np.ndarray:
+        """Return frame * alpha in the shared buffer (valid until the next call)"""
+        return cv2.LUT(frame, self.lut(alpha), dst=self.buffer)
+
+
+def build_outro_frames(logo_frame: np.ndarray, fps: int) -> list:
+    """
+    Frame sequence of the 2s logo outro. The fade-in and fade-out ramps are
+    rendered once, and the middle section references logo_frame itself, so
+    writing the outro copies nothing.
+
+    Note: the fade-out ramps from the logo down to black, matching the ffmpeg
+    path. create_enhanced_video passed the remaining fraction to a "out" fade,
+    which inverted it and made the card flash black and brighten again.
+    """
+    logo_frames = fps * 2
+    half = fps // 2
+    ramp: Dict[float, np.ndarray] = {}
+    processor = FadeFrameProcessor(logo_frame.shape[1], logo_frame.shape[0])
+
+    def faded(alpha):
+        if alpha not in ramp:
+            ramp[alpha] = cv2.LUT(logo_frame, processor.lut(alpha))
+        return ramp[alpha]
+
+    frames = []
+    for i in range(logo_frames):
+        if i < half:  # First 0.5 seconds fade in
+            frames.append(faded(i / half))
+        elif i > logo_frames - half:  # Last 0.5 seconds fade out
+            frames.append(faded((logo_frames - i) / half))
+        else:
+            frames.append(logo_frame)
+    return frames
+
+
+def create_enhanced_video_optimized(original_video_path, logo_path, output_path, cover_path=None):
+    """
+    Same output as create_enhanced_video (fade out over the last second,
+    then a 2s logo outro), with reused decode/fade buffers and precomputed
+    outro frames. Only the outro fade-out differs, see build_outro_frames.
+    With a cover_path, the sharpest early frame is saved there while decoding.
+    """
+    cap = None
+    out = None
+
+    try:
+        print("Starting optimized video post-processing...")
+
+        cap = cv2.VideoCapture(original_video_path)
+        if not cap.isOpened():
+            print("❌ Error: Could not open video file")
+            return False
+
+        fps = int(cap.get(cv2.CAP_PROP_FPS))
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        print(f"Video properties: {width}x{height} at {fps} FPS, {total_frames} frames")
+
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+        if not out.isOpened():
+            print("❌ Error: Could not create output video")
+            return False
+
+        processor = FadeFrameProcessor(width, height)
+        frame = np.empty((height, width, 3), dtype=np.uint8)
+        fadeout_start_frame = max(0, total_frames - fps)
+        fade_span = min(fps, total_frames - fadeout_start_frame) or 1
+        frames_processed = 0
+        cover_picker = CoverPicker(total_frames) if cover_path else None
+
+        while True:
+            # Decode into the same buffer every time
+            ret, frame = cap.read(frame)
+            if not ret:
+                break
+
+            if cover_picker:
+                cover_picker.offer(frames_processed, frame)
+
+            frames_processed += 1
+            if frames_processed >= fadeout_start_frame:
+                fade_progress = (frames_processed - fadeout_start_frame) / fade_span
+                out.write(processor.fade(frame, 1.0 - fade_progress))
+            else:
+                out.write(frame)
+
+        print("✅ Original video processed with fadeout")
+        cap.release()
+
+        if cover_picker and not cover_picker.save(cover_path):
+            print("⚠️  Could not extract a cover frame")
+
+        if logo_path and os.path.exists(logo_path):
+            print("Adding logo scene...")
+            logo_frame = create_logo_frame(width, height, logo_path)
+            for outro_frame in build_outro_frames(logo_frame, fps):
+                out.write(outro_frame)
+            print("✅ Logo scene added")
+        else:
+            print("⚠️  Logo not available, skipping logo scene")
+
+        print(f"🎉 Enhanced video saved as '{output_path}'")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error during video post-processing: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    finally:
+        if cap:
+            cap.release()
+        if out:
+            out.release()
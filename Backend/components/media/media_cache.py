@@ -0,0 +1,116 @@
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+MEDIA_CACHE_DIR = os.path.join(tempfile.gettempdir(), "marketing_bot_media")
+# Long enough to cover the publish outbox's retries of the same post
+MEDIA_CACHE_MAX_AGE_SECONDS = 6 * 3600
+# How often the background sweeper removes files past that age
+MEDIA_CACHE_SWEEP_SECONDS = 3600
+
+
+class LocalMediaCache:
+    """
+    Local copies of published media, keyed by their remote URL.
+
+    A file lands here either when a finished LinkedIn video is uploaded to
+    Cloudinary (adopt() keeps the local file instead of deleting it) or when
+    the LinkedIn relay downloads media while uploading it. A later upload of
+    the same URL, e.g. a retry, then reads from disk instead of downloading
+    it again. Files are written under a temporary name and renamed when
+    complete, so a cached file is never partial. Old files are swept out on
+    every commit and by a background sweeper, on startup and then every
+    MEDIA_CACHE_SWEEP_SECONDS.
+    """
+
+    def __init__(self, cache_dir: str = MEDIA_CACHE_DIR, max_age_seconds: float = MEDIA_CACHE_MAX_AGE_SECONDS,
+                 sweep_seconds: float = MEDIA_CACHE_SWEEP_SECONDS):
+        self.cache_dir = cache_dir
+        self.max_age_seconds = max_age_seconds
+        self.sweep_seconds = sweep_seconds
+        self.sweeper_task: Optional[asyncio.Task] = None
+
+    def path_for(self, url: str) -> str:
+        extension = os.path.splitext(url.split("?", 1)[0])[1][:8]
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode()).hexdigest()[:32] + extension)
+
+    def get(self, url: str) -> Optional[str]:
+        """Path of the complete local copy of url, if there is a fresh one"""
+        path = self.path_for(url)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if stat.st_size == 0 or time.time() - stat.st_mtime > self.max_age_seconds:
+            return None
+        return path
+
+    def partial_path(self, url: str) -> str:
+        """A temporary path to download url into; pass it to commit() once complete"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        return f"{self.path_for(url)}.{uuid.uuid4().hex[:8]}.part"
+
+    def commit(self, url: str, partial_path: str) -> str:
+        path = self.path_for(url)
+        os.replace(partial_path, path)
+        self.sweep()
+        return path
+
+    def adopt(self, url: str, local_path: str) -> Optional[str]:
+        """Move a file that was just uploaded to url into the cache (it is no longer at local_path)"""
+        try:
+            partial = self.partial_path(url)
+            shutil.move(local_path, partial)
+            return self.commit(url, partial)
+        except OSError as e:
+            logger.warning(f"Could not cache {local_path} for {url}: {e}")
+            return None
+
+    def sweep(self):
+        """Remove cached and leftover partial files past their age"""
+        cutoff = time.time() - self.max_age_seconds
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.cache_dir, name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    async def _sweep_forever(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                logger.error(f"Media cache sweep failed: {e}")
+            await asyncio.sleep(self.sweep_seconds)
+
+    def start(self):
+        """Start the background sweeper (call from the app startup hook)"""
+        if self.sweeper_task is None or self.sweeper_task.done():
+            self.sweeper_task = asyncio.get_running_loop().create_task(self._sweep_forever())
+
+    async def stop(self):
+        if self.sweeper_task:
+            self.sweeper_task.cancel()
+            try:
+                await self.sweeper_task
+            except asyncio.CancelledError:
+                pass
+            self.sweeper_task = None
+
+
+# Shared media cache for the app
+media_cache = LocalMediaCache()
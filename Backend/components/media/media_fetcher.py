@@ -0,0 +1,142 @@
+import hashlib
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import requests
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 256 * 1024
+# Images are spooled in memory up to this size, then spill to disk
+SPOOL_MAX_BYTES = 2 * 1024 * 1024
+
+MAX_IMAGE_BYTES = 25 * 1024 * 1024
+MAX_VIDEO_BYTES = 300 * 1024 * 1024
+
+# (connect, read) - the read timeout applies between chunks, not to the whole body
+DEFAULT_TIMEOUT = (10, 60)
+
+
+class MediaFetchError(Exception):
+    """Raised when a download fails, is too large or does not match its checksum"""
+
+
+class FetchedMedia:
+    """A downloaded file on disk with its size and SHA-256"""
+
+    def __init__(self, path: str, num_bytes: int, sha256: str, content_type: Optional[str]):
+        self.path = path
+        self.num_bytes = num_bytes
+        self.sha256 = sha256
+        self.content_type = content_type
+
+    def remove(self):
+        remove_quietly(self.path)
+
+
+def remove_quietly(path: Optional[str]):
+    if path and os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Could not remove temp file {path}: {e}")
+
+
+@contextmanager
+def temporary_path(suffix: str = "") -> Iterator[str]:
+    """A temp file path that is always removed on exit, even on errors"""
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    try:
+        yield path
+    finally:
+        remove_quietly(path)
+
+
+class MediaFetcher:
+    """
+    Streams remote media in fixed-size chunks instead of response.content,
+    so memory stays bounded whatever the file size.
+
+    Every download enforces a byte limit (from Content-Length up front and
+    while streaming), connect/read timeouts, checks the body length against
+    Content-Length, and hashes the stream with SHA-256 so callers can verify
+    an expected checksum. Partial files are removed on any failure.
+    """
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE, timeout=DEFAULT_TIMEOUT,
+                 session: Optional[requests.Session] = None):
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.session = session or requests.Session()
+
+    def _stream(self, url: str, out, max_bytes: int, expected_sha256: Optional[str]):
+        """Copy the response body into out; returns (num_bytes, sha256, content_type)"""
+        with self.session.get(url, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+
+            declared = response.headers.get("Content-Length")
+            declared = int(declared) if declared and declared.isdigit() else None
+            if declared is not None and declared > max_bytes:
+                raise MediaFetchError(f"{url} is {declared} bytes, limit is {max_bytes}")
+
+            digest = hashlib.sha256()
+            num_bytes = 0
+            for chunk in response.iter_content(chunk_size=self.chunk_size):
+                if not chunk:
+                    continue
+                num_bytes += len(chunk)
+                if num_bytes > max_bytes:
+                    raise MediaFetchError(f"{url} exceeded the {max_bytes} byte limit")
+                digest.update(chunk)
+                out.write(chunk)
+
+            # Content-Length is the raw body size, so only compare uncompressed responses
+            if declared is not None and not response.headers.get("Content-Encoding") and num_bytes != declared:
+                raise MediaFetchError(f"{url} was truncated: got {num_bytes} of {declared} bytes")
+
+            sha256 = digest.hexdigest()
+            if expected_sha256 and sha256 != expected_sha256.lower():
+                raise MediaFetchError(f"Checksum mismatch for {url}: {sha256} != {expected_sha256}")
+
+            return num_bytes, sha256, response.headers.get("Content-Type")
+
+    def fetch_to_file(self, url: str, suffix: str = "", max_bytes: int = MAX_VIDEO_BYTES,
+                      expected_sha256: Optional[str] = None) -> FetchedMedia:
+        """Download to a new temp file; the caller owns (and removes) the file"""
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                num_bytes, sha256, content_type = self._stream(url, out, max_bytes, expected_sha256)
+        except Exception:
+            remove_quietly(path)
+            raise
+        return FetchedMedia(path, num_bytes, sha256, content_type)
+
+    @contextmanager
+    def download(self, url: str, suffix: str = "", max_bytes: int = MAX_VIDEO_BYTES,
+                 expected_sha256: Optional[str] = None) -> Iterator[FetchedMedia]:
+        """Download to a temp file that is removed when the block exits"""
+        media = self.fetch_to_file(url, suffix, max_bytes, expected_sha256)
+        try:
+            yield media
+        finally:
+            media.remove()
+
+    def fetch_image(self, url: str, mode: Optional[str] = "RGBA", max_bytes: int = MAX_IMAGE_BYTES,
+                    expected_sha256: Optional[str] = None) -> Image.Image:
+        """Download and decode an image, spooling large bodies to disk"""
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as spool:
+            self._stream(url, spool, max_bytes, expected_sha256)
+            spool.seek(0)
+            image = Image.open(spool)
+            image.load()
+        return image.convert(mode) if mode and image.mode != mode else image
+
+
+# Shared fetcher for the app
+media_fetcher = MediaFetcher()
@@ -0,0 +1,286 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+from typing import List, Optional
+
+from groq import Groq
+
+from config.config import get_db_connection, get_db_cursor, release_db_connection, settings
+
+logger = logging.getLogger(__name__)
+
+# Phrases generated per LLM call, and the number of unused phrases left
+# at which a background refill starts
+POOL_BATCH_SIZE = 30
+POOL_LOW_WATERMARK = 5
+
+PROFILE_FIELDS = [
+    "name", "slogan", "description", "products", "services",
+    "target_age_groups", "target_audience_types", "target_business_types",
+    "target_geographics", "brand_tone", "marketing_goals",
+]
+
+
+class OverlayPhrasePool:
+    """
+    Per-company pool of short on-brand overlay phrases.
+
+    One LLM call fills the pool with a batch of phrases; renders then claim
+    unused phrases one at a time (never repeating), and the pool refills in
+    a background thread once it runs low. Each phrase is stamped with a hash
+    of the company profile it was written for, so editing the profile
+    invalidates the pool on the next draw.
+    """
+
+    def __init__(self, batch_size: int = POOL_BATCH_SIZE, low_watermark: int = POOL_LOW_WATERMARK):
+        self.batch_size = batch_size
+        self.low_watermark = low_watermark
+        self.client = Groq(api_key=settings.GROQ_API_KEY_1)
+        self.refilling = set()
+        self.lock = threading.Lock()
+
+    def ensure_schema(self):
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS overlay_phrase_pool (
+                    id SERIAL PRIMARY KEY,
+                    company_id INTEGER NOT NULL,
+                    profile_hash VARCHAR(40) NOT NULL,
+                    phrase TEXT NOT NULL,
+                    used_at TIMESTAMP,
+                    created_at TIMESTAMP NOT NULL DEFAULT NOW()
+                )
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_overlay_phrase_pool_company
+                ON overlay_phrase_pool (company_id, profile_hash, used_at)
+            """)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Could not create overlay_phrase_pool table: {e}")
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    # -------- Company profile --------
+    def _fetch_profile(self, cursor, company_id: int) -> Optional[dict]:
+        cursor.execute(f"""
+            SELECT {', '.join(PROFILE_FIELDS)}
+            FROM companies
+            WHERE id = %s
+        """, (company_id,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        return dict(zip(PROFILE_FIELDS, row))
+
+    @staticmethod
+    def profile_hash(profile: dict) -> str:
+        payload = json.dumps([str(profile.get(field) or "") for field in PROFILE_FIELDS])
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    # -------- Drawing --------
+    def draw(self, company_id: int) -> Optional[str]:
+        """
+        Claim an unused phrase for the company, refilling the pool first if it
+        is empty. Returns None when no phrase could be produced so the caller
+        can fall back to a one-off generation.
+        """
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            profile = self._fetch_profile(cursor, company_id)
+            if not profile:
+                return None
+            current_hash = self.profile_hash(profile)
+
+            # Profile changed since the pool was filled: drop the stale phrases
+            cursor.execute("""
+                DELETE FROM overlay_phrase_pool
+                WHERE company_id = %s AND profile_hash <> %s
+            """, (company_id, current_hash))
+            if cursor.rowcount:
+                print(f"[INFO] Company {company_id} profile changed, dropped {cursor.rowcount} pooled phrases")
+            conn.commit()
+
+            phrase = self._claim(cursor, company_id, current_hash)
+            conn.commit()
+
+            if phrase is None:
+                # Empty pool: fill it inline once, then claim
+                self._refill(company_id, profile, current_hash)
+                phrase = self._claim(cursor, company_id, current_hash)
+                conn.commit()
+
+            remaining = self._remaining(cursor, company_id, current_hash)
+            if remaining < self.low_watermark:
+                self.refill_in_background(company_id)
+
+            return phrase
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Overlay phrase pool error for company {company_id}: {e}")
+            return None
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    def _claim(self, cursor, company_id: int, current_hash: str) -> Optional[str]:
+        cursor.execute("""
+            UPDATE overlay_phrase_pool
+            SET used_at = NOW()
+            WHERE id = (
+                SELECT id FROM overlay_phrase_pool
+                WHERE company_id = %s AND profile_hash = %s AND used_at IS NULL
+                ORDER BY id
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING phrase
+        """, (company_id, current_hash))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def _remaining(self, cursor, company_id: int, current_hash: str) -> int:
+        cursor.execute("""
+            SELECT COUNT(*) FROM overlay_phrase_pool
+            WHERE company_id = %s AND profile_hash = %s AND used_at IS NULL
+        """, (company_id, current_hash))
+        return cursor.fetchone()[0]
+
+    def invalidate(self, company_id: int):
+        """Drop every pooled phrase for a company"""
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            cursor.execute("DELETE FROM overlay_phrase_pool WHERE company_id = %s", (company_id,))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Could not invalidate phrase pool for company {company_id}: {e}")
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    # -------- Refilling --------
+    def refill_in_background(self, company_id: int):
+        with self.lock:
+            if company_id in self.refilling:
+                return
+            self.refilling.add(company_id)
+
+        def run():
+            conn = get_db_connection()
+            cursor = get_db_cursor(conn)
+            try:
+                profile = self._fetch_profile(cursor, company_id)
+                if profile:
+                    self._refill(company_id, profile, self.profile_hash(profile))
+            except Exception as e:
+                logger.error(f"Background phrase refill failed for company {company_id}: {e}")
+            finally:
+                cursor.close()
+                release_db_connection(conn)
+                with self.lock:
+                    self.refilling.discard(company_id)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _refill(self, company_id: int, profile: dict, current_hash: str) -> int:
+        """Generate a batch of phrases in one LLM call and store the new ones"""
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            cursor.execute("""
+                SELECT LOWER(phrase) FROM overlay_phrase_pool
+                WHERE company_id = %s AND profile_hash = %s
+            """, (company_id, current_hash))
+            existing = {row[0] for row in cursor.fetchall()}
+
+            phrases = [p for p in self.generate_batch(profile) if p.lower() not in existing]
+            for phrase in phrases:
+                cursor.execute("""
+                    INSERT INTO overlay_phrase_pool (company_id, profile_hash, phrase)
+                    VALUES (%s, %s, %s)
+                """, (company_id, current_hash, phrase))
+            conn.commit()
+            print(f"[INFO] Added {len(phrases)} overlay phrases to the pool for company {company_id}")
+            return len(phrases)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    def generate_batch(self, profile: dict) -> List[str]:
+        prompt = f"""
+        Based on the following company profile, generate {self.batch_size} different compelling overlay texts for social media post images.
+
+        - COMPANY PROFILE - INFO:
+        {{
+            "NAME": "{profile.get('name') or ''}",
+            "SLOGAN": "{profile.get('slogan') or ''}",
+            "DESCRIPTION": "{profile.get('description') or ''}",
+            "PRODUCTS": "{profile.get('products') or ''}",
+            "SERVICES": "{profile.get('services') or ''}",
+            "TARGET AUDIENCE": "{profile.get('target_age_groups') or ''} / {profile.get('target_audience_types') or ''} / {profile.get('target_business_types') or ''} / {profile.get('target_geographics') or ''}",
+            "BRAND TONE": "{profile.get('brand_tone') or ''}",
+            "MARKETING GOALS": "{profile.get('marketing_goals') or ''}"
+        }}
+
+        Requirements for EACH text:
+        - EXACTLY 4 words maximum
+        - Catchy and engaging
+        - Reflects the company's brand and services
+        - Professional but memorable
+        - Action-oriented when possible
+        - All {self.batch_size} texts must be different from each other
+
+        Return only a JSON array of strings, nothing else.
+        """
+
+        completion = self.client.chat.completions.create(
+            model="openai/gpt-oss-120b",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.8,
+            max_completion_tokens=2048,
+            top_p=1,
+            reasoning_effort="low",
+            stream=False,
+            stop=None
+        )
+        return self.parse_phrases(completion.choices[0].message.content)
+
+    @staticmethod
+    def parse_phrases(raw: str) -> List[str]:
+        """Accept a JSON array, falling back to one phrase per line"""
+        raw = (raw or "").strip()
+        try:
+            match = re.search(r"\[.*\]", raw, re.DOTALL)
+            items = json.loads(match.group(0)) if match else []
+        except (ValueError, AttributeError):
+            items = []
+        if not items:
+            items = [re.sub(r"^\s*(\d+[.)]|[-*])\s*", "", line) for line in raw.splitlines()]
+
+        phrases, seen = [], set()
+        for item in items:
+            phrase = str(item).strip().strip('"').strip()
+            words = phrase.split()
+            if not words or len(words) > 4:
+                continue
+            if phrase.lower() in seen:
+                continue
+            seen.add(phrase.lower())
+            phrases.append(phrase)
+        return phrases
+
+
+# Shared pool for the app
+overlay_phrase_pool = OverlayPhrasePool()
@@ -0,0 +1,130 @@
+import asyncio
+import inspect
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StageError(Exception):
+    """Raised when a stage of a StageGraph fails"""
+
+    def __init__(self, stage: str, error: Exception):
+        super().__init__(f"Stage '{stage}' failed: {error}")
+        self.stage = stage
+        self.error = error
+
+
+class Stage:
+    def __init__(self, name: str, func: Callable, deps: Iterable[str], in_thread: bool):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.in_thread = in_thread
+
+
+class StageGraph:
+    """
+    Small dependency-graph executor for request pipelines.
+
+    Each stage is a callable receiving its dependencies' results as keyword
+    arguments. Stages whose dependencies are done start immediately, so
+    independent stages run concurrently: coroutine functions are awaited on
+    the loop, plain functions run in a worker thread (unless in_thread=False,
+    for work that must stay on the loop thread).
+
+    Usage:
+        graph = StageGraph()
+        graph.add("logo", lambda: download(url))
+        graph.add("colors", lambda logo: analyze(logo), deps=["logo"])
+        results = await graph.run()
+        graph.timings  # per-stage start/end/duration in ms
+    """
+
+    def __init__(self, name: str = "pipeline"):
+        self.name = name
+        self.stages: Dict[str, Stage] = {}
+        self.timings: Dict[str, dict] = {}
+        self.total_ms: Optional[float] = None
+
+    def add(self, name: str, func: Callable, deps: Iterable[str] = (), in_thread: bool = True) -> "StageGraph":
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' already defined")
+        self.stages[name] = Stage(name, func, deps, in_thread)
+        return self
+
+    def _check(self):
+        """Reject unknown dependencies and cycles before running anything"""
+        for stage in self.stages.values():
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+
+        visiting, done = set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Cycle detected at stage '{name}'")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    async def run(self) -> Dict[str, Any]:
+        """Run every stage as soon as its dependencies finish; return results by stage name"""
+        self._check()
+        start = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(stage: Stage):
+            kwargs = {}
+            for dep in stage.deps:
+                kwargs[dep] = await tasks[dep]
+
+            started = time.perf_counter()
+            try:
+                if inspect.iscoroutinefunction(stage.func):
+                    result = await stage.func(**kwargs)
+                elif stage.in_thread:
+                    result = await asyncio.to_thread(stage.func, **kwargs)
+                else:
+                    result = stage.func(**kwargs)
+            except StageError:
+                raise
+            except Exception as e:
+                raise StageError(stage.name, e) from e
+            finally:
+                ended = time.perf_counter()
+                self.timings[stage.name] = {
+                    "start_ms": round((started - start) * 1000, 1),
+                    "end_ms": round((ended - start) * 1000, 1),
+                    "duration_ms": round((ended - started) * 1000, 1),
+                }
+            return result
+
+        for stage in self.stages.values():
+            tasks[stage.name] = asyncio.ensure_future(run_stage(stage))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except Exception:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        finally:
+            self.total_ms = round((time.perf_counter() - start) * 1000, 1)
+
+        logger.info(f"{self.name} finished in {self.total_ms}ms: {self.timings}")
+        return {name: task.result() for name, task in tasks.items()}
+
+    def report(self) -> dict:
+        """Timings summary suitable for a JSON response"""
+        return {"total_ms": self.total_ms, "stages": self.timings}
@@ -0,0 +1,79 @@
+import glob
+import logging
+import os
+from typing import Optional
+
+import cv2
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Covers are picked from the first third of the clip, where generated videos
+# show their subject before the fade out, from this many evenly spaced frames
+COVER_WINDOW = 1 / 3
+COVER_CANDIDATES = 8
+SHARPNESS_WIDTH = 320
+
+
+def sharpness(frame: np.ndarray) -> float:
+    """Variance of the Laplacian on a downscaled grey copy (higher = sharper)"""
+    height, width = frame.shape[:2]
+    if width > SHARPNESS_WIDTH:
+        frame = cv2.resize(frame, (SHARPNESS_WIDTH, max(1, height * SHARPNESS_WIDTH // width)),
+                           interpolation=cv2.INTER_AREA)
+    grey = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return float(cv2.Laplacian(grey, cv2.CV_64F).var())
+
+
+class CoverPicker:
+    """
+    Keeps the sharpest of a few evenly spaced frames from the start of a clip,
+    fed from a decode loop that is already running (no second decode).
+    """
+
+    def __init__(self, total_frames: int, candidates: int = COVER_CANDIDATES, window: float = COVER_WINDOW):
+        self.last_frame = max(1, int(total_frames * window))
+        self.step = max(1, self.last_frame // candidates)
+        self.best: Optional[np.ndarray] = None
+        self.best_score = -1.0
+
+    def offer(self, index: int, frame: np.ndarray):
+        if index >= self.last_frame or index % self.step:
+            return
+        score = sharpness(frame)
+        if score > self.best_score:
+            self.best_score = score
+            self.best = frame.copy()
+
+    def save(self, path: str) -> bool:
+        if self.best is None:
+            return False
+        return bool(cv2.imwrite(path, self.best))
+
+
+def cover_filter(duration: float, candidates: int = COVER_CANDIDATES, window: float = COVER_WINDOW) -> str:
+    """ffmpeg filter emitting the candidate frames from the first part of a clip"""
+    span = max(duration * window, 0.1)
+    return f"trim=end={span:.3f},setpts=PTS-STARTPTS,fps={candidates / span:.4f}"
+
+
+def pick_sharpest(candidate_dir: str, output_path: str) -> bool:
+    """Copy the sharpest candidate frame written by ffmpeg to output_path"""
+    best, best_score = None, -1.0
+    for path in sorted(glob.glob(os.path.join(candidate_dir, "*.jpg"))):
+        frame = cv2.imread(path)
+        if frame is None:
+            continue
+        score = sharpness(frame)
+        if score > best_score:
+            best, best_score = frame, score
+    if best is None:
+        logger.warning(f"No cover candidates found in {candidate_dir}")
+        return False
+    return bool(cv2.imwrite(output_path, best))
+
+
+def load_cover(path: str) -> Image.Image:
+    with Image.open(path) as cover:
+        return cover.convert("RGBA")
@@ -0,0 +1,260 @@
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Union
+
+import requests
+
+from config.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Cloudinary needs every chunk but the last to be at least 5 MB
+MIN_CHUNK_BYTES = 5 * 1024 * 1024
+RETRY_STATUSES = (408, 429, 500, 502, 503, 504)
+# A failed chunked upload can be resumed for this long, then it is forgotten
+SESSION_MAX_AGE_SECONDS = 3600
+
+UploadData = Union[str, bytes, io.IOBase]
+ProgressListener = Callable[[dict], None]
+
+
+class UploadError(Exception):
+    """Raised when an upload still fails after its retries"""
+
+
+class UploadSession:
+    """State of one chunked upload, kept so a failed upload can resume"""
+
+    def __init__(self, path: str, total_bytes: int, resource_type: str, public_id: Optional[str]):
+        self.upload_id = uuid.uuid4().hex
+        self.path = path
+        self.total_bytes = total_bytes
+        self.resource_type = resource_type
+        self.public_id = public_id
+        self.next_offset = 0
+        self.updated_at = time.time()
+
+
+class UploadManager:
+    """
+    Uploads media to Cloudinary's upload API.
+
+    Files larger than one chunk use Cloudinary's chunked protocol (one
+    X-Unique-Upload-Id, a Content-Range per chunk). Each chunk is retried on
+    its own with exponential backoff, and a session that still fails is kept
+    so the next upload of the same file resumes from the last acknowledged
+    chunk instead of starting over (under the public_id it started with).
+    Failed sessions are dropped after SESSION_MAX_AGE_SECONDS. A global
+    semaphore caps concurrent uploads across the app, and every chunk emits
+    a progress event to the registered listeners.
+
+    CLOUDINARY_UPLOAD_BASE points it at mocks/object_store_stub.py offline.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff_seconds: float = 1.0,
+        timeout: float = 120,
+    ):
+        self.base_url = (base_url or settings.CLOUDINARY_UPLOAD_BASE).rstrip("/")
+        self.chunk_size = max(MIN_CHUNK_BYTES, chunk_size or settings.UPLOAD_CHUNK_MB * 1024 * 1024)
+        self.max_retries = settings.UPLOAD_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(max_concurrency or settings.UPLOAD_MAX_CONCURRENCY)
+        self.session = requests.Session()
+        self.sessions: Dict[str, UploadSession] = {}
+        self.listeners: List[ProgressListener] = []
+        self.lock = threading.Lock()
+
+    # -------- Progress --------
+    def add_listener(self, listener: ProgressListener):
+        self.listeners.append(listener)
+
+    def _emit(self, event: dict, on_progress: Optional[ProgressListener] = None):
+        total = event.get("total_bytes") or 0
+        event["percent"] = round(100 * event.get("bytes_sent", 0) / total, 1) if total else None
+        for listener in self.listeners + ([on_progress] if on_progress else []):
+            try:
+                listener(dict(event))
+            except Exception as e:
+                logger.warning(f"Upload progress listener failed: {e}")
+
+    # -------- Requests --------
+    def _upload_url(self, resource_type: str) -> str:
+        return f"{self.base_url}/v1_1/{settings.CLOUDINARY_CLOUD_NAME}/{resource_type}/upload"
+
+    def _signed_params(self, params: dict) -> dict:
+        """Signed upload parameters (same signature scheme as cloudinary.utils.api_sign_request)"""
+        signed = {key: value for key, value in params.items() if value not in (None, "")}
+        signed["timestamp"] = str(int(time.time()))
+        to_sign = "&".join(f"{key}={signed[key]}" for key in sorted(signed))
+        signed["signature"] = hashlib.sha1(f"{to_sign}{settings.CLOUDINARY_API_SECRET}".encode()).hexdigest()
+        signed["api_key"] = settings.CLOUDINARY_API_KEY
+        return signed
+
+    def _post(self, url: str, params: dict, filename: str, payload: bytes,
+              headers: Optional[dict] = None, on_retry: Optional[Callable[[int, str], None]] = None) -> dict:
+        """POST one request, retrying network errors, 429 and 5xx with exponential backoff"""
+        for attempt in range(self.max_retries + 1):
+            error = None
+            try:
+                response = self.session.post(
+                    url,
+                    data=self._signed_params(params),
+                    files={"file": (filename, payload)},
+                    headers=headers or {},
+                    timeout=self.timeout,
+                )
+                if response.status_code not in RETRY_STATUSES:
+                    if response.status_code >= 400:
+                        raise UploadError(f"Upload rejected ({response.status_code}): {response.text[:300]}")
+                    return response.json()
+                error = f"HTTP {response.status_code}"
+                retry_after = response.headers.get("Retry-After")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = str(e)
+                retry_after = None
+
+            if attempt == self.max_retries:
+                raise UploadError(f"Upload failed after {attempt + 1} attempts: {error}")
+
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else \
+                self.backoff_seconds * (2 ** attempt) * (0.5 + random.random())
+            if on_retry:
+                on_retry(attempt + 1, error)
+            logger.warning(f"Upload attempt {attempt + 1} failed ({error}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+    # -------- Uploads --------
+    def upload(self, data: UploadData, resource_type: str = "image", public_id: Optional[str] = None,
+               params: Optional[dict] = None, on_progress: Optional[ProgressListener] = None) -> dict:
+        """
+        Upload a file path, bytes or a file-like object; returns Cloudinary's
+        response (secure_url, public_id, ...). Blocks while the global
+        concurrency cap is reached.
+        """
+        with self.slots:
+            if isinstance(data, str):
+                if os.path.getsize(data) > self.chunk_size:
+                    return self._upload_chunked(data, resource_type, public_id, params, on_progress)
+                with open(data, "rb") as file:
+                    payload, filename = file.read(), os.path.basename(data)
+            elif isinstance(data, (bytes, bytearray)):
+                payload, filename = bytes(data), public_id or "upload"
+            else:
+                payload, filename = data.read(), public_id or "upload"
+            return self._upload_single(payload, filename, resource_type, public_id, params, on_progress)
+
+    def _upload_single(self, payload: bytes, filename: str, resource_type: str, public_id: Optional[str],
+                       params: Optional[dict], on_progress: Optional[ProgressListener]) -> dict:
+        upload_id = uuid.uuid4().hex
+        event = {"upload_id": upload_id, "public_id": public_id, "resource_type": resource_type,
+                 "bytes_sent": 0, "total_bytes": len(payload), "status": "uploading"}
+        self._emit(dict(event), on_progress)
+
+        def on_retry(attempt, error):
+            self._emit(dict(event, status="retrying", attempt=attempt, error=error), on_progress)
+
+        try:
+            result = self._post(self._upload_url(resource_type), {"public_id": public_id, **(params or {})},
+                                filename, payload, on_retry=on_retry)
+        except Exception as e:
+            self._emit(dict(event, status="failed", error=str(e)), on_progress)
+            raise
+        self._emit(dict(event, bytes_sent=len(payload), status="completed", url=result.get("secure_url")),
+                   on_progress)
+        return result
+
+    def _resume_key(self, path: str, resource_type: str) -> str:
+        """
+        The file's content: callers may copy the same video to a new path and
+        pick a new public_id for each attempt, and should still resume.
+        """
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for block in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(block)
+        return f"{resource_type}:{os.path.getsize(path)}:{digest.hexdigest()}"
+
+    def _prune_sessions(self):
+        """Forget failed sessions that are too old to resume (call with the lock held)"""
+        cutoff = time.time() - SESSION_MAX_AGE_SECONDS
+        for key in [key for key, session in self.sessions.items() if session.updated_at < cutoff]:
+            del self.sessions[key]
+
+    def _upload_chunked(self, path: str, resource_type: str, public_id: Optional[str],
+                        params: Optional[dict], on_progress: Optional[ProgressListener]) -> dict:
+        key = self._resume_key(path, resource_type)
+        with self.lock:
+            self._prune_sessions()
+            session = self.sessions.get(key)
+            if session is None:
+                session = UploadSession(path, os.path.getsize(path), resource_type, public_id)
+                self.sessions[key] = session
+            elif session.next_offset:
+                print(f"[INFO] Resuming upload of {os.path.basename(path)} at byte {session.next_offset}")
+        # The chunks already sent belong to the session's public_id
+        public_id = session.public_id
+
+        event = {"upload_id": session.upload_id, "public_id": public_id, "resource_type": resource_type,
+                 "bytes_sent": session.next_offset, "total_bytes": session.total_bytes, "status": "uploading"}
+        self._emit(dict(event), on_progress)
+
+        def on_retry(attempt, error):
+            self._emit(dict(event, status="retrying", attempt=attempt, error=error), on_progress)
+
+        result = None
+        try:
+            with open(path, "rb") as file:
+                while session.next_offset < session.total_bytes:
+                    file.seek(session.next_offset)
+                    chunk = file.read(self.chunk_size)
+                    end = session.next_offset + len(chunk) - 1
+                    headers = {
+                        "X-Unique-Upload-Id": session.upload_id,
+                        "Content-Range": f"bytes {session.next_offset}-{end}/{session.total_bytes}",
+                    }
+                    result = self._post(self._upload_url(resource_type), {"public_id": public_id, **(params or {})},
+                                        os.path.basename(path), chunk, headers, on_retry)
+                    # Only advance once the chunk is acknowledged, so a failure resumes here
+                    session.next_offset = end + 1
+                    session.updated_at = time.time()
+                    event["bytes_sent"] = session.next_offset
+                    self._emit(dict(event), on_progress)
+        except Exception as e:
+            # Keep the session: the next upload of this file resumes from next_offset
+            self._emit(dict(event, status="failed", error=str(e)), on_progress)
+            raise
+
+        with self.lock:
+            self.sessions.pop(key, None)
+        if not result or not result.get("secure_url"):
+            raise UploadError(f"Chunked upload of {path} finished without a URL")
+        self._emit(dict(event, status="completed", url=result["secure_url"]), on_progress)
+        return result
+
+    # -------- Async helpers --------
+    async def upload_async(self, data: UploadData, resource_type: str = "image", public_id: Optional[str] = None,
+                           params: Optional[dict] = None, on_progress: Optional[ProgressListener] = None) -> dict:
+        """upload() in a worker thread, for async endpoints"""
+        return await asyncio.to_thread(self.upload, data, resource_type, public_id, params, on_progress)
+
+    async def upload_many(self, uploads: List[dict]) -> List[dict]:
+        """Upload several items in parallel (each a dict of upload() kwargs), within the global cap"""
+        return await asyncio.gather(*[self.upload_async(**item) for item in uploads])
+
+
+# Shared upload manager for the app
+upload_manager = UploadManager()
@@ -0,0 +1,101 @@
+import logging
+import math
+import os
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class VideoEncodingProfile:
+    """
+    H.264 settings for one destination.
+
+    CRF keeps quality constant while maxrate/bufsize cap the peaks, so short
+    generated clips come out well under the platform's limits; a fixed
+    keyframe interval (scene-cut keyframes off) gives the platforms' own
+    transcoders clean GOPs to work with.
+
+    size is the preferred frame; alt_sizes are other frames the platform
+    shows as well, and size_for() picks whichever is closest to the source's
+    aspect ratio so a vertical clip is not pillarboxed into a 4:5 frame.
+    """
+
+    def __init__(self, name: str, size: Tuple[int, int], crf: int, max_bitrate_kbps: int,
+                 keyframe_seconds: float = 2.0, preset: str = "fast",
+                 max_bytes: Optional[int] = None, max_seconds: Optional[float] = None,
+                 alt_sizes: Tuple[Tuple[int, int], ...] = ()):
+        self.name = name
+        self.size = size
+        self.alt_sizes = alt_sizes
+        self.crf = crf
+        self.max_bitrate_kbps = max_bitrate_kbps
+        self.keyframe_seconds = keyframe_seconds
+        self.preset = preset
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+
+    def size_for(self, width: int, height: int) -> Tuple[int, int]:
+        """The frame whose aspect ratio is closest to a width x height source"""
+        if not width or not height:
+            return self.size
+        aspect = width / height
+        return min((self.size, *self.alt_sizes), key=lambda size: abs(math.log(size[0] / size[1] / aspect)))
+
+    def codec_args(self, fps: float, max_bitrate_kbps: Optional[int] = None) -> List[str]:
+        gop = max(1, round(fps * self.keyframe_seconds))
+        max_bitrate_kbps = max_bitrate_kbps or self.max_bitrate_kbps
+        return [
+            "-c:v", "libx264",
+            "-preset", self.preset,
+            "-crf", str(self.crf),
+            "-maxrate", f"{max_bitrate_kbps}k",
+            "-bufsize", f"{max_bitrate_kbps * 2}k",
+            "-g", str(gop),
+            "-keyint_min", str(gop),
+            "-sc_threshold", "0",
+            "-profile:v", "high",
+            # 0 = one x264 thread per core
+            "-threads", "0",
+        ]
+
+    def fits(self, path: str, duration: Optional[float] = None) -> bool:
+        """Check a finished file against the platform limits"""
+        if self.max_bytes and os.path.getsize(path) > self.max_bytes:
+            return False
+        if self.max_seconds and duration and duration > self.max_seconds:
+            return False
+        return True
+
+    def bitrate_budget_kbps(self, duration: float, audio_kbps: int = 128) -> Optional[int]:
+        """Video bitrate cap that keeps a duration-long file under max_bytes (5% headroom)"""
+        if not self.max_bytes or not duration:
+            return None
+        budget = self.max_bytes * 8 * 0.95 / duration / 1000 - audio_kbps
+        return max(100, min(self.max_bitrate_kbps, int(budget)))
+
+
+# Reels are full-screen 9:16; Facebook and LinkedIn feeds show 4:5 portrait
+# video largest, and also take full 9:16 and 16:9 video, so vertical and
+# landscape clips keep their own shape. Limits are the Graph/LinkedIn API
+# upload limits.
+PLATFORM_VIDEO_PROFILES = {
+    "instagram": VideoEncodingProfile(
+        "instagram_reels", (1080, 1920), crf=23, max_bitrate_kbps=6000,
+        max_bytes=300 * 1024 * 1024, max_seconds=90,
+    ),
+    "facebook": VideoEncodingProfile(
+        "facebook_feed", (1080, 1350), crf=23, max_bitrate_kbps=5000,
+        max_bytes=1024 * 1024 * 1024, max_seconds=240,
+        alt_sizes=((1080, 1920), (1920, 1080)),
+    ),
+    "linkedin": VideoEncodingProfile(
+        "linkedin_feed", (1080, 1350), crf=24, max_bitrate_kbps=5000,
+        max_bytes=200 * 1024 * 1024, max_seconds=600,
+        alt_sizes=((1080, 1920), (1920, 1080)),
+    ),
+}
+
+
+def get_video_profile(platform: Optional[str]) -> Optional[VideoEncodingProfile]:
+    """Encoding profile for a platform, or None to keep the source size and default settings"""
+    return PLATFORM_VIDEO_PROFILES.get((platform or "").lower())
@@ -0,0 +1,280 @@
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from typing import List, Optional, Tuple
+
+import cv2
+from PIL import Image
+
+from components.media.video_processing import create_enhanced_video, add_background_music
+from components.media.frame_processor import create_enhanced_video_optimized
+from components.media.ffmpeg_tools import get_ffmpeg_path, ffmpeg_available
+from components.media.audio_beds import audio_bed_cache
+from components.media.video_encoding import VideoEncodingProfile
+from components.media.reel_cover import cover_filter, pick_sharpest
+
+logger = logging.getLogger(__name__)
+
+BG_MUSIC_PATH = "./sounds/bg_music.mp3"
+
+# Same look as the OpenCV path: 1s fade out of the clip, then a 2s white
+# logo card fading in/out over 0.5s, with the music at 30% volume
+FADE_OUT_SECONDS = 1.0
+OUTRO_SECONDS = 2.0
+OUTRO_FADE_SECONDS = 0.5
+LOGO_MAX_RATIO = 0.4
+MUSIC_VOLUME = 0.3
+
+
+class VideoLimitError(Exception):
+    """Raised when a finished video cannot fit a platform profile's length or size limits"""
+
+
+def probe_video(video_path: str) -> Optional[dict]:
+    """Read size, fps and duration from the container (no frames are decoded)"""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25
+        frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        return {
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "fps": fps,
+            "duration": frame_count / fps if frame_count else 0,
+        }
+    finally:
+        cap.release()
+
+
+def _fit_logo(logo_path: str, width: int, height: int):
+    """Logo size inside the 40% box, only ever shrinking it (like thumbnail())"""
+    with Image.open(logo_path) as logo:
+        lw, lh = logo.size
+    scale = min(1.0, (width * LOGO_MAX_RATIO) / lw, (height * LOGO_MAX_RATIO) / lh)
+    # x264/yuv420p needs even dimensions on the overlay too
+    return max(2, int(lw * scale) // 2 * 2), max(2, int(lh * scale) // 2 * 2)
+
+
+def build_finishing_command(
+    video_path: str,
+    output_path: str,
+    probe: dict,
+    logo_path: Optional[str] = None,
+    music_path: Optional[str] = None,
+    video_codec_args: Optional[List[str]] = None,
+    audio_bed_path: Optional[str] = None,
+    target_size: Optional[Tuple[int, int]] = None,
+    cover_dir: Optional[str] = None,
+) -> List[str]:
+    """
+    Build one ffmpeg invocation that fades out the clip, appends the logo
+    outro with its fades, loops/trims/levels the music and encodes H.264/AAC.
+    With a pre-mixed audio bed the AAC bed is stream-copied instead. With a
+    target size the clip is scaled and letterboxed to it, and the outro is
+    rendered at that size. With a cover_dir, candidate cover frames from the
+    start of the clip are written there from the same decode.
+    """
+    width, height = target_size or (probe["width"], probe["height"])
+    fps = probe["fps"]
+    duration = probe["duration"]
+    has_outro = bool(logo_path and os.path.exists(logo_path))
+    total = duration + (OUTRO_SECONDS if has_outro else 0)
+    fade_start = max(0.0, duration - FADE_OUT_SECONDS)
+
+    cmd = [get_ffmpeg_path() or "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+           "-i", video_path]
+    resize = ""
+    if target_size:
+        resize = (f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                  f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:color=black,")
+    source = "[0:v]"
+    filters = []
+    if cover_dir:
+        filters.append("[0:v]split=2[src][cov]")
+        filters.append(f"[cov]{cover_filter(duration)}[cover]")
+        source = "[src]"
+    filters += [
+        f"{source}{resize}fade=t=out:st={fade_start:.3f}:d={FADE_OUT_SECONDS},setsar=1,format=yuv420p[main]"
+    ]
+    video_out = "[main]"
+    next_input = 1
+
+    if has_outro:
+        logo_w, logo_h = _fit_logo(logo_path, width, height)
+        cmd += ["-f", "lavfi", "-i", f"color=c=white:s={width}x{height}:r={fps:.3f}:d={OUTRO_SECONDS}",
+                "-loop", "1", "-framerate", f"{fps:.3f}", "-t", str(OUTRO_SECONDS), "-i", logo_path]
+        bg_index, logo_index = next_input, next_input + 1
+        next_input += 2
+        filters += [
+            f"[{logo_index}:v]scale={logo_w}:{logo_h},format=rgba[logo]",
+            f"[{bg_index}:v][logo]overlay=(W-w)/2:(H-h)/2:shortest=1,"
+            f"fade=t=in:st=0:d={OUTRO_FADE_SECONDS},"
+            f"fade=t=out:st={OUTRO_SECONDS - OUTRO_FADE_SECONDS}:d={OUTRO_FADE_SECONDS},"
+            f"setsar=1,format=yuv420p[outro]",
+            "[main][outro]concat=n=2:v=1:a=0[v]",
+        ]
+        video_out = "[v]"
+
+    audio_out = None
+    audio_args = []
+    if audio_bed_path and os.path.exists(audio_bed_path):
+        # Already looped, levelled and AAC encoded: just mux it
+        cmd += ["-i", audio_bed_path]
+        audio_out = f"{next_input}:a"
+        audio_args = ["-c:a", "copy"]
+        next_input += 1
+    elif music_path and os.path.exists(music_path):
+        cmd += ["-stream_loop", "-1", "-i", music_path]
+        filters.append(
+            f"[{next_input}:a]atrim=0:{total:.3f},asetpts=N/SR/TB,volume={MUSIC_VOLUME}[a]"
+        )
+        audio_out = "[a]"
+        audio_args = ["-c:a", "aac", "-b:a", "128k"]
+        next_input += 1
+
+    cmd += ["-filter_complex", ";".join(filters), "-map", video_out]
+    if audio_out:
+        cmd += ["-map", audio_out] + audio_args
+
+    cmd += video_codec_args or ["-c:v", "libx264", "-preset", "fast", "-crf", "23", "-threads", "0"]
+    cmd += ["-pix_fmt", "yuv420p", "-movflags", "+faststart", "-t", f"{total:.3f}", output_path]
+    if cover_dir:
+        # Second output of the same pass: a handful of JPEG cover candidates
+        cmd += ["-map", "[cover]", "-vsync", "vfr", "-q:v", "2", os.path.join(cover_dir, "cover_%02d.jpg")]
+    return cmd
+
+
+def finish_video(
+    video_path: str,
+    logo_path: Optional[str],
+    output_path: str,
+    music_path: Optional[str] = BG_MUSIC_PATH,
+    video_codec_args: Optional[List[str]] = None,
+    use_audio_bed: bool = True,
+    profile: Optional[VideoEncodingProfile] = None,
+    cover_path: Optional[str] = None,
+) -> bool:
+    """
+    Fade out, add the logo outro and background music in a single ffmpeg pass.
+    A platform profile sets the output size and the H.264 rate control. A
+    result over the profile's size limit is encoded once more with a bitrate
+    cap that fits; if it still does not fit (or is too long) VideoLimitError
+    is raised. False means ffmpeg itself could not finish the video.
+    With a cover_path, the sharpest early frame is saved there as the cover.
+    """
+    if not ffmpeg_available():
+        print("⚠️  ffmpeg not available, cannot use single-pass finishing")
+        return False
+
+    probe = probe_video(video_path)
+    if not probe or not probe["duration"]:
+        print("❌ Error: Could not read video properties")
+        return False
+
+    has_outro = bool(logo_path and os.path.exists(logo_path))
+    total = probe["duration"] + (OUTRO_SECONDS if has_outro else 0)
+    if profile and profile.max_seconds and total > profile.max_seconds:
+        raise VideoLimitError(f"Video is {total:.0f}s, longer than {profile.name} allows ({profile.max_seconds:.0f}s)")
+
+    audio_bed_path = None
+    if use_audio_bed and music_path:
+        audio_bed_path = audio_bed_cache.get_bed(music_path, total)
+
+    target_size = None
+    profile_codec_args = False
+    if profile:
+        target_size = profile.size_for(probe["width"], probe["height"])
+        profile_codec_args = video_codec_args is None
+        video_codec_args = video_codec_args or profile.codec_args(probe["fps"])
+
+    cover_dir = tempfile.mkdtemp(prefix="cover_") if cover_path else None
+    cmd = build_finishing_command(video_path, output_path, probe, logo_path, music_path,
+                                  video_codec_args, audio_bed_path, target_size, cover_dir)
+    print(f"Finishing video in one ffmpeg pass: {probe['width']}x{probe['height']} at {probe['fps']:.2f} FPS, {probe['duration']:.2f}s"
+          + (f" -> {profile.name} {target_size[0]}x{target_size[1]}" if profile else ""))
+
+    started = time.perf_counter()
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"❌ ffmpeg finishing failed: {result.stderr.strip()[-2000:]}")
+            return False
+        if cover_dir and not pick_sharpest(cover_dir, cover_path):
+            print("⚠️  Could not extract a cover frame")
+    finally:
+        if cover_dir:
+            shutil.rmtree(cover_dir, ignore_errors=True)
+
+    print(f"🎉 Video finished in {time.perf_counter() - started:.2f}s: '{output_path}' "
+          f"({os.path.getsize(output_path) / 1024 / 1024:.1f} MB)")
+    if not profile:
+        return True
+
+    if not profile.fits(output_path, total) and profile_codec_args:
+        budget = profile.bitrate_budget_kbps(total)
+        print(f"⚠️  Finished video exceeds the {profile.name} size limit, re-encoding at {budget}k")
+        cmd = build_finishing_command(video_path, output_path, probe, logo_path, music_path,
+                                      profile.codec_args(probe["fps"], budget), audio_bed_path, target_size)
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"❌ ffmpeg re-encode failed: {result.stderr.strip()[-2000:]}")
+            return False
+    if not profile.fits(output_path, total):
+        os.remove(output_path)
+        raise VideoLimitError(f"Finished video exceeds the {profile.name} upload limits")
+    return True
+
+
+def legacy_finish_video(video_path: str, logo_path: Optional[str], output_path: str,
+                        music_path: Optional[str] = BG_MUSIC_PATH, optimized: bool = True,
+                        cover_path: Optional[str] = None) -> bool:
+    """The two-transcode path: OpenCV fades/outro to mp4v, then moviepy music mix to H.264"""
+    enhanced_video_path = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4").name
+    try:
+        if optimized:
+            success = create_enhanced_video_optimized(video_path, logo_path, enhanced_video_path,
+                                                      cover_path=cover_path)
+        else:
+            success = create_enhanced_video(video_path, logo_path, enhanced_video_path)
+
+        if music_path and os.path.exists(music_path):
+            print("Adding background music...")
+            add_background_music(enhanced_video_path, music_path, output_path)
+        else:
+            print("⚠️  Background music file not found, proceeding without music")
+            shutil.copy2(enhanced_video_path, output_path)
+        return success
+    finally:
+        if os.path.exists(enhanced_video_path):
+            os.remove(enhanced_video_path)
+
+
+def postprocess_video(video_path: str, logo_path: Optional[str], output_path: str,
+                      music_path: Optional[str] = BG_MUSIC_PATH,
+                      profile: Optional[VideoEncodingProfile] = None,
+                      cover_path: Optional[str] = None) -> bool:
+    """
+    Single-pass ffmpeg finishing, falling back to the OpenCV/moviepy path
+    only when ffmpeg is missing or fails. A video that cannot fit the
+    profile's upload limits fails straight away, and a fallback result
+    outside them is a failure too.
+    """
+    try:
+        if ffmpeg_available() and finish_video(video_path, logo_path, output_path, music_path,
+                                               profile=profile, cover_path=cover_path):
+            return True
+    except VideoLimitError as e:
+        print(f"❌ {e}")
+        return False
+    print("Falling back to OpenCV/moviepy video finishing...")
+    success = legacy_finish_video(video_path, logo_path, output_path, music_path, cover_path=cover_path)
+    probe = probe_video(output_path) if success and profile else None
+    if probe and not profile.fits(output_path, probe["duration"]):
+        print(f"❌ Finished video exceeds the {profile.name} upload limits")
+        return False
+    return success
@@ -0,0 +1,465 @@
+import asyncio
+import logging
+import os
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+from urllib.parse import urlencode
+
+import requests
+
+from config.config import get_db_connection, get_db_cursor, release_db_connection, settings
+
+logger = logging.getLogger(__name__)
+
+VIDEO_MODEL = "minimax/video-01"
+
+# Job lifecycle: queued -> starting/processing (prediction running on Replicate)
+# -> finishing (post-processing in a worker) -> completed | failed
+PREDICTION_STATUSES = ("starting", "processing")
+FAILED_PREDICTION_STATUSES = ("failed", "canceled")
+# A 'finishing' job whose worker stops renewing this lease (crash, restart) is
+# handed back to polling by whichever replica sees it expire first
+FINISH_LEASE_SECONDS = 600
+
+JOB_FIELDS = [
+    "id", "content_id", "user_id", "company_id", "platform", "content_type",
+    "prompt", "logo_url", "prediction_id", "status", "media_url", "cover_url", "error",
+    "created_at", "updated_at",
+]
+
+
+class ReplicateClient:
+    """
+    Minimal client for the Replicate predictions HTTP API.
+
+    Unlike replicate.run(), creating a prediction returns immediately; the
+    result is picked up later by polling or through a webhook. The base URL
+    comes from REPLICATE_API_BASE so the local stand-in (mocks/replicate_stub.py)
+    can be used offline.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, api_token: Optional[str] = None, timeout: float = 30):
+        self.base_url = (base_url or settings.REPLICATE_API_BASE).rstrip("/")
+        self.api_token = api_token
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _headers(self) -> dict:
+        token = self.api_token or os.environ.get("REPLICATE_API_TOKEN", "")
+        return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+
+    def create_prediction(self, model: str, input: dict, webhook: Optional[str] = None) -> dict:
+        payload = {"input": input}
+        if webhook:
+            payload["webhook"] = webhook
+            payload["webhook_events_filter"] = ["completed"]
+        response = self.session.post(
+            f"{self.base_url}/v1/models/{model}/predictions",
+            json=payload,
+            headers=self._headers(),
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def get_prediction(self, prediction_id: str) -> dict:
+        response = self.session.get(
+            f"{self.base_url}/v1/predictions/{prediction_id}",
+            headers=self._headers(),
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def output_url(prediction: dict) -> Optional[str]:
+        """minimax/video-01 returns a single URL; other models return a list"""
+        output = prediction.get("output")
+        if isinstance(output, list):
+            output = output[-1] if output else None
+        return str(output) if output else None
+
+
+class VideoJobManager:
+    """
+    Asynchronous video generation jobs.
+
+    submit() records a job, creates the Replicate prediction and returns right
+    away. Predictions are then tracked in the background, either by the poll
+    loop or by Replicate calling the webhook, and once one succeeds the
+    finisher (download, logo outro, music, upload) runs in a worker thread and
+    the content item's media_link is updated. Job state lives in the
+    video_jobs table, so jobs survive a restart.
+
+    finisher(job, video_url) must return {"media_url": ..., "cover_url": ...}
+    (cover_url may be None) or raise.
+    """
+
+    def __init__(
+        self,
+        finisher: Callable[[dict, str], dict],
+        client: Optional[ReplicateClient] = None,
+        poll_interval: Optional[float] = None,
+        workers: Optional[int] = None,
+    ):
+        self.finisher = finisher
+        self.client = client or ReplicateClient()
+        self.poll_interval = poll_interval or settings.VIDEO_JOB_POLL_SECONDS
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers or settings.VIDEO_JOB_WORKERS,
+            thread_name_prefix="video-job",
+        )
+        self.poll_task: Optional[asyncio.Task] = None
+
+    def ensure_schema(self):
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS video_jobs (
+                    id SERIAL PRIMARY KEY,
+                    content_id INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    company_id INTEGER,
+                    platform VARCHAR(50),
+                    content_type VARCHAR(100),
+                    prompt TEXT,
+                    logo_url TEXT,
+                    prediction_id VARCHAR(100),
+                    webhook_token VARCHAR(64) NOT NULL,
+                    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+                    media_url TEXT,
+                    error TEXT,
+                    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+                )
+            """)
+            cursor.execute("ALTER TABLE video_jobs ADD COLUMN IF NOT EXISTS cover_url TEXT")
+            cursor.execute("ALTER TABLE video_jobs ADD COLUMN IF NOT EXISTS locked_until TIMESTAMP")
+            # Reel cover shown by Instagram, set when a reel finishes
+            cursor.execute("ALTER TABLE content_items ADD COLUMN IF NOT EXISTS cover_link TEXT")
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_video_jobs_status
+                ON video_jobs (status)
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_video_jobs_prediction
+                ON video_jobs (prediction_id)
+            """)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Could not create video_jobs table: {e}")
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    # -------- Job records --------
+    def _update(self, job_id: int, **fields):
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            assignments = ", ".join(f"{name} = %s" for name in fields)
+            cursor.execute(
+                f"UPDATE video_jobs SET {assignments}, updated_at = NOW() WHERE id = %s",
+                (*fields.values(), job_id),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    def get(self, job_id: int, user_id: Optional[int] = None) -> Optional[dict]:
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            query = f"SELECT {', '.join(JOB_FIELDS)} FROM video_jobs WHERE id = %s"
+            params = [job_id]
+            if user_id is not None:
+                query += " AND user_id = %s"
+                params.append(user_id)
+            cursor.execute(query, params)
+            row = cursor.fetchone()
+            return dict(zip(JOB_FIELDS, row)) if row else None
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    @staticmethod
+    def to_response(job: dict) -> dict:
+        """Job record as JSON-safe data (prompt and secrets left out)"""
+        data = {field: job.get(field) for field in JOB_FIELDS if field not in ("prompt", "logo_url")}
+        for field in ("created_at", "updated_at"):
+            if data.get(field):
+                data[field] = data[field].isoformat()
+        return data
+
+    def _webhook_url(self, job_id: int, token: str) -> Optional[str]:
+        base = settings.VIDEO_JOB_WEBHOOK_URL
+        if not base:
+            return None
+        return f"{base}?{urlencode({'job_id': job_id, 'token': token})}"
+
+    # -------- Submitting --------
+    def submit(self, content_id: int, user_id: int, company_id: int, platform: str,
+               content_type: str, prompt: str, logo_url: Optional[str]) -> dict:
+        """Create the job and its Replicate prediction; returns the job record"""
+        token = secrets.token_hex(16)
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            cursor.execute("""
+                INSERT INTO video_jobs (content_id, user_id, company_id, platform, content_type,
+                                        prompt, logo_url, webhook_token)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                RETURNING id
+            """, (content_id, user_id, company_id, platform, content_type, prompt, logo_url, token))
+            job_id = cursor.fetchone()[0]
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+        try:
+            prediction = self.client.create_prediction(
+                VIDEO_MODEL,
+                {"prompt": prompt},
+                webhook=self._webhook_url(job_id, token),
+            )
+        except Exception as e:
+            self._update(job_id, status="failed", error=f"Could not create prediction: {e}")
+            raise
+
+        self._update(job_id, prediction_id=prediction["id"])
+        self._set_active_status(job_id, "starting")
+        if prediction.get("status") not in PREDICTION_STATUSES:
+            # Already finished (cached prediction or a very fast stand-in)
+            self.handle_prediction(job_id, prediction)
+        print(f"[INFO] Video job {job_id} submitted, prediction {prediction['id']}")
+        return self.get(job_id)
+
+    # -------- Prediction updates --------
+    def verify_webhook(self, job_id: int, token: str) -> bool:
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            cursor.execute("SELECT webhook_token FROM video_jobs WHERE id = %s", (job_id,))
+            row = cursor.fetchone()
+            return bool(row) and secrets.compare_digest(row[0], token or "")
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    def handle_prediction(self, job_id: int, prediction: dict):
+        """Apply a prediction state (from a poll or a webhook) to its job"""
+        status = prediction.get("status")
+
+        if status == "succeeded":
+            video_url = self.client.output_url(prediction)
+            if not video_url:
+                self._set_active_status(job_id, "failed", "Prediction returned no output")
+                return
+            job = self._claim_for_finishing(job_id)
+            if job:
+                self.executor.submit(self._finish, job, video_url)
+        elif status in FAILED_PREDICTION_STATUSES:
+            error = prediction.get("error") or f"Prediction {status}"
+            if self._set_active_status(job_id, "failed", str(error)):
+                print(f"❌ Video job {job_id} failed: {error}")
+        elif status in PREDICTION_STATUSES:
+            self._set_active_status(job_id, status)
+
+    def _set_active_status(self, job_id: int, status: str, error: Optional[str] = None) -> bool:
+        """Update a job still waiting on its prediction; late or repeated updates are ignored"""
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            cursor.execute("""
+                UPDATE video_jobs
+                SET status = %s, error = %s, updated_at = NOW()
+                WHERE id = %s AND status IN ('queued', 'starting', 'processing')
+            """, (status, error, job_id))
+            conn.commit()
+            return cursor.rowcount > 0
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    def _claim_for_finishing(self, job_id: int) -> Optional[dict]:
+        """
+        Move a job to 'finishing' unless something else already did, so a
+        webhook and the poll loop seeing the same prediction only finish once.
+        The caller holds the job for FINISH_LEASE_SECONDS and must renew it.
+        """
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            cursor.execute(f"""
+                UPDATE video_jobs
+                SET status = 'finishing', updated_at = NOW(),
+                    locked_until = NOW() + INTERVAL '{FINISH_LEASE_SECONDS} seconds'
+                WHERE id = %s AND status IN ('queued', 'starting', 'processing')
+                RETURNING {', '.join(JOB_FIELDS)}
+            """, (job_id,))
+            row = cursor.fetchone()
+            conn.commit()
+            return dict(zip(JOB_FIELDS, row)) if row else None
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    def _keep_lease(self, job_id: int, done: threading.Event):
+        """Keep the finishing lease alive until done is set"""
+        while not done.wait(FINISH_LEASE_SECONDS / 3):
+            try:
+                self._renew_lease(job_id)
+            except Exception as e:
+                logger.error(f"Could not renew the lease of video job {job_id}: {e}")
+
+    def _renew_lease(self, job_id: int):
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            cursor.execute(f"""
+                UPDATE video_jobs
+                SET locked_until = NOW() + INTERVAL '{FINISH_LEASE_SECONDS} seconds'
+                WHERE id = %s AND status = 'finishing'
+            """, (job_id,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    def _finish(self, job: dict, video_url: str):
+        """Worker: post-process the generated video and attach it to the content item"""
+        job_id = job["id"]
+        done = threading.Event()
+        threading.Thread(target=self._keep_lease, args=(job_id, done), daemon=True,
+                         name=f"video-job-{job_id}-lease").start()
+        try:
+            print(f"[INFO] Finishing video job {job_id}...")
+            result = self.finisher(job, video_url) or {}
+            media_url, cover_url = result.get("media_url"), result.get("cover_url")
+            if not media_url:
+                raise RuntimeError("Video post-processing failed")
+
+            conn = get_db_connection()
+            cursor = get_db_cursor(conn)
+            try:
+                cursor.execute("""
+                    UPDATE content_items
+                    SET media_link = %s, cover_link = %s
+                    WHERE id = %s
+                """, (media_url, cover_url, job["content_id"]))
+                cursor.execute("""
+                    UPDATE video_jobs
+                    SET status = 'completed', media_url = %s, cover_url = %s, error = NULL,
+                        locked_until = NULL, updated_at = NOW()
+                    WHERE id = %s
+                """, (media_url, cover_url, job_id))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+                release_db_connection(conn)
+
+            print(f"✅ Video job {job_id} completed: {media_url}")
+        except Exception as e:
+            logger.error(f"Video job {job_id} failed during finishing: {e}", exc_info=True)
+            try:
+                self._update(job_id, status="failed", error=str(e), locked_until=None)
+            except Exception as update_error:
+                logger.error(f"Could not mark video job {job_id} as failed: {update_error}")
+        finally:
+            done.set()
+
+    # -------- Polling --------
+    def _active_jobs(self) -> list:
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            cursor.execute("""
+                SELECT id, prediction_id FROM video_jobs
+                WHERE status IN ('starting', 'processing') AND prediction_id IS NOT NULL
+                ORDER BY id
+            """)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    def poll_once(self):
+        self._requeue_interrupted()
+        for job_id, prediction_id in self._active_jobs():
+            try:
+                self.handle_prediction(job_id, self.client.get_prediction(prediction_id))
+            except Exception as e:
+                logger.error(f"Could not poll prediction {prediction_id} for video job {job_id}: {e}")
+
+    def _requeue_interrupted(self):
+        """
+        Jobs whose finishing lease ran out (their worker died) go back to
+        polling and are finished again. Jobs another replica is still
+        finishing keep renewing their lease and are left alone.
+        """
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            # Rows claimed before the lease column existed count from their last update
+            cursor.execute(f"""
+                UPDATE video_jobs
+                SET status = 'processing', locked_until = NULL, updated_at = NOW()
+                WHERE status = 'finishing' AND prediction_id IS NOT NULL
+                  AND COALESCE(locked_until, updated_at + INTERVAL '{FINISH_LEASE_SECONDS} seconds') < NOW()
+            """)
+            if cursor.rowcount:
+                print(f"[INFO] Re-queued {cursor.rowcount} interrupted video jobs")
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Could not re-queue interrupted video jobs: {e}")
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    async def _poll_forever(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.poll_once)
+            except Exception as e:
+                logger.error(f"Video job poll failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        """Start the background poll loop (call from the app startup hook)"""
+        if self.poll_task is None or self.poll_task.done():
+            self.poll_task = asyncio.get_running_loop().create_task(self._poll_forever())
+
+    async def stop(self):
+        if self.poll_task:
+            self.poll_task.cancel()
+            try:
+                await self.poll_task
+            except asyncio.CancelledError:
+                pass
+            self.poll_task = None
+        self.executor.shutdown(wait=False)
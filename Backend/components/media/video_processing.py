@@ -0,0 +1,221 @@
+import os
+import shutil
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# OpenCV + moviepy video post-processing (fade out, logo outro, background music)
+
+
+def add_background_music(video_path, audio_path, output_path):
+    """Add background music to video using moviepy"""
+    try:
+        from moviepy.editor import VideoFileClip, AudioFileClip, CompositeAudioClip
+        
+        print("Adding background music...")
+        
+        # Load video and audio
+        video = VideoFileClip(video_path)
+        
+        # Check if audio file exists
+        if not os.path.exists(audio_path):
+            print(f"⚠️  Audio file {audio_path} not found, continuing without background music")
+            # If audio doesn't exist, just copy the video
+            shutil.copy2(video_path, output_path)
+            return False
+        
+        audio = AudioFileClip(audio_path)
+        
+        # Loop audio if video is longer, or trim if audio is longer
+        if audio.duration < video.duration:
+            # Loop the audio to match video length
+            loops_needed = int(video.duration / audio.duration) + 1
+            audio_list = [audio] * loops_needed
+            from moviepy.editor import concatenate_audioclips
+            audio = concatenate_audioclips(audio_list)
+            audio = audio.subclip(0, video.duration)
+        else:
+            # Trim audio to match video length
+            audio = audio.subclip(0, video.duration)
+        
+        # Set audio volume to 30% to not overpower original video audio
+        audio = audio.volumex(0.3)
+        
+        # Combine original audio with background music (if original video has audio)
+        if video.audio is not None:
+            final_audio = CompositeAudioClip([video.audio, audio])
+        else:
+            final_audio = audio
+        
+        # Set audio to video
+        final_video = video.set_audio(final_audio)
+        
+        # Write final video
+        final_video.write_videofile(
+            output_path,
+            codec='libx264',
+            audio_codec='aac',
+            threads=os.cpu_count() or 4,  # Use every core for encoding
+            preset='fast'  # Faster encoding
+        )
+        
+        # Clean up
+        video.close()
+        audio.close()
+        final_video.close()
+        
+        print("✅ Background music added successfully!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error adding background music: {e}")
+        print("Continuing without background music...")
+        # If audio fails, just copy the video without audio processing
+        shutil.copy2(video_path, output_path)
+        return False
+
+def create_logo_frame(width, height, logo_path):
+    """Create a frame with logo using PIL and OpenCV"""
+    # Create white background
+    img = Image.new('RGB', (width, height), color='white')
+    
+    try:
+        # Load logo with transparency support
+        logo = Image.open(logo_path)
+        
+        # Convert to RGBA if not already
+        if logo.mode != 'RGBA':
+            logo = logo.convert('RGBA')
+        
+        # Resize logo to fit (max 40% of width)
+        max_width = int(width * 0.4)
+        max_height = int(height * 0.4)
+        
+        logo.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
+        
+        # Center the logo
+        x = (width - logo.width) // 2
+        y = (height - logo.height) // 2
+        
+        # Paste logo onto white background with transparency support
+        img.paste(logo, (x, y), logo)  # The third parameter handles transparency
+        
+    except Exception as e:
+        print(f"Warning: Could not process logo: {e}")
+    
+    # Convert to OpenCV format
+    return cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
+
+def apply_fade_effect(frame, fade_type, progress):
+    """Apply fade in/out effect to a frame"""
+    if fade_type == "out":
+        alpha = 1.0 - progress
+    else:  # fade in
+        alpha = progress
+    
+    # Create fade effect
+    faded = frame * alpha
+    return faded.astype(np.uint8)
+
+# Update the create_enhanced_video function to fix flickering
+def create_enhanced_video(original_video_path, logo_path, output_path):
+    """Add fadeout and logo to the original video using OpenCV"""
+    cap = None
+    out = None
+    
+    try:
+        print("Starting video post-processing...")
+        
+        # Open original video
+        cap = cv2.VideoCapture(original_video_path)
+        
+        if not cap.isOpened():
+            print("❌ Error: Could not open video file")
+            return False
+        
+        # Get video properties
+        fps = int(cap.get(cv2.CAP_PROP_FPS))
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        
+        print(f"Video properties: {width}x{height} at {fps} FPS, {total_frames} frames")
+        
+        # Create video writer
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+        
+        if not out.isOpened():
+            print("❌ Error: Could not create output video")
+            return False
+        
+        # Process original video frames with fadeout at the end
+        frames_processed = 0
+        fadeout_start_frame = max(0, total_frames - fps)  # Start fadeout 1 second before end
+        
+        print("Processing original video frames...")
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            
+            frames_processed += 1
+            
+            # Apply fadeout to last second only
+            if frames_processed >= fadeout_start_frame:
+                fade_progress = (frames_processed - fadeout_start_frame) / min(fps, total_frames - fadeout_start_frame)
+                frame = apply_fade_effect(frame, "out", fade_progress)
+            
+            out.write(frame)
+        
+        print("✅ Original video processed with fadeout")
+        
+        # Release the original video capture
+        cap.release()
+        
+        # Add logo scene (2 seconds) if logo exists - ONLY AFTER original video
+        if logo_path and os.path.exists(logo_path):
+            print("Adding logo scene...")
+            logo_frames = fps * 2  # 2 seconds of logo
+            logo_frame = create_logo_frame(width, height, logo_path)
+            
+            for i in range(logo_frames):
+                frame = logo_frame.copy()
+                
+                # Apply fade in for first 0.5 seconds and fade out for last 0.5 seconds
+                if i < fps // 2:  # First 0.5 seconds fade in
+                    progress = i / (fps // 2)
+                    frame = apply_fade_effect(frame, "in", progress)
+                elif i > logo_frames - fps // 2:  # Last 0.5 seconds fade out
+                    progress = (logo_frames - i) / (fps // 2)
+                    frame = apply_fade_effect(frame, "out", progress)
+                else:
+                    # Middle section - no fade effect
+                    frame = logo_frame.copy()
+                
+                out.write(frame)
+            
+            print("✅ Logo scene added")
+        else:
+            print("⚠️  Logo not available, skipping logo scene")
+        
+        print(f"🎉 Enhanced video saved as '{output_path}'")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error during video post-processing: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+        
+    finally:
+        # Clean up
+        if cap:
+            cap.release()
+        if out:
+            out.release()
+        try:
+            cv2.destroyAllWindows()
+        except cv2.error:
+            pass  # headless OpenCV builds have no GUI backend
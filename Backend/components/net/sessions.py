@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import random
+from typing import Any, Dict, Optional, Tuple
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+class RetryPolicy:
+    """When and how long to wait before retrying a request"""
+
+    def __init__(self, attempts: int = 3, backoff_seconds: float = 0.5, max_backoff_seconds: float = 8,
+                 retry_statuses: Tuple[int, ...] = (429, 500, 502, 503, 504)):
+        self.attempts = attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.retry_statuses = retry_statuses
+
+    def delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Exponential backoff with jitter, or the server's Retry-After when it sent one"""
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff_seconds)
+        delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** attempt)
+        return delay * (0.5 + random.random())
+
+
+class _SessionSpec:
+    def __init__(self, limit: int, limit_per_host: int, ttl_dns_cache: int,
+                 timeout: aiohttp.ClientTimeout, retry: RetryPolicy):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.timeout = timeout
+        self.retry = retry
+
+
+class SessionRegistry:
+    """
+    Application-lifetime aiohttp sessions, one per named upstream.
+
+    Each session keeps a pooled connector (global and per-host connection
+    limits, keep-alive, DNS cache), so repeated calls to the same API reuse
+    their TLS connections instead of opening a new session per call.
+    register() declares a session with its timeout and retry policy;
+    start() opens them on app startup and close() closes them on shutdown.
+    A session used before start() (e.g. from a script) is opened on first use.
+    """
+
+    def __init__(self):
+        self.specs: Dict[str, _SessionSpec] = {}
+        self.sessions: Dict[str, aiohttp.ClientSession] = {}
+
+    def register(self, name: str, limit: int = 100, limit_per_host: int = 20, ttl_dns_cache: int = 300,
+                 timeout: float = 30, retry: Optional[RetryPolicy] = None):
+        self.specs[name] = _SessionSpec(limit, limit_per_host, ttl_dns_cache,
+                                        aiohttp.ClientTimeout(total=timeout, sock_connect=10),
+                                        retry or RetryPolicy())
+
+    def _open(self, name: str) -> aiohttp.ClientSession:
+        spec = self.specs[name]
+        connector = aiohttp.TCPConnector(
+            limit=spec.limit,
+            limit_per_host=spec.limit_per_host,
+            ttl_dns_cache=spec.ttl_dns_cache,
+            keepalive_timeout=60,
+        )
+        session = self.sessions[name] = aiohttp.ClientSession(connector=connector, timeout=spec.timeout)
+        return session
+
+    def get(self, name: str) -> aiohttp.ClientSession:
+        session = self.sessions.get(name)
+        if session is None or session.closed:
+            session = self._open(name)
+        return session
+
+    async def start(self):
+        """Open every registered session (call from the app startup hook)"""
+        for name in self.specs:
+            self.get(name)
+        print(f"[INFO] HTTP sessions ready: {', '.join(self.specs) or 'none'}")
+
+    async def close(self):
+        """Close every session (call from the app shutdown hook)"""
+        sessions, self.sessions = self.sessions, {}
+        for session in sessions.values():
+            if not session.closed:
+                await session.close()
+
+    async def request_json(self, name: str, method: str, url: str, **kwargs) -> Tuple[Optional[int], Any]:
+        """
+        A request through the named session, retried on connection errors and
+        on the policy's statuses. Returns (status, JSON body or text), or
+        (None, None) if it never got an answer.
+        """
+        retry = self.specs[name].retry
+        status, data = None, None
+        for attempt in range(retry.attempts):
+            try:
+                async with self.get(name).request(method, url, **kwargs) as response:
+                    status = response.status
+                    try:
+                        data = await response.json(content_type=None)
+                    except ValueError:
+                        data = await response.text()
+                    if status not in retry.retry_statuses or attempt == retry.attempts - 1:
+                        return status, data
+                    delay = retry.delay(attempt, response.headers.get("Retry-After"))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == retry.attempts - 1:
+                    logger.error(f"{method} {url.split('?')[0]} failed after {retry.attempts} attempts: {e}")
+                    return None, None
+                delay = retry.delay(attempt)
+            await asyncio.sleep(delay)
+        return status, data
+
+
+# Shared session registry for the app
+session_registry = SessionRegistry()
@@ -0,0 +1,434 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, Tuple
+
+import aiohttp
+
+from config.config import settings
+from components.media.media_cache import media_cache
+from components.publishing.graph_batch import GraphBatcher, parse_batch_response
+from components.publishing.media_relay import MEDIA_TIMEOUT, MediaTee, read_file
+
+logger = logging.getLogger(__name__)
+
+LINKEDIN_HEADERS = {
+    "Content-Type": "application/json",
+    "X-Restli-Protocol-Version": "2.0.0",
+    "LinkedIn-Version": "202402",
+}
+# LinkedIn requires the multipart upload for videos over 200 MB
+LINKEDIN_MULTIPART_THRESHOLD_BYTES = 200 * 1024 * 1024
+LINKEDIN_PART_CONCURRENCY = 4
+LINKEDIN_UPLOAD_RETRIES = 3
+
+
+class PublishResult:
+    """Outcome of one publish call, the same shape for every platform"""
+
+    def __init__(self, platform: str, kind: str, success: bool, post_id: Optional[str] = None,
+                 error: Optional[str] = None, status_code: Optional[int] = None,
+                 response: Any = None, elapsed_ms: Optional[float] = None, pending: bool = False):
+        self.platform = platform
+        self.kind = kind
+        self.success = success
+        self.post_id = post_id
+        self.error = error
+        self.status_code = status_code
+        self.response = response
+        self.elapsed_ms = elapsed_ms
+        # Accepted but not live yet (e.g. an Instagram container still processing)
+        self.pending = pending
+
+    def __bool__(self) -> bool:
+        return self.success
+
+    def __repr__(self) -> str:
+        state = f"post_id={self.post_id}" if self.success else f"error={self.error!r}"
+        return f"PublishResult({self.platform}/{self.kind}, {state})"
+
+    def to_dict(self) -> dict:
+        return {
+            "platform": self.platform,
+            "kind": self.kind,
+            "success": self.success,
+            "post_id": self.post_id,
+            "error": self.error,
+            "status_code": self.status_code,
+            "elapsed_ms": self.elapsed_ms,
+            "pending": self.pending,
+        }
+
+
+class PublishError(Exception):
+    """A platform API call that failed; turned into a failed PublishResult"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, response: Any = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = response
+
+
+class PublishingClient:
+    """
+    Async client for publishing to Instagram, Facebook and LinkedIn.
+
+    One aiohttp session is shared by every publish, so connections to the
+    Graph and LinkedIn APIs are kept alive and reused, with a global and a
+    per-host connection limit. Waits (retry backoff) use asyncio.sleep, so a
+    publish never blocks the event loop. Instagram only gets the container
+    primitives here; containers are polled and published by
+    InstagramContainerManager. Graph API calls for the same token made close together share one batch
+    request (GRAPH_BATCH_WINDOW_MS).
+    Every method returns a PublishResult instead of raising.
+    """
+
+    def __init__(self, graph_base: Optional[str] = None, linkedin_base: Optional[str] = None,
+                 max_connections: Optional[int] = None, per_host_limit: Optional[int] = None,
+                 timeout: float = 60):
+        self.graph_base = (graph_base or settings.GRAPH_API_BASE).rstrip("/")
+        self.linkedin_base = (linkedin_base or settings.LINKEDIN_API_BASE).rstrip("/")
+        self.max_connections = max_connections or settings.PUBLISH_MAX_CONNECTIONS
+        self.per_host_limit = per_host_limit or settings.PUBLISH_PER_HOST_LIMIT
+        self.timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=10)
+        self.batcher = GraphBatcher(self._graph_single, self._graph_batch,
+                                    window_seconds=settings.GRAPH_BATCH_WINDOW_MS / 1000)
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    # -------- Session --------
+    async def get_session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.per_host_limit,
+                keepalive_timeout=60,
+                ttl_dns_cache=300,
+            )
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self.session
+
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    async def _request(self, method: str, url: str, **kwargs) -> Tuple[int, Any, Dict[str, str]]:
+        session = await self.get_session()
+        async with session.request(method, url, **kwargs) as response:
+            try:
+                data = await response.json(content_type=None)
+            except ValueError:
+                data = await response.text()
+            return response.status, data, dict(response.headers)
+
+    async def _run(self, platform: str, kind: str, call: Callable[[], Awaitable[Tuple[Optional[str], Any]]]) -> PublishResult:
+        """Run one publish flow and wrap its outcome (or any failure) in a PublishResult; never raises"""
+        started = time.perf_counter()
+        try:
+            post_id, response = await call()
+            result = PublishResult(platform, kind, True, post_id=post_id, response=response)
+            print(f"[{platform.upper()}] {kind} published successfully! Post ID: {post_id}")
+        except PublishError as e:
+            result = PublishResult(platform, kind, False, error=str(e), status_code=e.status_code, response=e.response)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            result = PublishResult(platform, kind, False, error=f"{type(e).__name__}: {e}")
+        except Exception as e:
+            # e.g. a response missing a field the flow expected
+            logger.error(f"Unexpected error publishing {platform} {kind}: {e}", exc_info=True)
+            result = PublishResult(platform, kind, False, error=f"{type(e).__name__}: {e}")
+        result.elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        if not result.success:
+            print(f"[{platform.upper()}] Failed to publish {kind}: {result.error}")
+        return result
+
+    # -------- Meta Graph API --------
+    async def _graph_single(self, method: str, path: str, params: dict) -> Tuple[int, Any]:
+        key = "params" if method == "GET" else "data"
+        status, data, _ = await self._request(method, f"{self.graph_base}/{path.lstrip('/')}", **{key: params})
+        return status, data
+
+    async def _graph_batch(self, access_token: str, operations: list) -> list:
+        status, data, _ = await self._request("POST", f"{self.graph_base}/", data={
+            "access_token": access_token,
+            "batch": json.dumps(operations),
+            "include_headers": "false",
+        })
+        if status >= 400:
+            raise PublishError(f"Graph API batch {status}: {str(data)[:300]}", status, data)
+        return parse_batch_response(data)
+
+    async def _graph(self, method: str, path: str, data: Optional[dict] = None, params: Optional[dict] = None) -> dict:
+        """One Graph API call; calls for the same token made close together go out as one batch"""
+        status, data = await self.batcher.call(method, path.lstrip("/"), (params if method == "GET" else data) or {})
+        if status >= 400 or not isinstance(data, dict) or "error" in data:
+            message = data.get("error", {}).get("message") if isinstance(data, dict) else data
+            raise PublishError(f"Graph API {status}: {message}", status, data)
+        return data
+
+    @staticmethod
+    def instagram_container_params(kind: str, media_url: str, caption: Optional[str] = None,
+                                   cover_url: Optional[str] = None) -> dict:
+        """Container fields for a feed post, story or reel"""
+        if kind == "reel":
+            params = {"media_type": "REELS", "video_url": media_url, "share_to_feed": "true"}
+            if cover_url:
+                params["thumbnail_url"] = cover_url
+        elif kind == "story":
+            params = {"media_type": "STORIES", "image_url": media_url}
+        else:
+            params = {"image_url": media_url}
+        if caption and kind != "story":
+            params["caption"] = caption
+        return params
+
+    async def instagram_create_container(self, account_id: str, access_token: str, params: dict) -> str:
+        created = await self._graph("POST", f"{account_id}/media", data={**params, "access_token": access_token})
+        container_id = created.get("id")
+        if not container_id:
+            raise PublishError("No container id returned", response=created)
+        return container_id
+
+    async def instagram_container_status(self, container_id: str, access_token: str) -> Optional[str]:
+        """IN_PROGRESS, FINISHED, ERROR, EXPIRED or PUBLISHED"""
+        data = await self._graph("GET", container_id, params={
+            "fields": "status_code",
+            "access_token": access_token,
+        })
+        return data.get("status_code")
+
+    async def instagram_publish_container(self, account_id: str, access_token: str, container_id: str) -> str:
+        published = await self._graph("POST", f"{account_id}/media_publish", data={
+            "creation_id": container_id,
+            "access_token": access_token,
+        })
+        if "id" not in published:
+            raise PublishError("Publish returned no media id", response=published)
+        return published["id"]
+
+    async def _facebook_publish(self, page_id: str, edge: str, payload: dict) -> Tuple[str, dict]:
+        data = await self._graph("POST", f"{page_id}/{edge}", data=payload)
+        post_id = data.get("id") or data.get("post_id")
+        if not post_id:
+            raise PublishError(f"Facebook /{edge} returned no id", response=data)
+        return post_id, data
+
+    async def facebook_text(self, page_id: str, access_token: str, message: str) -> PublishResult:
+        return await self._run("facebook", "text", lambda: self._facebook_publish(
+            page_id, "feed", {"message": message, "access_token": access_token}))
+
+    async def facebook_image(self, page_id: str, access_token: str, image_url: str,
+                             message: Optional[str] = None) -> PublishResult:
+        payload = {"url": image_url, "access_token": access_token}
+        if message:
+            payload["caption"] = message
+        return await self._run("facebook", "image", lambda: self._facebook_publish(page_id, "photos", payload))
+
+    async def facebook_video(self, page_id: str, access_token: str, video_url: str,
+                             title: Optional[str] = None, description: Optional[str] = None) -> PublishResult:
+        payload = {"file_url": video_url, "access_token": access_token}
+        if title:
+            payload["title"] = title
+        if description:
+            payload["description"] = description
+        return await self._run("facebook", "video", lambda: self._facebook_publish(page_id, "videos", payload))
+
+    # -------- LinkedIn --------
+    def _linkedin_headers(self, access_token: str) -> dict:
+        return {**LINKEDIN_HEADERS, "Authorization": f"Bearer {access_token}"}
+
+    @staticmethod
+    def _check_author(user_id: str):
+        if not user_id.startswith("urn:li:person:"):
+            raise ValueError("Invalid user_id format. Must start with 'urn:li:person:'")
+
+    async def _linkedin_register_upload(self, access_token: str, user_id: str, recipe: str,
+                                        multipart_size: Optional[int] = None) -> dict:
+        """Register an asset; with multipart_size, ask for a multipart upload of that many bytes"""
+        request = {
+            "recipes": [f"urn:li:digitalmediaRecipe:{recipe}"],
+            "owner": user_id,
+            "serviceRelationships": [{
+                "relationshipType": "OWNER",
+                "identifier": "urn:li:userGeneratedContent",
+            }],
+        }
+        if multipart_size:
+            request["fileSize"] = multipart_size
+            request["supportedUploadMechanism"] = ["MULTIPART_UPLOAD"]
+        status, data, _ = await self._request(
+            "POST", f"{self.linkedin_base}/v2/assets?action=registerUpload",
+            headers=self._linkedin_headers(access_token),
+            json={"registerUploadRequest": request},
+        )
+        if status >= 400 or not isinstance(data, dict):
+            raise PublishError(f"LinkedIn registerUpload {status}: {str(data)[:500]}", status, data)
+        value = data["value"]
+        mechanisms = value["uploadMechanism"]
+        single = mechanisms.get("com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest")
+        return {
+            "asset": value["asset"],
+            "media_artifact": value.get("mediaArtifact"),
+            "upload_url": single["uploadUrl"] if single else None,
+            "multipart": mechanisms.get("com.linkedin.digitalmedia.uploading.MultipartUpload"),
+        }
+
+    async def _linkedin_put(self, url: str, body, size: Optional[int], headers: dict) -> Mapping[str, str]:
+        session = await self.get_session()
+        if size is not None:
+            headers = {**headers, "Content-Length": str(size)}
+        async with session.put(url, headers=headers, data=body, timeout=MEDIA_TIMEOUT) as upload:
+            if upload.status >= 400:
+                raise PublishError(f"LinkedIn upload {upload.status}: {(await upload.text())[:500]}", upload.status)
+            return upload.headers.copy()  # case-insensitive
+
+    async def _linkedin_local_copy(self, media_url: str, tee: Optional[MediaTee]) -> str:
+        """The media on local disk: from the running download, the media cache or a new download"""
+        if tee is not None:
+            tee.detach()
+            try:
+                return await tee.wait()
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                logger.warning(f"Media download for {media_url} failed, fetching it again: {e}")
+        return media_cache.get(media_url) or await MediaTee.download(await self.get_session(), media_url)
+
+    async def _linkedin_upload_single(self, upload_url: str, access_token: str, media_url: str,
+                                      tee: Optional[MediaTee], path: Optional[str]):
+        """
+        PUT the media to its upload URL. The first attempt streams the download
+        straight through; retries read the local copy instead of downloading again.
+        """
+        headers = {"Authorization": f"Bearer {access_token}"}
+        for attempt in range(LINKEDIN_UPLOAD_RETRIES):
+            try:
+                if path is None and attempt == 0 and tee is not None:
+                    await self._linkedin_put(upload_url, tee.chunks(), tee.size, headers)
+                else:
+                    path = path or await self._linkedin_local_copy(media_url, tee)
+                    await self._linkedin_put(upload_url, read_file(path), os.path.getsize(path), headers)
+                return
+            except (aiohttp.ClientError, asyncio.TimeoutError, PublishError):
+                if tee is not None:
+                    tee.detach()
+                if attempt == LINKEDIN_UPLOAD_RETRIES - 1:
+                    raise
+                await asyncio.sleep(2 ** attempt)  # Exponential backoff
+
+    async def _linkedin_upload_part(self, part: dict, path: str) -> dict:
+        first, last = part["byteRange"]["firstByte"], part["byteRange"]["lastByte"]
+        for attempt in range(LINKEDIN_UPLOAD_RETRIES):
+            try:
+                headers = await self._linkedin_put(part["url"], read_file(path, first, last + 1),
+                                                   last + 1 - first, part.get("headers") or {})
+                return {"headers": {"ETag": headers.get("ETag"), "Content-Length": str(last + 1 - first)},
+                        "httpStatusCode": 200}
+            except (aiohttp.ClientError, asyncio.TimeoutError, PublishError):
+                if attempt == LINKEDIN_UPLOAD_RETRIES - 1:
+                    raise
+                await asyncio.sleep(2 ** attempt)
+
+    async def _linkedin_upload_multipart(self, upload: dict, access_token: str, path: str):
+        """Upload the parts LinkedIn asked for (a few at a time), then complete the upload"""
+        limit = asyncio.Semaphore(LINKEDIN_PART_CONCURRENCY)
+
+        async def send(part):
+            async with limit:
+                return await self._linkedin_upload_part(part, path)
+
+        parts = upload["multipart"]["partUploadRequests"]
+        responses = await asyncio.gather(*[send(part) for part in parts])
+        status, data, _ = await self._request(
+            "POST", f"{self.linkedin_base}/v2/assets?action=completeMultiPartUpload",
+            headers=self._linkedin_headers(access_token),
+            json={
+                "completeMultipartUploadRequest": {
+                    "mediaArtifact": upload["media_artifact"],
+                    "metadata": upload["multipart"].get("metadata"),
+                    "partUploadResponses": responses,
+                }
+            },
+        )
+        if status >= 400:
+            raise PublishError(f"LinkedIn completeMultiPartUpload {status}: {str(data)[:500]}", status, data)
+        print(f"[LINKEDIN] Uploaded {len(parts)} parts")
+
+    async def _linkedin_share(self, access_token: str, user_id: str, text: str,
+                              category: str = "NONE", asset_urn: Optional[str] = None,
+                              title: Optional[str] = None) -> Tuple[str, Any]:
+        content = {"shareCommentary": {"text": text}, "shareMediaCategory": category}
+        if asset_urn:
+            content["media"] = [{
+                "status": "READY",
+                "description": {"text": text[:200]},
+                "media": asset_urn,
+                "title": {"text": title or "Shared Media"},
+            }]
+        status, data, headers = await self._request(
+            "POST", f"{self.linkedin_base}/v2/ugcPosts",
+            headers=self._linkedin_headers(access_token),
+            json={
+                "author": user_id,
+                "lifecycleState": "PUBLISHED",
+                "specificContent": {"com.linkedin.ugc.ShareContent": content},
+                "visibility": {"com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"},
+            },
+        )
+        if status >= 400:
+            raise PublishError(f"LinkedIn ugcPosts {status}: {str(data)[:500]}", status, data)
+        post_id = headers.get("X-RestLi-Id") or (data.get("id") if isinstance(data, dict) else None)
+        return post_id, data
+
+    async def linkedin_text(self, access_token: str, user_id: str, text: str) -> PublishResult:
+        async def flow():
+            self._check_author(user_id)
+            if not text.strip():
+                raise ValueError("Text content cannot be empty")
+            return await self._linkedin_share(access_token, user_id, text)
+        return await self._run("linkedin", "text", flow)
+
+    async def _linkedin_media_flow(self, access_token: str, user_id: str, media_url: str, text: str,
+                                   recipe: str, category: str, title: str) -> Tuple[str, Any]:
+        self._check_author(user_id)
+        if not media_url.startswith(("http://", "https://")):
+            raise ValueError("Invalid media URL format")
+
+        def multipart_size(size: Optional[int]) -> Optional[int]:
+            if recipe == "feedshare-video" and size and size > LINKEDIN_MULTIPART_THRESHOLD_BYTES:
+                return size
+            return None
+
+        path = media_cache.get(media_url)
+        tee = None
+        try:
+            if path:
+                upload = await self._linkedin_register_upload(
+                    access_token, user_id, recipe, multipart_size(os.path.getsize(path)))
+            else:
+                # The media download starts as soon as its headers are in and runs
+                # while registerUpload is in flight (videos need their size first)
+                tee = MediaTee(await self.get_session(), media_url)
+                await tee.open()
+                upload = await self._linkedin_register_upload(access_token, user_id, recipe, multipart_size(tee.size))
+
+            if upload["multipart"]:
+                path = path or await self._linkedin_local_copy(media_url, tee)
+                await self._linkedin_upload_multipart(upload, access_token, path)
+            else:
+                await self._linkedin_upload_single(upload["upload_url"], access_token, media_url, tee, path)
+        finally:
+            if tee is not None:
+                await tee.close()
+        return await self._linkedin_share(access_token, user_id, text, category, upload["asset"], title)
+
+    async def linkedin_image(self, access_token: str, user_id: str, image_url: str, text: str) -> PublishResult:
+        return await self._run("linkedin", "image", lambda: self._linkedin_media_flow(
+            access_token, user_id, image_url, text, "feedshare-image", "IMAGE", "Shared Image"))
+
+    async def linkedin_video(self, access_token: str, user_id: str, video_url: str, text: str) -> PublishResult:
+        return await self._run("linkedin", "video", lambda: self._linkedin_media_flow(
+            access_token, user_id, video_url, text, "feedshare-video", "VIDEO", "Shared Video"))
+
+
+# Shared client for the app (the session is opened on first use, closed on shutdown)
+publishing_client = PublishingClient()
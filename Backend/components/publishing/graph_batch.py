@@ -0,0 +1,123 @@
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+logger = logging.getLogger(__name__)
+
+# Graph API accepts at most 50 operations per batch request
+MAX_BATCH_OPERATIONS = 50
+
+GraphResponse = Tuple[int, Any]
+
+
+class _PendingCall:
+    def __init__(self, method: str, path: str, params: dict):
+        self.method = method
+        self.path = path
+        self.params = params
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def operation(self) -> dict:
+        """This call as one entry of a Graph batch (the access token is sent once, for the batch)"""
+        params = {key: value for key, value in self.params.items() if key != "access_token"}
+        if self.method == "GET":
+            relative_url = self.path + (f"?{urlencode(params)}" if params else "")
+            return {"method": "GET", "relative_url": relative_url}
+        return {"method": self.method, "relative_url": self.path, "body": urlencode(params)}
+
+
+class GraphBatcher:
+    """
+    Coalesces Graph API calls into batch requests.
+
+    Calls made with the same access token (so for the same page or Instagram
+    account) within a short window are sent as one POST with a `batch`
+    parameter, up to 50 at a time, and each caller gets its own response
+    back. A window holding a single call is sent as a plain request.
+
+    send_single(method, path, params) and send_batch(access_token, operations)
+    do the HTTP work; both return (status, body) / a list of them.
+    """
+
+    def __init__(self, send_single: Callable[[str, str, dict], Awaitable[GraphResponse]],
+                 send_batch: Callable[[str, List[dict]], Awaitable[List[GraphResponse]]],
+                 window_seconds: float = 0.2, max_operations: int = MAX_BATCH_OPERATIONS):
+        self.send_single = send_single
+        self.send_batch = send_batch
+        self.window_seconds = window_seconds
+        self.max_operations = max_operations
+        self.groups: Dict[str, List[_PendingCall]] = {}
+        self.timers: Dict[str, asyncio.TimerHandle] = {}
+
+    async def call(self, method: str, path: str, params: dict) -> GraphResponse:
+        token = params.get("access_token")
+        if not token or self.window_seconds <= 0:
+            return await self.send_single(method, path, params)
+
+        pending = _PendingCall(method, path, params)
+        group = self.groups.setdefault(token, [])
+        group.append(pending)
+        if len(group) >= self.max_operations:
+            self._flush(token)
+        elif token not in self.timers:
+            loop = asyncio.get_running_loop()
+            self.timers[token] = loop.call_later(self.window_seconds, self._flush, token)
+        return await pending.future
+
+    def _flush(self, token: str):
+        timer = self.timers.pop(token, None)
+        if timer:
+            timer.cancel()
+        calls = self.groups.pop(token, [])
+        if calls:
+            asyncio.get_running_loop().create_task(self._send(token, calls))
+
+    async def _send(self, token: str, calls: List[_PendingCall]):
+        if len(calls) == 1:
+            call = calls[0]
+            try:
+                response = await self.send_single(call.method, call.path, call.params)
+                if not call.future.done():
+                    call.future.set_result(response)
+            except Exception as e:
+                if not call.future.done():
+                    call.future.set_exception(e)
+            return
+
+        try:
+            responses = await self.send_batch(token, [call.operation() for call in calls])
+        except Exception as e:
+            for call in calls:
+                if not call.future.done():
+                    call.future.set_exception(e)
+            return
+
+        print(f"[GRAPH] Sent {len(calls)} calls in one batch request")
+        for index, call in enumerate(calls):
+            if call.future.done():
+                continue
+            if index < len(responses) and responses[index] is not None:
+                call.future.set_result(responses[index])
+            else:
+                # Meta leaves an entry null when it did not get to run it
+                call.future.set_result((503, {"error": {"message": "Batch operation was not processed"}}))
+
+
+def parse_batch_response(data: Any) -> List[Optional[GraphResponse]]:
+    """Split a batch response into (status, body) per operation"""
+    if not isinstance(data, list):
+        raise ValueError(f"Unexpected batch response: {str(data)[:300]}")
+    responses = []
+    for item in data:
+        if item is None:
+            responses.append(None)
+            continue
+        body = item.get("body")
+        try:
+            body = json.loads(body) if isinstance(body, str) else body
+        except ValueError:
+            pass
+        responses.append((item.get("code", 500), body))
+    return responses
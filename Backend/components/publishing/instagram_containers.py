@@ -0,0 +1,317 @@
+import asyncio
+import logging
+from typing import Optional
+
+from auth.credentials import get_cipher
+from config.config import get_db_connection, get_db_cursor, release_db_connection
+from components.publishing.client import PublishError, PublishingClient, PublishResult, publishing_client
+
+logger = logging.getLogger(__name__)
+
+# Container lifecycle: created -> processing -> finished -> published | failed
+ACTIVE_STATUSES = ("created", "processing", "finished")
+
+# Adaptive polling per kind: first check, growth factor, ceiling and overall budget (seconds).
+# Images are usually ready within a second or two; reels need Instagram to transcode.
+POLL_SCHEDULE = {
+    "post": {"first": 1, "factor": 1.5, "max": 10, "budget": 300},
+    "story": {"first": 1, "factor": 1.5, "max": 10, "budget": 300},
+    "reel": {"first": 5, "factor": 1.5, "max": 30, "budget": 1800},
+}
+# Containers expire on Instagram's side after 24 hours, so older ones are not reused
+CONTAINER_TTL_HOURS = 23
+# A claimed row is not picked up again for this long (covers a crashed worker)
+CLAIM_SECONDS = 120
+BATCH_SIZE = 20
+
+CONTAINER_FIELDS = [
+    "id", "content_id", "account_id", "access_token", "kind", "container_id", "status",
+    "attempts", "media_id", "error", "created_at",
+]
+
+
+class InstagramContainerManager:
+    """
+    Publishes to Instagram through persisted media containers.
+
+    submit() creates the container and returns straight away; the container id
+    is stored in instagram_containers and on the content item. A background
+    worker then polls each container with a growing interval (short for
+    images, longer for reels) and publishes it once Instagram reports it
+    FINISHED, updating the content item to 'posted' (or back to
+    'needs_approval' on failure). After a restart the worker carries on from
+    the stored state, and submitting the same content again reuses its live
+    container instead of uploading the media again.
+
+    The status is read again before every publish attempt, and a container
+    Instagram reports PUBLISHED counts as published, so a media_publish that
+    went through but failed on our side is never sent twice. Every kind of
+    failure is retried only within the kind's polling budget.
+    """
+
+    def __init__(self, client: Optional[PublishingClient] = None, tick_seconds: float = 1.0):
+        self.client = client or publishing_client
+        self.tick_seconds = tick_seconds
+        self.wake = asyncio.Event()
+        self.worker_task: Optional[asyncio.Task] = None
+
+    def ensure_schema(self):
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS instagram_containers (
+                    id SERIAL PRIMARY KEY,
+                    content_id INTEGER,
+                    account_id VARCHAR(64) NOT NULL,
+                    access_token TEXT NOT NULL,
+                    kind VARCHAR(10) NOT NULL,
+                    container_id VARCHAR(64) NOT NULL,
+                    status VARCHAR(20) NOT NULL DEFAULT 'created',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_poll_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                    media_id VARCHAR(64),
+                    error TEXT,
+                    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+                )
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_instagram_containers_due
+                ON instagram_containers (next_poll_at)
+                WHERE status IN ('created', 'processing', 'finished')
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_instagram_containers_content
+                ON instagram_containers (content_id)
+            """)
+            cursor.execute("ALTER TABLE content_items ADD COLUMN IF NOT EXISTS ig_container_id VARCHAR(64)")
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Could not create instagram_containers table: {e}")
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    # -------- Tokens --------
+    def _encrypt(self, token: str) -> str:
+        return get_cipher().encrypt(token.encode()).decode()
+
+    def _decrypt(self, token: str) -> str:
+        return get_cipher().decrypt(token.encode()).decode()
+
+    # -------- Records --------
+    def _execute(self, query: str, params: tuple = (), fetch: bool = False):
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            cursor.execute(query, params)
+            rows = cursor.fetchall() if fetch else None
+            conn.commit()
+            return rows
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    def _live_container(self, content_id: int, kind: str) -> Optional[dict]:
+        rows = self._execute(f"""
+            SELECT {', '.join(CONTAINER_FIELDS)} FROM instagram_containers
+            WHERE content_id = %s AND kind = %s AND status IN ('created', 'processing', 'finished')
+              AND created_at > NOW() - INTERVAL '{CONTAINER_TTL_HOURS} hours'
+            ORDER BY id DESC LIMIT 1
+        """, (content_id, kind), fetch=True)
+        return dict(zip(CONTAINER_FIELDS, rows[0])) if rows else None
+
+    def _insert(self, content_id: Optional[int], account_id: str, access_token: str,
+                kind: str, container_id: str) -> int:
+        first_poll = POLL_SCHEDULE[kind]["first"]
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            cursor.execute("""
+                INSERT INTO instagram_containers (content_id, account_id, access_token, kind, container_id,
+                                                  next_poll_at)
+                VALUES (%s, %s, %s, %s, %s, NOW() + make_interval(secs => %s))
+                RETURNING id
+            """, (content_id, account_id, self._encrypt(access_token), kind, container_id, first_poll))
+            record_id = cursor.fetchone()[0]
+            if content_id is not None:
+                cursor.execute("""
+                    UPDATE content_items SET ig_container_id = %s, status = 'publishing'
+                    WHERE id = %s
+                """, (container_id, content_id))
+            conn.commit()
+            return record_id
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    def _claim_due(self) -> list:
+        """Lease the containers due for a check, so two workers never poll the same one"""
+        rows = self._execute(f"""
+            UPDATE instagram_containers
+            SET next_poll_at = NOW() + INTERVAL '{CLAIM_SECONDS} seconds'
+            WHERE id IN (
+                SELECT id FROM instagram_containers
+                WHERE status IN ('created', 'processing', 'finished') AND next_poll_at <= NOW()
+                ORDER BY next_poll_at
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING {', '.join(CONTAINER_FIELDS)}, EXTRACT(EPOCH FROM NOW() - created_at)
+        """, (BATCH_SIZE,), fetch=True)
+        return [dict(zip(CONTAINER_FIELDS + ["age_seconds"], row)) for row in rows]
+
+    def _reschedule(self, record: dict, status: str, error: Optional[str] = None):
+        schedule = POLL_SCHEDULE[record["kind"]]
+        delay = min(schedule["max"], schedule["first"] * schedule["factor"] ** record["attempts"])
+        self._execute("""
+            UPDATE instagram_containers
+            SET status = %s, attempts = attempts + 1, error = %s,
+                next_poll_at = NOW() + make_interval(secs => %s), updated_at = NOW()
+            WHERE id = %s
+        """, (status, error, delay, record["id"]))
+
+    def _complete(self, record: dict, media_id: Optional[str]):
+        self._execute("""
+            UPDATE instagram_containers
+            SET status = 'published', media_id = %s, error = NULL, updated_at = NOW()
+            WHERE id = %s
+        """, (media_id, record["id"]))
+        if record["content_id"] is not None:
+            self._execute("UPDATE content_items SET status = 'posted' WHERE id = %s", (record["content_id"],))
+        print(f"✅ Instagram {record['kind']} published (content {record['content_id']}, media {media_id})")
+
+    def _fail(self, record: dict, error: str):
+        self._execute("""
+            UPDATE instagram_containers
+            SET status = 'failed', error = %s, updated_at = NOW()
+            WHERE id = %s
+        """, (error, record["id"]))
+        if record["content_id"] is not None:
+            self._execute("""
+                UPDATE content_items SET status = 'needs_approval', ig_container_id = NULL
+                WHERE id = %s
+            """, (record["content_id"],))
+        print(f"❌ Instagram {record['kind']} failed (content {record['content_id']}): {error}")
+
+    # -------- Submitting --------
+    async def submit(self, kind: str, account_id: str, access_token: str, media_url: str,
+                     caption: Optional[str] = None, cover_url: Optional[str] = None,
+                     content_id: Optional[int] = None) -> PublishResult:
+        """
+        Create the container (or reuse the content item's live one) and hand it
+        to the worker; returns a pending PublishResult right away.
+        """
+        if content_id is not None:
+            existing = await asyncio.to_thread(self._live_container, content_id, kind)
+            if existing:
+                print(f"[INFO] Reusing Instagram container {existing['container_id']} for content {content_id}")
+                self.wake.set()
+                return PublishResult("instagram", kind, True, pending=True,
+                                     response={"container_id": existing["container_id"]})
+
+        params = self.client.instagram_container_params(kind, media_url, caption, cover_url)
+        try:
+            container_id = await self.client.instagram_create_container(account_id, access_token, params)
+        except PublishError as e:
+            return PublishResult("instagram", kind, False, error=str(e), status_code=e.status_code, response=e.response)
+        except Exception as e:
+            return PublishResult("instagram", kind, False, error=f"{type(e).__name__}: {e}")
+
+        await asyncio.to_thread(self._insert, content_id, account_id, access_token, kind, container_id)
+        print(f"[INFO] Instagram {kind} container {container_id} created, publishing in the background")
+        self.wake.set()
+        return PublishResult("instagram", kind, True, pending=True, response={"container_id": container_id})
+
+    # -------- Worker --------
+    async def advance(self, record: dict):
+        """Move one container forward: check its status, publish it when ready"""
+        kind = record["kind"]
+        schedule = POLL_SCHEDULE[kind]
+        age = float(record.get("age_seconds") or 0)
+        access_token = None
+        try:
+            access_token = self._decrypt(record["access_token"])
+            # Always read the status first: a publish that timed out may have gone through
+            status_code = await self.client.instagram_container_status(record["container_id"], access_token)
+            if status_code == "PUBLISHED":
+                await asyncio.to_thread(self._complete, record, record.get("media_id"))
+                return
+            if status_code in ("ERROR", "EXPIRED"):
+                await asyncio.to_thread(self._fail, record, f"Container {status_code}")
+                return
+            if status_code != "FINISHED":
+                if age > schedule["budget"]:
+                    await asyncio.to_thread(self._fail, record, f"Container not ready after {int(age)}s")
+                else:
+                    await asyncio.to_thread(self._reschedule, record, "processing")
+                return
+
+            record["status"] = "finished"
+            media_id = await self.client.instagram_publish_container(
+                record["account_id"], access_token, record["container_id"])
+            await asyncio.to_thread(self._complete, record, media_id)
+        except Exception as e:
+            # Graph API refused the call (or something else broke): retry on the next
+            # check, which re-reads the status, until the budget runs out
+            error = str(e) if isinstance(e, PublishError) else f"{type(e).__name__}: {e}"
+            if not isinstance(e, PublishError):
+                logger.error(f"Instagram container {record['container_id']} check failed: {e}")
+            if age <= schedule["budget"]:
+                await asyncio.to_thread(self._reschedule, record, record["status"], error)
+            elif access_token and await self._was_published(record, access_token):
+                await asyncio.to_thread(self._complete, record, record.get("media_id"))
+            else:
+                await asyncio.to_thread(self._fail, record, error)
+
+    async def _was_published(self, record: dict, access_token: str) -> bool:
+        """Last look before giving up, so a container that did go live is not re-approved and posted twice"""
+        try:
+            return await self.client.instagram_container_status(record["container_id"], access_token) == "PUBLISHED"
+        except Exception as e:
+            logger.error(f"Could not re-check Instagram container {record['container_id']}: {e}")
+            return False
+
+    async def run_once(self) -> int:
+        records = await asyncio.to_thread(self._claim_due)
+        if records:
+            await asyncio.gather(*[self.advance(record) for record in records])
+        return len(records)
+
+    async def _work_forever(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Instagram container worker failed: {e}")
+            self.wake.clear()
+            try:
+                await asyncio.wait_for(self.wake.wait(), timeout=self.tick_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        """Start the background worker (call from the app startup hook)"""
+        if self.worker_task is None or self.worker_task.done():
+            self.worker_task = asyncio.get_running_loop().create_task(self._work_forever())
+
+    async def stop(self):
+        if self.worker_task:
+            self.worker_task.cancel()
+            try:
+                await self.worker_task
+            except asyncio.CancelledError:
+                pass
+            self.worker_task = None
+
+
+# Shared container manager for the app
+instagram_containers = InstagramContainerManager()
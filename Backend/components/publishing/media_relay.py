@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import os
+from typing import AsyncIterator, Optional
+
+import aiohttp
+
+from components.media.media_cache import LocalMediaCache, media_cache
+from components.media.media_fetcher import remove_quietly
+
+logger = logging.getLogger(__name__)
+
+RELAY_BUFFER_BYTES = 1024 * 1024
+# Chunks read ahead of the upload, e.g. while registerUpload is still in flight
+RELAY_READ_AHEAD_CHUNKS = 16
+# Media transfers can take minutes: no overall limit, only between reads
+MEDIA_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=60)
+
+
+class MediaTee:
+    """
+    Downloads a media URL once, into the local media cache, while handing
+    the same chunks to an upload.
+
+    open() starts the download as soon as the response headers are in, so
+    the body is already flowing while the caller is still preparing the
+    upload; up to RELAY_READ_AHEAD_CHUNKS buffers are held for it. If the
+    upload stops (detach()), the download still runs to the end, so a retry
+    can read the file from disk instead of downloading it again.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, url: str, cache: LocalMediaCache = media_cache):
+        self.session = session
+        self.url = url
+        self.cache = cache
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=RELAY_READ_AHEAD_CHUNKS)
+        self.streaming = True
+        self.size: Optional[int] = None
+        self.task: Optional[asyncio.Task] = None
+
+    async def open(self):
+        response = await self.session.get(self.url, timeout=MEDIA_TIMEOUT)
+        try:
+            response.raise_for_status()
+        except aiohttp.ClientError:
+            response.release()
+            raise
+        # Content-Length is the raw body size, so it is only the file size for uncompressed responses
+        if not response.headers.get("Content-Encoding"):
+            self.size = response.content_length
+        self.task = asyncio.get_running_loop().create_task(self._pump(response))
+
+    async def _pump(self, response: aiohttp.ClientResponse) -> str:
+        partial = self.cache.partial_path(self.url)
+        end = None
+        try:
+            written = 0
+            with open(partial, "wb") as out:
+                async for chunk in response.content.iter_chunked(RELAY_BUFFER_BYTES):
+                    out.write(chunk)
+                    written += len(chunk)
+                    if self.streaming:
+                        await self.queue.put(chunk)
+            if self.size is not None and written != self.size:
+                raise aiohttp.ClientPayloadError(f"{self.url} was truncated: got {written} of {self.size} bytes")
+            return self.cache.commit(self.url, partial)
+        except BaseException as e:
+            remove_quietly(partial)
+            end = e
+            raise
+        finally:
+            response.release()
+            if self.streaming:
+                await self.queue.put(end)
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """The body as it arrives, for an upload running alongside the download"""
+        while True:
+            item = await self.queue.get()
+            if item is None:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    def detach(self):
+        """Stop feeding the upload; the download carries on into the cache"""
+        self.streaming = False
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+    async def wait(self) -> str:
+        """Path of the complete local copy"""
+        return await self.task
+
+    async def close(self):
+        """Stop the download if it is still running"""
+        if self.task is None:
+            return
+        if not self.task.done():
+            self.detach()
+            self.task.cancel()
+        try:
+            await self.task
+        except (asyncio.CancelledError, Exception):
+            pass
+
+    @classmethod
+    async def download(cls, session: aiohttp.ClientSession, url: str,
+                       cache: LocalMediaCache = media_cache) -> str:
+        """Download url into the cache (no upload alongside); returns the local path"""
+        tee = cls(session, url, cache)
+        tee.streaming = False
+        await tee.open()
+        return await tee.wait()
+
+
+async def read_file(path: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+    """Bytes [start, end) of a local file in large buffers, for an upload body"""
+    end = os.path.getsize(path) if end is None else end
+    with open(path, "rb") as source:
+        source.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = source.read(min(RELAY_BUFFER_BYTES, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
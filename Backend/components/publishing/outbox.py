@@ -0,0 +1,376 @@
+import asyncio
+import json
+import logging
+import random
+from typing import Awaitable, Callable, List, Optional
+
+from auth.credentials import credential_provider
+from config.config import get_db_connection, get_db_cursor, release_db_connection, settings
+from components.publishing.client import PublishResult
+from components.publishing.rate_governor import (
+    THROTTLED_BACKOFF_SECONDS, RateGovernor, account_key, is_rate_limited, rate_governor,
+)
+
+logger = logging.getLogger(__name__)
+
+# Job lifecycle: pending -> in_progress -> succeeded
+#                                       -> pending (retry after backoff) -> ... -> dead
+BATCH_SIZE = 10
+# A claimed job is handed to another worker if its lease is not renewed within this time
+LEASE_SECONDS = 300
+MAX_BACKOFF_SECONDS = 3600
+# Every key idempotency_key() makes starts with this; workers only claim jobs with their prefix
+KEY_PREFIX = "content-"
+
+JOB_FIELDS = [
+    "id", "content_id", "user_id", "company_id", "platform", "idempotency_key", "status",
+    "attempts", "max_attempts", "platform_post_id", "last_error", "payload",
+    "created_at", "updated_at",
+]
+
+
+class PublishOutbox:
+    """
+    Durable queue of publish jobs.
+
+    enqueue() records one job per content item, approval and schedule slot;
+    the idempotency key is unique, so a scheduler firing twice (or two
+    replicas firing at once) cannot queue the same post twice, while a post
+    approved again (after a dead job) gets a new key. Workers claim due jobs
+    with SELECT ... FOR UPDATE SKIP LOCKED and a lease, so any number of app
+    replicas can drain the outbox together, and a job held by a crashed
+    worker is picked up again once its lease runs out.
+
+    Each attempt is counted; failures are retried with exponential backoff
+    (PUBLISH_OUTBOX_BACKOFF_SECONDS doubling per attempt, with jitter) until
+    PUBLISH_OUTBOX_MAX_ATTEMPTS, after which the job is dead-lettered and the
+    content item goes back to 'needs_approval'. The platform post id is
+    stored on success.
+
+    The lease is renewed while the publisher runs, so a slow publish (a
+    large LinkedIn video) is not handed to a second worker. A worker that
+    dies between publishing and settling the job does leave it to be
+    published again once the lease expires; Instagram jobs are protected by
+    the container status check, the other platforms are not.
+
+    Before publishing, the rate governor must grant the job's account a
+    slot; otherwise the job is put back until one frees up, without using
+    an attempt. The same happens when the platform itself answers with a
+    rate limit.
+
+    publisher(job) must return a PublishResult. A worker only claims jobs
+    whose idempotency key starts with its key_prefix, so other users of the
+    table (the load test) never mix with the app's jobs.
+    """
+
+    def __init__(self, publisher: Callable[[dict], Awaitable[PublishResult]],
+                 poll_interval: Optional[float] = None, max_attempts: Optional[int] = None,
+                 backoff_seconds: Optional[float] = None, governor: Optional[RateGovernor] = None,
+                 key_prefix: str = KEY_PREFIX):
+        self.publisher = publisher
+        self.key_prefix = key_prefix
+        self.governor = governor or rate_governor
+        self.poll_interval = poll_interval or settings.PUBLISH_OUTBOX_POLL_SECONDS
+        self.max_attempts = max_attempts or settings.PUBLISH_OUTBOX_MAX_ATTEMPTS
+        self.backoff_seconds = backoff_seconds or settings.PUBLISH_OUTBOX_BACKOFF_SECONDS
+        self.wake = asyncio.Event()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.worker_task: Optional[asyncio.Task] = None
+
+    def ensure_schema(self):
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS publish_outbox (
+                    id SERIAL PRIMARY KEY,
+                    content_id INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    company_id INTEGER,
+                    platform VARCHAR(50) NOT NULL,
+                    idempotency_key VARCHAR(200) NOT NULL UNIQUE,
+                    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    next_attempt_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                    locked_until TIMESTAMP,
+                    platform_post_id VARCHAR(200),
+                    last_error TEXT,
+                    payload JSONB NOT NULL,
+                    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+                )
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_publish_outbox_due
+                ON publish_outbox (next_attempt_at)
+                WHERE status IN ('pending', 'in_progress')
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_publish_outbox_content
+                ON publish_outbox (content_id)
+            """)
+            # Bumped by each approval, so a re-approved post is queued under a new key
+            cursor.execute(
+                "ALTER TABLE content_items ADD COLUMN IF NOT EXISTS approval_generation INTEGER NOT NULL DEFAULT 0"
+            )
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Could not create publish_outbox table: {e}")
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    # -------- Records --------
+    def _execute(self, query: str, params: tuple = (), fetch: bool = False):
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            cursor.execute(query, params)
+            rows = cursor.fetchall() if fetch else None
+            conn.commit()
+            return rows
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    @staticmethod
+    def idempotency_key(content_id: int, platform: str, slot: str, approval: int = 0) -> str:
+        """One key per content item, platform, approval and schedule slot"""
+        return f"{KEY_PREFIX}{content_id}:{platform.lower()}:{slot}:a{approval}"
+
+    def enqueue(self, content_id: int, user_id: int, company_id: Optional[int], platform: str,
+                payload: dict, idempotency_key: str) -> Optional[int]:
+        """Queue a publish; returns the job id, or None if that key was already queued"""
+        return self.enqueue_many([{
+            "content_id": content_id,
+            "user_id": user_id,
+            "company_id": company_id,
+            "platform": platform,
+            "payload": payload,
+            "idempotency_key": idempotency_key,
+        }])[0]
+
+    def enqueue_many(self, jobs: List[dict]) -> List[Optional[int]]:
+        """Queue several publishes in one transaction (each a dict of enqueue() kwargs)"""
+        job_ids = []
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            for job in jobs:
+                cursor.execute("""
+                    INSERT INTO publish_outbox (content_id, user_id, company_id, platform,
+                                                idempotency_key, max_attempts, payload)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (idempotency_key) DO NOTHING
+                    RETURNING id
+                """, (job["content_id"], job["user_id"], job["company_id"], job["platform"].lower(),
+                      job["idempotency_key"], self.max_attempts, json.dumps(job["payload"], default=str)))
+                row = cursor.fetchone()
+                if row:
+                    # Out of the approved pool while the outbox owns it
+                    cursor.execute("UPDATE content_items SET status = 'publishing' WHERE id = %s",
+                                   (job["content_id"],))
+                job_ids.append(row[0] if row else None)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+        for job, job_id in zip(jobs, job_ids):
+            if job_id:
+                print(f"[INFO] Queued content {job['content_id']} for {job['platform']} (job {job_id})")
+            else:
+                print(f"[INFO] Content {job['content_id']} already queued for {job['platform']} "
+                      f"({job['idempotency_key']})")
+        if any(job_ids):
+            self.notify()
+        return job_ids
+
+    def notify(self):
+        """Wake the worker; safe to call from any thread"""
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.wake.set)
+
+    def get(self, job_id: int) -> Optional[dict]:
+        rows = self._execute(f"SELECT {', '.join(JOB_FIELDS)} FROM publish_outbox WHERE id = %s",
+                             (job_id,), fetch=True)
+        return dict(zip(JOB_FIELDS, rows[0])) if rows else None
+
+    def _claim_due(self) -> list:
+        rows = self._execute(f"""
+            UPDATE publish_outbox o
+            SET status = 'in_progress', attempts = o.attempts + 1,
+                locked_until = NOW() + INTERVAL '{LEASE_SECONDS} seconds', updated_at = NOW()
+            FROM (
+                SELECT id FROM publish_outbox
+                WHERE next_attempt_at <= NOW()
+                  AND (status = 'pending' OR (status = 'in_progress' AND locked_until < NOW()))
+                  AND idempotency_key LIKE %s
+                ORDER BY next_attempt_at
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            ) due
+            WHERE o.id = due.id
+            RETURNING {', '.join(f'o.{field}' for field in JOB_FIELDS)}
+        """, (self.key_prefix + "%", BATCH_SIZE), fetch=True)
+        return [dict(zip(JOB_FIELDS, row)) for row in rows]
+
+    def _succeed(self, job: dict, platform_post_id: Optional[str], pending: bool):
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            cursor.execute("""
+                UPDATE publish_outbox
+                SET status = 'succeeded', platform_post_id = %s, last_error = NULL,
+                    locked_until = NULL, updated_at = NOW()
+                WHERE id = %s
+            """, (platform_post_id, job["id"]))
+            if not pending:
+                cursor.execute("UPDATE content_items SET status = 'posted' WHERE id = %s", (job["content_id"],))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+        print(f"✅ Publish job {job['id']} succeeded (content {job['content_id']} on {job['platform']})")
+
+    def _retry_or_bury(self, job: dict, error: str):
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            if job["attempts"] >= job["max_attempts"]:
+                cursor.execute("""
+                    UPDATE publish_outbox
+                    SET status = 'dead', last_error = %s, locked_until = NULL, updated_at = NOW()
+                    WHERE id = %s
+                """, (error, job["id"]))
+                cursor.execute("UPDATE content_items SET status = 'needs_approval' WHERE id = %s",
+                               (job["content_id"],))
+                print(f"❌ Publish job {job['id']} dead after {job['attempts']} attempts: {error}")
+            else:
+                delay = min(MAX_BACKOFF_SECONDS, self.backoff_seconds * 2 ** (job["attempts"] - 1))
+                delay *= 0.5 + random.random()
+                cursor.execute("""
+                    UPDATE publish_outbox
+                    SET status = 'pending', last_error = %s, locked_until = NULL,
+                        next_attempt_at = NOW() + make_interval(secs => %s), updated_at = NOW()
+                    WHERE id = %s
+                """, (error, delay, job["id"]))
+                print(f"⚠️ Publish job {job['id']} attempt {job['attempts']} failed, retrying in {delay:.0f}s: {error}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    def _defer(self, job: dict, delay: float, reason: str):
+        """Put a job back for later without counting the attempt"""
+        self._execute("""
+            UPDATE publish_outbox
+            SET status = 'pending', attempts = GREATEST(attempts - 1, 0), last_error = %s,
+                locked_until = NULL, next_attempt_at = NOW() + make_interval(secs => %s), updated_at = NOW()
+            WHERE id = %s
+        """, (reason, delay, job["id"]))
+        print(f"[INFO] Publish job {job['id']} deferred {delay:.0f}s: {reason}")
+
+    def _renew_lease(self, job: dict) -> bool:
+        """Extend the lease of a job this worker still holds (same attempt); False if it lost it"""
+        rows = self._execute(f"""
+            UPDATE publish_outbox
+            SET locked_until = NOW() + INTERVAL '{LEASE_SECONDS} seconds'
+            WHERE id = %s AND status = 'in_progress' AND attempts = %s
+            RETURNING id
+        """, (job["id"], job["attempts"]), fetch=True)
+        return bool(rows)
+
+    async def _keep_lease(self, job: dict):
+        while True:
+            await asyncio.sleep(LEASE_SECONDS / 3)
+            try:
+                if not await asyncio.to_thread(self._renew_lease, job):
+                    logger.warning(f"Publish job {job['id']} lost its lease while publishing")
+                    return
+            except Exception as e:
+                logger.error(f"Could not renew the lease of publish job {job['id']}: {e}")
+
+    # -------- Worker --------
+    async def _rate_account(self, job: dict) -> Optional[str]:
+        """The account the job publishes from, as the rate governor counts it"""
+        try:
+            account = await asyncio.to_thread(credential_provider.get, job["user_id"], job["platform"])
+        except Exception as e:
+            logger.error(f"Could not load the account for publish job {job['id']}: {e}")
+            return None
+        return account_key(job["platform"], account)
+
+    async def process(self, job: dict):
+        account = await self._rate_account(job)
+        if account:
+            wait = await asyncio.to_thread(self.governor.acquire, job["platform"], account, job["id"])
+            if wait > 0:
+                await asyncio.to_thread(self._defer, job, wait, f"Rate limit for {job['platform']} account {account}")
+                return
+        lease = asyncio.get_running_loop().create_task(self._keep_lease(job))
+        try:
+            result = await self.publisher(job)
+            error = None if result else (getattr(result, "error", None) or "Publish failed")
+        except Exception as e:
+            result, error = None, str(e)
+        finally:
+            lease.cancel()
+
+        if error is None:
+            response = getattr(result, "response", None)
+            post_id = getattr(result, "post_id", None) or \
+                (response.get("container_id") if isinstance(response, dict) else None)
+            await asyncio.to_thread(self._succeed, job, post_id, getattr(result, "pending", False))
+        elif account and is_rate_limited(result):
+            await asyncio.to_thread(self.governor.throttle, job["platform"], account)
+            await asyncio.to_thread(self._defer, job, THROTTLED_BACKOFF_SECONDS, error)
+        else:
+            await asyncio.to_thread(self._retry_or_bury, job, error)
+
+    async def run_once(self) -> int:
+        jobs = await asyncio.to_thread(self._claim_due)
+        if jobs:
+            await asyncio.gather(*[self.process(job) for job in jobs])
+        return len(jobs)
+
+    async def _work_forever(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Publish outbox worker failed: {e}")
+            self.wake.clear()
+            try:
+                await asyncio.wait_for(self.wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        """Start the background worker (call from the app startup hook)"""
+        if self.worker_task is None or self.worker_task.done():
+            self.loop = asyncio.get_running_loop()
+            self.worker_task = self.loop.create_task(self._work_forever())
+
+    async def stop(self):
+        if self.worker_task:
+            self.worker_task.cancel()
+            try:
+                await self.worker_task
+            except asyncio.CancelledError:
+                pass
+            self.worker_task = None
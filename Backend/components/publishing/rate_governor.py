@@ -0,0 +1,226 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.config import get_db_connection, get_db_cursor, release_db_connection, settings
+
+logger = logging.getLogger(__name__)
+
+# Quotas as (limit, period seconds); a publish must fit every moving window of
+# its account and of the app. The daily limits are the documented ones; the
+# short ones spread a backlog (e.g. after an outage) out instead of sending it
+# at once.
+PLATFORM_QUOTAS = {
+    "instagram": {
+        # Content Publishing API: 100 API-published posts per account in a moving 24 hours
+        "account": [(100, 86400), (10, 600)],
+    },
+    "facebook": {
+        "account": [(200, 3600), (10, 600)],
+    },
+    "linkedin": {
+        # Share API: 150 requests per member and 100,000 per application per day
+        "account": [(150, 86400), (10, 600)],
+        "app": [(100000, 86400)],
+    },
+}
+# How long an account is held back after the platform itself reports a rate limit
+THROTTLED_BACKOFF_SECONDS = 900
+# Graph API error codes for app, user, page and custom rate limits
+GRAPH_RATE_LIMIT_CODES = {4, 17, 32, 613, 80001, 80002}
+
+Quotas = Dict[str, Dict[str, List[Tuple[int, float]]]]
+
+
+def default_quotas() -> Quotas:
+    """
+    PLATFORM_QUOTAS plus the Graph app-wide cap from GRAPH_APP_PUBLISHES_PER_HOUR.
+    Meta's app rate limit grows with the app's daily users, so there is no
+    fixed number that fits every deployment; it is off (0) by default and
+    a Graph rate-limit answer holds the account back instead.
+    """
+    quotas = {platform: dict(scopes) for platform, scopes in PLATFORM_QUOTAS.items()}
+    if settings.GRAPH_APP_PUBLISHES_PER_HOUR > 0:
+        for platform in ("instagram", "facebook"):
+            quotas[platform]["app"] = [(settings.GRAPH_APP_PUBLISHES_PER_HOUR, 3600)]
+    return quotas
+
+
+class RateGovernor:
+    """
+    Publish quotas per (platform, account) and per platform app, counted in
+    moving windows over the publish_outbox rows themselves.
+
+    The publish workers call acquire() before dispatching a job. Under a
+    per-platform advisory lock, it counts the publishes dispatched in each
+    window and, if all of them have room, stamps the job with its account
+    and dispatch time (which is what the next count sees); otherwise it
+    returns how long to wait. The counts live in the database, so every
+    replica sees the same usage and a restart does not refill anything.
+    throttle() holds an account back, for every replica, when a platform
+    reports a rate limit anyway.
+    """
+
+    def __init__(self, quotas: Optional[Quotas] = None):
+        self.quotas = default_quotas() if quotas is None else quotas
+
+    def ensure_schema(self):
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            cursor.execute("ALTER TABLE publish_outbox ADD COLUMN IF NOT EXISTS account_key VARCHAR(100)")
+            cursor.execute("ALTER TABLE publish_outbox ADD COLUMN IF NOT EXISTS dispatched_at TIMESTAMP")
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_publish_outbox_account_usage
+                ON publish_outbox (platform, account_key, dispatched_at)
+                WHERE dispatched_at IS NOT NULL
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_publish_outbox_app_usage
+                ON publish_outbox (platform, dispatched_at)
+                WHERE dispatched_at IS NOT NULL
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS publish_account_holds (
+                    platform VARCHAR(50) NOT NULL,
+                    account_key VARCHAR(100) NOT NULL,
+                    blocked_until TIMESTAMP NOT NULL,
+                    PRIMARY KEY (platform, account_key)
+                )
+            """)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Could not add the rate governor columns: {e}")
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    # -------- Usage --------
+    @staticmethod
+    def _window_wait(cursor, platform: str, account_id: Optional[str], limit: int, period: float) -> Tuple[int, float]:
+        """(publishes left, seconds until one frees up) in one moving window"""
+        scope = "platform = %s" + (" AND account_key = %s" if account_id else "")
+        params = (platform, account_id) if account_id else (platform,)
+        cursor.execute(f"""
+            SELECT COUNT(*) FROM publish_outbox
+            WHERE {scope} AND dispatched_at > NOW() - make_interval(secs => %s)
+        """, (*params, period))
+        used = cursor.fetchone()[0]
+        if used < limit:
+            return limit - used, 0.0
+        # The window frees up when the limit-th most recent publish falls out of it
+        cursor.execute(f"""
+            SELECT EXTRACT(EPOCH FROM dispatched_at + make_interval(secs => %s) - NOW())
+            FROM publish_outbox
+            WHERE {scope} AND dispatched_at > NOW() - make_interval(secs => %s)
+            ORDER BY dispatched_at DESC
+            OFFSET %s LIMIT 1
+        """, (period, *params, period, limit - 1))
+        row = cursor.fetchone()
+        return 0, (max(1.0, float(row[0])) if row else 1.0)
+
+    def _usage(self, cursor, platform: str, account_id: str) -> Tuple[int, float]:
+        """(publishes left, seconds to wait) across the account's and the app's windows and any hold"""
+        cursor.execute("""
+            SELECT EXTRACT(EPOCH FROM blocked_until - NOW()) FROM publish_account_holds
+            WHERE platform = %s AND account_key = %s AND blocked_until > NOW()
+        """, (platform, account_id))
+        row = cursor.fetchone()
+        if row:
+            return 0, float(row[0])
+
+        quotas = self.quotas.get(platform, {})
+        windows = [self._window_wait(cursor, platform, account_id, limit, period)
+                   for limit, period in quotas.get("account", [])]
+        windows += [self._window_wait(cursor, platform, None, limit, period)
+                    for limit, period in quotas.get("app", [])]
+        if not windows:
+            # No quota for this platform
+            return 1, 0.0
+        return min(left for left, _ in windows), max(wait for _, wait in windows)
+
+    def acquire(self, platform: str, account_id: str, job_id: int) -> float:
+        """Take a publish slot for an outbox job: 0 if granted, else the seconds to wait before trying again"""
+        platform = platform.lower()
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            # One grant at a time per platform, across every replica
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (f"publish-quota:{platform}",))
+            _, wait = self._usage(cursor, platform, account_id)
+            if wait <= 0:
+                cursor.execute("""
+                    UPDATE publish_outbox SET account_key = %s, dispatched_at = NOW()
+                    WHERE id = %s
+                """, (account_id, job_id))
+            conn.commit()
+            return wait
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    def throttle(self, platform: str, account_id: str, seconds: float = THROTTLED_BACKOFF_SECONDS):
+        """Hold an account back after the platform rejected a call for its rate"""
+        platform = platform.lower()
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            cursor.execute("""
+                INSERT INTO publish_account_holds (platform, account_key, blocked_until)
+                VALUES (%s, %s, NOW() + make_interval(secs => %s))
+                ON CONFLICT (platform, account_key) DO UPDATE SET blocked_until = EXCLUDED.blocked_until
+            """, (platform, account_id, seconds))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+        print(f"⚠️ {platform} account {account_id} rate limited, holding it back for {seconds:.0f}s")
+
+    def headroom(self, platform: str, account_id: str) -> dict:
+        """Publishes an account can make right now, and when the next one is allowed"""
+        platform = platform.lower()
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            available, wait = self._usage(cursor, platform, account_id)
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+        return {
+            "platform": platform,
+            "account_id": account_id,
+            "available": available,
+            "retry_after_seconds": round(wait, 1),
+            "quotas": [{"limit": limit, "period_seconds": period}
+                       for limit, period in self.quotas.get(platform, {}).get("account", [])],
+        }
+
+
+def is_rate_limited(result: Any) -> bool:
+    """Whether a failed PublishResult was refused for rate reasons"""
+    if getattr(result, "status_code", None) == 429:
+        return True
+    response = getattr(result, "response", None)
+    error = response.get("error") if isinstance(response, dict) else None
+    return isinstance(error, dict) and error.get("code") in GRAPH_RATE_LIMIT_CODES
+
+
+def account_key(platform: str, account: Any) -> Optional[str]:
+    """The account a platform counts publishes against, from a LinkedAccount"""
+    if account is None:
+        return None
+    if platform == "instagram":
+        return account.instagram_id or account.account_id
+    if platform == "facebook":
+        return account.page_id or account.account_id
+    return account.account_id
+
+
+# Shared rate governor for the app
+rate_governor = RateGovernor()
@@ -0,0 +1,151 @@
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from config.config import get_db_connection, get_db_cursor, release_db_connection
+
+logger = logging.getLogger(__name__)
+
+# schedule_day uses Python's numbering: 0 = Monday ... 6 = Sunday
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+# best_time as written by the strategy generator, e.g. "Monday 9AM", "Friday 6:30 PM"
+# or several slots: "Tuesday 10AM / Thursday 3PM"
+BEST_TIME = re.compile(
+    r"(?P<day>" + "|".join(WEEKDAYS) + r")\W*?(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<ampm>am|pm)?",
+    re.IGNORECASE,
+)
+BACKFILL_BATCH = 500
+
+Slot = Tuple[int, int, int]
+
+
+def parse_schedule_slots(best_time: Optional[str]) -> List[Slot]:
+    """Every (weekday, hour, minute) slot in a best_time string"""
+    slots = []
+    for match in BEST_TIME.finditer(best_time or ""):
+        hour, minute = int(match.group("hour")), int(match.group("minute") or 0)
+        ampm = (match.group("ampm") or "").lower()
+        if ampm == "pm" and hour != 12:
+            hour += 12
+        elif ampm == "am" and hour == 12:
+            hour = 0
+        if hour <= 23 and minute <= 59:
+            slots.append((WEEKDAYS.index(match.group("day").lower()), hour, minute))
+    return slots
+
+
+def next_occurrence(slots: List[Slot], now: datetime) -> Optional[Tuple[Slot, datetime]]:
+    """
+    The earliest slot from the start of today onwards, with its time. A slot
+    earlier today is returned as is (it is due), one earlier in the week
+    comes round next week.
+    """
+    best = None
+    for weekday, hour, minute in slots:
+        day = now.date() + timedelta(days=(weekday - now.weekday()) % 7)
+        at = datetime(day.year, day.month, day.day, hour, minute)
+        if best is None or at < best[1]:
+            best = ((weekday, hour, minute), at)
+    return best
+
+
+def schedule_columns(best_time: Optional[str], now: Optional[datetime] = None) -> dict:
+    """Normalized schedule columns for a content item (all None if best_time cannot be read)"""
+    occurrence = next_occurrence(parse_schedule_slots(best_time), now or datetime.now())
+    if not occurrence:
+        return {"schedule_day": None, "schedule_hour": None, "schedule_minute": None, "scheduled_at": None}
+    (weekday, hour, minute), at = occurrence
+    return {"schedule_day": weekday, "schedule_hour": hour, "schedule_minute": minute, "scheduled_at": at}
+
+
+def refresh_schedules(stale_only: bool = True, now: Optional[datetime] = None) -> int:
+    """
+    Recompute scheduled_at from best_time, in batches. With stale_only, only
+    unposted items whose slot is before today are moved on to their next
+    slot; otherwise every item without a schedule yet is filled in (backfill).
+    """
+    now = now or datetime.now()
+    today = datetime(now.year, now.month, now.day)
+    if stale_only:
+        condition = "scheduled_at < %s AND status NOT IN ('posted', 'rejected')"
+        params = (today,)
+    else:
+        condition = "scheduled_at IS NULL AND best_time IS NOT NULL"
+        params = ()
+
+    updated, last_id = 0, 0
+    conn = get_db_connection()
+    cursor = get_db_cursor(conn)
+    try:
+        while True:
+            cursor.execute(f"""
+                SELECT id, best_time FROM content_items
+                WHERE {condition} AND id > %s
+                ORDER BY id
+                LIMIT %s
+            """, (*params, last_id, BACKFILL_BATCH))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            for content_id, best_time in rows:
+                columns = schedule_columns(best_time, now)
+                cursor.execute("""
+                    UPDATE content_items
+                    SET schedule_day = %s, schedule_hour = %s, schedule_minute = %s, scheduled_at = %s
+                    WHERE id = %s
+                """, (columns["schedule_day"], columns["schedule_hour"], columns["schedule_minute"],
+                      columns["scheduled_at"], content_id))
+            conn.commit()
+            updated += len(rows)
+            last_id = rows[-1][0]
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        release_db_connection(conn)
+    return updated
+
+
+def ensure_schedule_schema():
+    """Add the normalized schedule columns and their indexes, then backfill existing items"""
+    conn = get_db_connection()
+    cursor = get_db_cursor(conn)
+    try:
+        cursor.execute("ALTER TABLE content_items ADD COLUMN IF NOT EXISTS schedule_day SMALLINT")
+        cursor.execute("ALTER TABLE content_items ADD COLUMN IF NOT EXISTS schedule_hour SMALLINT")
+        cursor.execute("ALTER TABLE content_items ADD COLUMN IF NOT EXISTS schedule_minute SMALLINT")
+        cursor.execute("ALTER TABLE content_items ADD COLUMN IF NOT EXISTS scheduled_at TIMESTAMP")
+        # A company's posts for a day (get_todays_posts)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_content_items_schedule
+            ON content_items (company_id, strategy_id, status, scheduled_at)
+        """)
+        # The scheduler's due and next-slot queries, across every company
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_content_items_approved_due
+            ON content_items (scheduled_at)
+            WHERE status = 'approved'
+        """)
+        # The daily stale sweep in refresh_schedules()
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_content_items_unposted_schedule
+            ON content_items (scheduled_at)
+            WHERE status NOT IN ('posted', 'rejected')
+        """)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Could not add content_items schedule columns: {e}")
+        return
+    finally:
+        cursor.close()
+        release_db_connection(conn)
+
+    try:
+        backfilled = refresh_schedules(stale_only=False)
+        if backfilled:
+            print(f"[INFO] Backfilled schedule columns for {backfilled} content items")
+    except Exception as e:
+        logger.error(f"Could not backfill content_items schedule columns: {e}")
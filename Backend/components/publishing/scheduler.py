@@ -0,0 +1,167 @@
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from config.config import get_db_connection, get_db_cursor, release_db_connection
+from components.publishing.outbox import PublishOutbox
+from components.publishing.schedule import refresh_schedules
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+# Upper bound on a sleep, so posts approved without a wake() are still picked up
+MAX_SLEEP_SECONDS = 300
+
+
+class PostingScheduler:
+    """
+    Backend scheduler for auto-posting, across every company.
+
+    Approved posts of each company's approved strategy are due once their
+    scheduled_at (normalized from best_time) has passed, on that day. The
+    scheduler hands due posts to the publish outbox in batches, then sleeps
+    until the earliest upcoming slot (at most MAX_SLEEP_SECONDS), or until
+    wake() is called when a post is approved. Slots left behind from
+    earlier in the week only appear when the day changes, so they are moved
+    on to next week once per day, on the first pass after midnight.
+    Nothing depends on a browser
+    being open. Running it on several replicas is safe: the outbox's
+    idempotency keys let only one of them queue a given post.
+    """
+
+    def __init__(self, outbox: PublishOutbox, max_sleep: float = MAX_SLEEP_SECONDS):
+        self.outbox = outbox
+        self.max_sleep = max_sleep
+        self.next_due: Optional[datetime] = None
+        self.refreshed_on: Optional[date] = None
+        self.wake_event = asyncio.Event()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def _due_items(self, now: datetime, after_id: int, company_id: Optional[int] = None) -> list:
+        """Approved posts of approved strategies whose slot is between the start of today and now"""
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            query = """
+                SELECT ci.id, ci.platform, ci.content_type, ci.best_time, ci.caption, ci.hashtags,
+                       ci.company_id, c.user_id, ci.strategy_id, ci.scheduled_at, ci.approval_generation
+                FROM content_items ci
+                JOIN companies c ON c.id = ci.company_id
+                JOIN LATERAL (
+                    SELECT s.id FROM strategies s
+                    WHERE s.company_id = ci.company_id AND s.status = 'approved'
+                    ORDER BY s.approved_at DESC
+                    LIMIT 1
+                ) approved ON approved.id = ci.strategy_id
+                WHERE ci.status = 'approved'
+                  AND ci.scheduled_at >= %s AND ci.scheduled_at <= %s
+                  AND ci.id > %s
+            """
+            params = [datetime(now.year, now.month, now.day), now, after_id]
+            if company_id is not None:
+                query += " AND ci.company_id = %s"
+                params.append(company_id)
+            cursor.execute(query + " ORDER BY ci.id LIMIT %s", (*params, BATCH_SIZE))
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    def _next_slot(self, now: datetime) -> Optional[datetime]:
+        conn = get_db_connection()
+        cursor = get_db_cursor(conn)
+        try:
+            cursor.execute("""
+                SELECT MIN(scheduled_at) FROM content_items
+                WHERE status = 'approved' AND scheduled_at > %s
+            """, (now,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+        finally:
+            cursor.close()
+            release_db_connection(conn)
+
+    def dispatch_due(self, company_id: Optional[int] = None) -> List[dict]:
+        """Queue every due post (optionally for one company); returns the posts queued"""
+        now = datetime.now()
+        if self.refreshed_on != now.date():
+            # Slots from earlier in the week move on to next week
+            refresh_schedules(stale_only=True, now=now)
+            self.refreshed_on = now.date()
+
+        queued, last_id = [], 0
+        while True:
+            rows = self._due_items(now, last_id, company_id)
+            if not rows:
+                break
+            batch = []
+            for content_id, platform, content_type, best_time, caption, hashtags, item_company_id, \
+                    user_id, strategy_id, scheduled_at, approval_generation in rows:
+                batch.append({
+                    "content_id": content_id,
+                    "user_id": user_id,
+                    "company_id": item_company_id,
+                    "platform": platform,
+                    "idempotency_key": self.outbox.idempotency_key(
+                        content_id, platform, scheduled_at.strftime("%Y-%m-%d"), approval_generation),
+                    "payload": {
+                        "id": content_id,
+                        "platform": platform,
+                        "content_type": content_type,
+                        "caption": caption,
+                        "hashtags": hashtags,
+                        "is_past_due": (now - scheduled_at) >= timedelta(hours=1),
+                        "strategy_id": strategy_id,
+                        "scheduled_time": best_time,
+                    },
+                })
+            job_ids = self.outbox.enqueue_many(batch)
+            queued.extend(job["payload"] for job, job_id in zip(batch, job_ids) if job_id)
+            last_id = rows[-1][0]
+
+        if company_id is None:
+            self.next_due = self._next_slot(now)
+        if queued:
+            print(f"[SCHEDULER] Queued {len(queued)} due posts")
+        return queued
+
+    def wake(self):
+        """Re-check now (e.g. after a post was approved); safe to call from any thread"""
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.wake_event.set)
+
+    def _sleep_seconds(self) -> float:
+        now = datetime.now()
+        # Wake at midnight at the latest, for the daily refresh
+        midnight = datetime(now.year, now.month, now.day) + timedelta(days=1)
+        wake_at = min(midnight, self.next_due) if self.next_due else midnight
+        return min(self.max_sleep, max(1.0, (wake_at - now).total_seconds()))
+
+    async def _run_forever(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.dispatch_due)
+            except Exception as e:
+                logger.error(f"Posting scheduler failed: {e}")
+            self.wake_event.clear()
+            try:
+                await asyncio.wait_for(self.wake_event.wait(), timeout=self._sleep_seconds())
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        """Start the scheduler loop (call from the app startup hook)"""
+        if self.task is None or self.task.done():
+            self.loop = asyncio.get_running_loop()
+            self.task = self.loop.create_task(self._run_forever())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
@@ -5,6 +5,7 @@ from config.config import settings
 from datetime import datetime
 import logging
 from config.config import get_db_connection, get_db_cursor, release_db_connection
+from components.publishing.schedule import schedule_columns
 
 # Initialize Groq client
 GROQ_API_KEY = settings.GROQ_API_KEY_4
@@ -406,6 +407,9 @@ def save_content_items_to_db(strategy_id, company_id, user_id, content):
                 # Use schedule time if available, otherwise use best_time
                 final_time = schedule_time if schedule_time else best_time
                 
+                # Parse the schedule once, into the normalized columns
+                schedule = schedule_columns(final_time)
+                
                 # Save to database
                 try:
                     cursor.execute("""
@@ -414,14 +418,17 @@ def save_content_items_to_db(strategy_id, company_id, user_id, content):
                             platform, content_type, description,
                             frequency, best_time, image_prompt,
                             video_idea, video_placeholder, story_idea,
-                            post_idea, caption, hashtags
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                            post_idea, caption, hashtags,
+                            schedule_day, schedule_hour, schedule_minute, scheduled_at
+                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                     """, (
                         strategy_id, company_id, user_id,
                         platform_name, type_name, description,
                         frequency, final_time, image_prompt,
                         video_idea, video_placeholder, story_idea,
-                        post_idea, caption, hashtags
+                        post_idea, caption, hashtags,
+                        schedule["schedule_day"], schedule["schedule_hour"],
+                        schedule["schedule_minute"], schedule["scheduled_at"]
                     ))
                     print(f"Saved item for {platform_name} - {type_name}")
                     print(f"Schedule time: {final_time}")
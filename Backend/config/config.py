@@ -69,6 +69,40 @@ class Settings:
         self.DB_MIN_CONNECTIONS = int(get_env("DB_MIN_CONNECTIONS", "1"))
         self.DB_MAX_CONNECTIONS = int(get_env("DB_MAX_CONNECTIONS", "10"))
         
+        # Generated media encoding
+        self.IMAGE_ENCODE_QUALITY = int(get_env("IMAGE_ENCODE_QUALITY", "85"))
+        
+        # Video generation jobs (Replicate predictions)
+        self.REPLICATE_API_BASE = get_env("REPLICATE_API_BASE", "https://api.replicate.com")
+        self.VIDEO_JOB_WEBHOOK_URL = get_env("VIDEO_JOB_WEBHOOK_URL", "")
+        self.VIDEO_JOB_POLL_SECONDS = float(get_env("VIDEO_JOB_POLL_SECONDS", "10"))
+        self.VIDEO_JOB_WORKERS = int(get_env("VIDEO_JOB_WORKERS", "2"))
+        
+        # Media uploads (chunked Cloudinary uploads)
+        self.CLOUDINARY_UPLOAD_BASE = get_env("CLOUDINARY_UPLOAD_BASE", "https://api.cloudinary.com")
+        self.UPLOAD_MAX_CONCURRENCY = int(get_env("UPLOAD_MAX_CONCURRENCY", "4"))
+        self.UPLOAD_CHUNK_MB = int(get_env("UPLOAD_CHUNK_MB", "6"))
+        self.UPLOAD_MAX_RETRIES = int(get_env("UPLOAD_MAX_RETRIES", "5"))
+        
+        # Social publishing (Meta Graph API / LinkedIn)
+        self.GRAPH_API_BASE = get_env("GRAPH_API_BASE", "https://graph.facebook.com/v22.0")
+        self.LINKEDIN_API_BASE = get_env("LINKEDIN_API_BASE", "https://api.linkedin.com")
+        self.PUBLISH_MAX_CONNECTIONS = int(get_env("PUBLISH_MAX_CONNECTIONS", "100"))
+        self.PUBLISH_PER_HOST_LIMIT = int(get_env("PUBLISH_PER_HOST_LIMIT", "10"))
+        # Graph API calls for the same token within this window share a batch request (0 = off)
+        self.GRAPH_BATCH_WINDOW_MS = float(get_env("GRAPH_BATCH_WINDOW_MS", "200"))
+        # Publish outbox (retries, backoff, dead letters)
+        self.PUBLISH_OUTBOX_POLL_SECONDS = float(get_env("PUBLISH_OUTBOX_POLL_SECONDS", "5"))
+        self.PUBLISH_OUTBOX_MAX_ATTEMPTS = int(get_env("PUBLISH_OUTBOX_MAX_ATTEMPTS", "5"))
+        self.PUBLISH_OUTBOX_BACKOFF_SECONDS = float(get_env("PUBLISH_OUTBOX_BACKOFF_SECONDS", "30"))
+        # App-wide cap on Instagram and Facebook publishes per hour (0 = none; Meta's own limit scales with users)
+        self.GRAPH_APP_PUBLISHES_PER_HOUR = int(get_env("GRAPH_APP_PUBLISHES_PER_HOUR", "0"))
+        # Decrypted linked-account tokens are kept in memory this long
+        self.CREDENTIAL_CACHE_TTL_SECONDS = float(get_env("CREDENTIAL_CACHE_TTL_SECONDS", "300"))
+        # Dashboard analytics: served as is while fresh, served and refreshed in the background while stale
+        self.ANALYTICS_CACHE_FRESH_SECONDS = float(get_env("ANALYTICS_CACHE_FRESH_SECONDS", "300"))
+        self.ANALYTICS_CACHE_STALE_SECONDS = float(get_env("ANALYTICS_CACHE_STALE_SECONDS", "3600"))
+        
         
         print("✅ Configuration loaded successfully")
 
@@ -1,31 +1,29 @@
 # image_analyzer.py
-import requests
 import json
 import numpy as np
-from io import BytesIO
 from PIL import Image, ImageStat, ImageFilter, ImageEnhance, ImageDraw, ImageFont, ImageOps
 import colorsys
 from collections import Counter
 import re
+from components.media.media_fetcher import media_fetcher
 
 class LogoAnalyzer:
     """Analyze company logos to extract design characteristics"""
     
-    def __init__(self, image_url):
+    def __init__(self, image_url, image=None):
         self.image_url = image_url
-        self.image = None
+        self.image = image
         self.analysis_results = {}
     
     def load_image(self):
-        """Download and load the image"""
+        """Download and load the image (unless it was already provided)"""
         try:
-            response = requests.get(self.image_url)
-            if response.status_code != 200:
-                raise Exception(f"Failed to download image: {response.status_code}")
-                
-            self.image = Image.open(BytesIO(response.content))
-            if self.image.mode != 'RGB':
-                self.image = self.image.convert('RGB')
+            if self.image is not None:
+                if self.image.mode != 'RGB':
+                    self.image = self.image.convert('RGB')
+                return True
+            
+            self.image = media_fetcher.fetch_image(self.image_url, mode='RGB')
             return True
         except Exception as e:
             self.analysis_results["error"] = f"Image loading error: {str(e)}"
@@ -98,9 +96,9 @@ class LogoAnalyzer:
             
         return self.analysis_results
 
-def get_logo_description(logo_url):
-    """Get a natural language description of a logo"""
-    analyzer = LogoAnalyzer(logo_url)
+def get_logo_description(logo_url, image=None):
+    """Get a natural language description of a logo (pass image to skip the download)"""
+    analyzer = LogoAnalyzer(logo_url, image=image)
     analysis = analyzer.analyze_logo()
     
     if not analysis or "error" in analysis:
@@ -38,6 +38,7 @@ from components.insightsBIData.insights_platforms_data import (
     get_instagram_analytics,
     get_linkedin_analytics
 )
+from components.insightsBIData.analytics_cache import analytics_cache
 
 
 # For web scraping 
@@ -65,8 +66,7 @@ from components.Mail.mails import send_influencer_emails
 # For Linked Accounts : 
 import os
 from cryptography.fernet import Fernet
-from auth.meta_oauth import MetaOAuth
-from auth.linkedin_oauth import LinkedInOAuth
+from auth.credentials import credential_provider
 
 # Import Groq client
 from groq import Groq
@@ -111,14 +111,11 @@ cloudinary.config(
     api_key = settings.CLOUDINARY_API_KEY,
     api_secret = settings.CLOUDINARY_API_SECRET,
     secure=True,
-    # Add this to enable video uploads
+    # Add this to enable video uploads (reel covers are extracted locally
+    # while finishing, so no eager thumbnail transformations)
     video_upload_options={
         'resource_type': 'video',
-        'chunk_size': 6000000,
-        'eager': [
-            {'width': 300, 'height': 300, 'crop': 'pad', 'audio_codec': 'none'},
-            {'width': 160, 'height': 100, 'crop': 'crop', 'gravity': 'south', 'audio_codec': 'none'}
-        ]
+        'chunk_size': 6000000
     }
 )
 
@@ -140,6 +137,40 @@ app.include_router(logout_router)
 app.include_router(company_router) 
 
 app.include_router(settings_router)
+@app.on_event("startup")
+async def media_startup():
+    # Make sure the media tables exist
+    base_image_library.ensure_schema()
+    overlay_phrase_pool.ensure_schema()
+    video_job_manager.ensure_schema()
+    # Normalized schedule columns on content_items (backfilled once)
+    ensure_schedule_schema()
+    instagram_containers.ensure_schema()
+    publish_outbox.ensure_schema()
+    rate_governor.ensure_schema()
+    # Track running video generations and Instagram containers in the background
+    video_job_manager.start()
+    instagram_containers.start()
+    # Queue due posts for every company and drain the queue
+    publish_outbox.start()
+    posting_scheduler.start()
+    # Pre-mix the background music beds for the usual clip lengths
+    audio_bed_cache.prewarm_in_background("./sounds/bg_music.mp3")
+    # Remove expired media cache files, also on replicas that never publish to LinkedIn
+    media_cache.start()
+    # Pooled HTTP sessions (insights)
+    await session_registry.start()
+
+@app.on_event("shutdown")
+async def media_shutdown():
+    await video_job_manager.stop()
+    await instagram_containers.stop()
+    await posting_scheduler.stop()
+    await publish_outbox.stop()
+    await media_cache.stop()
+    await publishing_client.close()
+    await session_registry.close()
+
 @app.get("/", response_class=HTMLResponse)
 def landing_page(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
@@ -303,21 +334,24 @@ async def get_facebook_analytics_endpoint(
     days: int = Query(default=30, ge=1, le=90),
     user: dict = Depends(get_current_user)
 ):
-    return await get_facebook_analytics(user["user_id"], cursor, days)
+    return await analytics_cache.get((user["user_id"], "facebook", days),
+                                     lambda: get_facebook_analytics(user["user_id"], cursor, days))
 
 @app.get("/get_instagram_analytics")
 async def get_instagram_analytics_endpoint(
     days: int = Query(default=14, ge=1, le=90),
     user: dict = Depends(get_current_user)
 ):
-    return await get_instagram_analytics(user["user_id"], cursor, days)
+    return await analytics_cache.get((user["user_id"], "instagram", days),
+                                     lambda: get_instagram_analytics(user["user_id"], cursor, days))
 
 @app.get("/get_linkedin_analytics")
 async def get_linkedin_analytics_endpoint(
     days: int = Query(default=30, ge=1, le=90),
     user: dict = Depends(get_current_user)
 ):
-    return await get_linkedin_analytics(user["user_id"], days)
+    return await analytics_cache.get((user["user_id"], "linkedin", days),
+                                     lambda: get_linkedin_analytics(user["user_id"], days))
 
 
 
@@ -896,12 +930,22 @@ def upload_image_to_cloudinary(image_data, public_id=None, resource_type="image"
         Direct URL to the uploaded media
     """
     try:
-        upload_result = cloudinary.uploader.upload(
-            image_data,
-            public_id=public_id,
-            overwrite=True,
-            resource_type=resource_type  # This now accepts either "image" or "video"
-        )
+        if isinstance(image_data, str) and not os.path.exists(image_data):
+            # Remote URLs and base64 data are handed to Cloudinary as-is
+            upload_result = cloudinary.uploader.upload(
+                image_data,
+                public_id=public_id,
+                overwrite=True,
+                resource_type=resource_type  # This now accepts either "image" or "video"
+            )
+        else:
+            # Files and buffers go through the upload manager (retries, chunking, concurrency cap)
+            upload_result = upload_manager.upload(
+                image_data,
+                resource_type=resource_type,
+                public_id=public_id,
+                params={"overwrite": "true"}
+            )
         # Return the secure URL which is directly accessible
         return upload_result["secure_url"]
     except Exception as e:
@@ -909,6 +953,13 @@ def upload_image_to_cloudinary(image_data, public_id=None, resource_type="image"
         raise e
    
 
+def log_upload_progress(event):
+    """Upload progress events, printed for the server log"""
+    if event["status"] == "retrying":
+        print(f"[UPLOAD] {event['public_id']}: retry {event.get('attempt')} after {event.get('error')}")
+    elif event["status"] == "uploading" and event.get("percent") is not None:
+        print(f"[UPLOAD] {event['public_id']}: {event['percent']}% of {event['total_bytes'] / 1024 / 1024:.1f} MB")
+
 # Update the upload_video_to_cloudinary function to handle Cloudinary video format issues
 # Update the upload_video_to_cloudinary function
 def upload_video_to_cloudinary(file_path, public_id=None):
@@ -918,15 +969,15 @@ def upload_video_to_cloudinary(file_path, public_id=None):
     try:
         print(f"Uploading video to Cloudinary: {file_path}")      
         
-        # Upload the video with proper video settings
-        upload_result = cloudinary.uploader.upload(
+        # Chunked, resumable upload: a failed chunk is retried on its own
+        # instead of restarting the whole video
+        upload_result = upload_manager.upload(
             file_path,
-            public_id=public_id,
             resource_type="video",
-            overwrite=True,
-            timeout=120,
+            public_id=public_id,
             # Ensure proper video format
-            format="mp4"
+            params={"overwrite": "true", "format": "mp4"},
+            on_progress=log_upload_progress
         )
         
         print(f"✅ Video uploaded successfully: {upload_result['secure_url']}")
@@ -1096,6 +1147,13 @@ from sklearn.cluster import KMeans
 import replicate
 from fastapi import Depends, HTTPException
 from fastapi.responses import JSONResponse
+from components.media.image_encoding import encode_image, check_dimensions
+from components.media.base_image_library import base_image_library
+from components.media.pipeline import StageGraph, StageError
+from components.media.overlay_phrases import overlay_phrase_pool
+from components.media.video_jobs import VideoJobManager
+from components.media.audio_beds import audio_bed_cache
+from components.media.media_fetcher import media_fetcher, temporary_path, remove_quietly, MAX_VIDEO_BYTES, MAX_IMAGE_BYTES
 
 # Set up Replicate API token
 os.environ['REPLICATE_API_TOKEN'] = "r8_1kslnW8cJhxvkVjomgq4hlW5LNFvc8g4XHo8T"
@@ -1317,10 +1375,7 @@ class UniversalSocialFramer:
 
     # -------- Utilities --------
     def download_image(self, url: str) -> Image.Image:
-        r = requests.get(url, stream=True, timeout=30)
-        r.raise_for_status()
-        img = Image.open(io.BytesIO(r.content))
-        return img.convert("RGBA")
+        return media_fetcher.fetch_image(url, mode="RGBA")
 
     def _fit_inside_box(self, img: Image.Image, box_w: int, box_h: int) -> Image.Image:
         """Resize img to fit within (box_w, box_h) preserving aspect ratio."""
@@ -1360,10 +1415,14 @@ class UniversalSocialFramer:
         top_margin: int = 20,
         bottom_margin: int = 60,
         inner_pad_x: int = 40,
+        website_text: Optional[str] = None,
+        analyze_logo: bool = True,
     ) -> Image.Image:
         """Create complete framed post with dynamic colors from logo."""
-        # First analyze the logo to set our brand colors
-        self._set_colors_from_logo(logo_image)
+        # First analyze the logo to set our brand colors (skipped when the
+        # caller already did it for a batch of variants)
+        if analyze_logo or self.BRAND_ColorDom is None:
+            self._set_colors_from_logo(logo_image)
         
         # Get platform-specific dimensions
         W, H = self.get_platform_dimensions(platform, content_type)
@@ -1423,10 +1482,9 @@ class UniversalSocialFramer:
             bottom_y = H - bottom_margin + 10
             website_font = self.get_font(30)  # Larger font like original
             # website_text = "nearshorepublic.com"
-            # Get website from database
-            cursor.execute("SELECT website FROM companies WHERE id = %s", (company_id,))
-            company_data = cursor.fetchone()
-            website_text = company_data[0] if company_data and company_data[0] else "CompanySite.com"
+            # Get website from database unless it was passed in
+            if website_text is None:
+                website_text = self.get_company_website(company_id)
     
             # Calculate position for right alignment
             bbox = draw.textbbox((0, 0), website_text, font=website_font)
@@ -1447,6 +1505,51 @@ class UniversalSocialFramer:
     ) -> Image.Image:
         return self.build_frame_with_elements(main_image, logo_image, platform, content_type, company_id, overlay_text=overlay_text)
 
+    def get_company_website(self, company_id: int) -> str:
+        """Website shown in the frame footer"""
+        cursor.execute("SELECT website FROM companies WHERE id = %s", (company_id,))
+        company_data = cursor.fetchone()
+        return company_data[0] if company_data and company_data[0] else "CompanySite.com"
+
+    def render_platform_variants(
+        self,
+        main_image: Image.Image,
+        logo_image: Image.Image,
+        targets: List[Tuple[str, str]],
+        company_id: int,
+        overlay_text: str = " ",
+    ) -> List[Image.Image]:
+        """
+        Render one framed image per (platform, content_type) target from a single base image.
+        The base and logo are decoded once, and the logo colors and website lookup
+        are shared by every variant instead of being redone per frame.
+        """
+        main_rgba = main_image.convert("RGBA")
+        logo_rgba = logo_image.convert("RGBA")
+        self._set_colors_from_logo(logo_rgba)
+        website_text = self.get_company_website(company_id)
+
+        # Downscale the base once to the largest canvas; every variant then
+        # resizes from this smaller copy instead of the full generator output
+        max_w = max(self.get_platform_dimensions(p, c)[0] for p, c in targets)
+        max_h = max(self.get_platform_dimensions(p, c)[1] for p, c in targets)
+        if main_rgba.width > max_w or main_rgba.height > max_h:
+            main_rgba = self._fit_inside_box(main_rgba, max_w, max_h)
+
+        variants = []
+        for platform, content_type in targets:
+            variants.append(self.build_frame_with_elements(
+                main_rgba,
+                logo_rgba,
+                platform,
+                content_type,
+                company_id,
+                overlay_text=overlay_text,
+                website_text=website_text,
+                analyze_logo=False,
+            ))
+        return variants
+
 # Initialize the framer
 universal_framer = UniversalSocialFramer()
 
@@ -1455,232 +1558,37 @@ def download_logo(logo_url):
     """Download the logo from the provided URL"""
     try:
         print("Downloading logo...")
-        response = requests.get(logo_url)
-        response.raise_for_status()
-        
-        # Create a temporary file
-        temp_logo = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-        temp_logo.write(response.content)
-        temp_logo.close()
+        # Streamed to a temp file (removed again if the download fails)
+        logo = media_fetcher.fetch_to_file(logo_url, suffix=".png", max_bytes=MAX_IMAGE_BYTES)
         
         print("✅ Logo downloaded successfully!")
-        return temp_logo.name
+        return logo.path
     except Exception as e:
         print(f"❌ Error downloading logo: {e}")
         return None
 
-def add_background_music(video_path, audio_path, output_path):
-    """Add background music to video using moviepy"""
-    try:
-        from moviepy.editor import VideoFileClip, AudioFileClip, CompositeAudioClip
-        
-        print("Adding background music...")
-        
-        # Load video and audio
-        video = VideoFileClip(video_path)
-        
-        # Check if audio file exists
-        if not os.path.exists(audio_path):
-            print(f"⚠️  Audio file {audio_path} not found, continuing without background music")
-            # If audio doesn't exist, just copy the video
-            shutil.copy2(video_path, output_path)
-            return False
-        
-        audio = AudioFileClip(audio_path)
-        
-        # Loop audio if video is longer, or trim if audio is longer
-        if audio.duration < video.duration:
-            # Loop the audio to match video length
-            loops_needed = int(video.duration / audio.duration) + 1
-            audio_list = [audio] * loops_needed
-            from moviepy.editor import concatenate_audioclips
-            audio = concatenate_audioclips(audio_list)
-            audio = audio.subclip(0, video.duration)
-        else:
-            # Trim audio to match video length
-            audio = audio.subclip(0, video.duration)
-        
-        # Set audio volume to 30% to not overpower original video audio
-        audio = audio.volumex(0.3)
-        
-        # Combine original audio with background music (if original video has audio)
-        if video.audio is not None:
-            final_audio = CompositeAudioClip([video.audio, audio])
-        else:
-            final_audio = audio
-        
-        # Set audio to video
-        final_video = video.set_audio(final_audio)
-        
-        # Write final video
-        final_video.write_videofile(
-            output_path,
-            codec='libx264',
-            audio_codec='aac',
-            threads=4,  # Use multiple threads for faster processing
-            preset='fast'  # Faster encoding
-        )
-        
-        # Clean up
-        video.close()
-        audio.close()
-        final_video.close()
-        
-        print("✅ Background music added successfully!")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Error adding background music: {e}")
-        print("Continuing without background music...")
-        # If audio fails, just copy the video without audio processing
-        shutil.copy2(video_path, output_path)
-        return False
-
-def create_logo_frame(width, height, logo_path):
-    """Create a frame with logo using PIL and OpenCV"""
-    # Create white background
-    img = Image.new('RGB', (width, height), color='white')
-    
-    try:
-        # Load logo with transparency support
-        logo = Image.open(logo_path)
-        
-        # Convert to RGBA if not already
-        if logo.mode != 'RGBA':
-            logo = logo.convert('RGBA')
-        
-        # Resize logo to fit (max 40% of width)
-        max_width = int(width * 0.4)
-        max_height = int(height * 0.4)
-        
-        logo.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
-        
-        # Center the logo
-        x = (width - logo.width) // 2
-        y = (height - logo.height) // 2
-        
-        # Paste logo onto white background with transparency support
-        img.paste(logo, (x, y), logo)  # The third parameter handles transparency
-        
-    except Exception as e:
-        print(f"Warning: Could not process logo: {e}")
-    
-    # Convert to OpenCV format
-    return cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-
-def apply_fade_effect(frame, fade_type, progress):
-    """Apply fade in/out effect to a frame"""
-    if fade_type == "out":
-        alpha = 1.0 - progress
-    else:  # fade in
-        alpha = progress
-    
-    # Create fade effect
-    faded = frame * alpha
-    return faded.astype(np.uint8)
-
-# Update the create_enhanced_video function to fix flickering
-def create_enhanced_video(original_video_path, logo_path, output_path):
-    """Add fadeout and logo to the original video using OpenCV"""
-    cap = None
-    out = None
-    
-    try:
-        print("Starting video post-processing...")
-        
-        # Open original video
-        cap = cv2.VideoCapture(original_video_path)
-        
-        if not cap.isOpened():
-            print("❌ Error: Could not open video file")
-            return False
-        
-        # Get video properties
-        fps = int(cap.get(cv2.CAP_PROP_FPS))
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        
-        print(f"Video properties: {width}x{height} at {fps} FPS, {total_frames} frames")
-        
-        # Create video writer
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-        
-        if not out.isOpened():
-            print("❌ Error: Could not create output video")
-            return False
-        
-        # Process original video frames with fadeout at the end
-        frames_processed = 0
-        fadeout_start_frame = max(0, total_frames - fps)  # Start fadeout 1 second before end
-        
-        print("Processing original video frames...")
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            frames_processed += 1
-            
-            # Apply fadeout to last second only
-            if frames_processed >= fadeout_start_frame:
-                fade_progress = (frames_processed - fadeout_start_frame) / min(fps, total_frames - fadeout_start_frame)
-                frame = apply_fade_effect(frame, "out", fade_progress)
-            
-            out.write(frame)
-        
-        print("✅ Original video processed with fadeout")
-        
-        # Release the original video capture
-        cap.release()
-        
-        # Add logo scene (2 seconds) if logo exists - ONLY AFTER original video
-        if logo_path and os.path.exists(logo_path):
-            print("Adding logo scene...")
-            logo_frames = fps * 2  # 2 seconds of logo
-            logo_frame = create_logo_frame(width, height, logo_path)
-            
-            for i in range(logo_frames):
-                frame = logo_frame.copy()
-                
-                # Apply fade in for first 0.5 seconds and fade out for last 0.5 seconds
-                if i < fps // 2:  # First 0.5 seconds fade in
-                    progress = i / (fps // 2)
-                    frame = apply_fade_effect(frame, "in", progress)
-                elif i > logo_frames - fps // 2:  # Last 0.5 seconds fade out
-                    progress = (logo_frames - i) / (fps // 2)
-                    frame = apply_fade_effect(frame, "out", progress)
-                else:
-                    # Middle section - no fade effect
-                    frame = logo_frame.copy()
-                
-                out.write(frame)
-            
-            print("✅ Logo scene added")
-        else:
-            print("⚠️  Logo not available, skipping logo scene")
-        
-        print(f"🎉 Enhanced video saved as '{output_path}'")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Error during video post-processing: {e}")
-        import traceback
-        traceback.print_exc()
-        return False
-        
-    finally:
-        # Clean up
-        if cap:
-            cap.release()
-        if out:
-            out.release()
-        cv2.destroyAllWindows()
+from components.media.video_processing import (
+    add_background_music,
+    create_logo_frame,
+    apply_fade_effect,
+    create_enhanced_video,
+)
+from components.media.video_finishing import postprocess_video
+from components.media.video_encoding import get_video_profile
+from components.media.reel_cover import load_cover
+from components.media.upload_manager import upload_manager
+from components.media.media_cache import media_cache
+from components.net.sessions import session_registry
+from components.publishing.client import publishing_client
+from components.publishing.instagram_containers import instagram_containers
+from components.publishing.outbox import PublishOutbox
+from components.publishing.rate_governor import PLATFORM_QUOTAS, account_key, rate_governor
+from components.publishing.scheduler import PostingScheduler
+from components.publishing.schedule import ensure_schedule_schema, schedule_columns
 
 # Update the generate_video_with_logo function to include background music
 def generate_video_with_logo(prompt, logo_url):
-    """Generate a video with the given prompt and add logo branding"""
+    """Generate a video with the given prompt and add logo branding (blocks for the whole generation)"""
     try:
         print(f"Generating video with prompt: {prompt}")
         
@@ -1694,80 +1602,187 @@ def generate_video_with_logo(prompt, logo_url):
         video_url = str(output)
         print(f"Video generated successfully: {video_url}")
         
-        # Download the original video
+        return finish_generated_video(video_url, logo_url)
+            
+    except Exception as e:
+        print(f"❌ Error generating video: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+def finish_generated_video(video_url, logo_url, platform=None, cover_path=None):
+    """
+    Download a generated video and add the logo outro and background music,
+    encoded with the platform's profile when known; returns the final file path.
+    With a cover_path, a cover frame is extracted during the same pass.
+    """
+    logo_path = None
+    final_video_path = None
+    success = False
+    try:
+        # Stream the original video to a temp file (removed when the block exits)
         print("Downloading original video...")
-        response = requests.get(video_url)
-        response.raise_for_status()
-        
-        # Create temporary files
-        original_video_path = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4").name
-        with open(original_video_path, "wb") as file:
-            file.write(response.content)
-        
-        print("✅ Original video downloaded!")
-        
-        # Download logo
-        logo_path = download_logo(logo_url)
-        
-        # Create enhanced video with post-processing
-        enhanced_video_path = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4").name
-        success = create_enhanced_video(
-            original_video_path, 
-            logo_path, 
-            enhanced_video_path
-        )
-        
-        # Add background music if available
-        final_video_path = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4").name
-        bg_music_path = "./sounds/bg_music.mp3"  # Audio file in the same directory as main.py
-        
-        # Check if background music file exists
-        if os.path.exists(bg_music_path):
-            print("Adding background music...")
-            add_background_music(enhanced_video_path, bg_music_path, final_video_path)
-        else:
-            print("⚠️  Background music file not found, proceeding without music")
-            shutil.copy2(enhanced_video_path, final_video_path)
-        
-        # Clean up temporary files
-        try:
-            os.remove(original_video_path)
-            os.remove(enhanced_video_path)
-            if logo_path and os.path.exists(logo_path):
-                os.remove(logo_path)
-        except:
-            pass
+        with media_fetcher.download(video_url, suffix=".mp4", max_bytes=MAX_VIDEO_BYTES) as original_video:
+            print(f"✅ Original video downloaded! ({original_video.num_bytes / 1024 / 1024:.1f} MB)")
+            
+            # Download logo
+            logo_path = download_logo(logo_url)
+            
+            # Fade out, logo outro and background music in one ffmpeg pass
+            # (falls back to the OpenCV + moviepy path when ffmpeg is missing)
+            fd, final_video_path = tempfile.mkstemp(suffix=".mp4")
+            os.close(fd)
+            bg_music_path = "./sounds/bg_music.mp3"  # Audio file in the same directory as main.py
+            success = postprocess_video(
+                original_video.path,
+                logo_path,
+                final_video_path,
+                music_path=bg_music_path,
+                profile=get_video_profile(platform),
+                cover_path=cover_path
+            )
         
-        if success:
-            return final_video_path
-        else:
-            return None
+        return final_video_path if success else None
             
     except Exception as e:
-        print(f"❌ Error generating video: {e}")
+        print(f"❌ Error finishing video: {e}")
         import traceback
         traceback.print_exc()
         return None
+    finally:
+        # Clean up temporary files; the final video is kept only on success
+        remove_quietly(logo_path)
+        if not success:
+            remove_quietly(final_video_path)
+
+def store_generated_video(video_path, platform, content_type, company_id):
+    """Upload a finished video to Cloudinary (keeping it under /static/vids if the upload fails); returns its URL"""
+    # Save the video locally first
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    unique_id = str(uuid.uuid4())[:8]
+    filename = f"{platform.lower()}_{content_type.lower().replace(' ', '_')}_{company_id}_{timestamp}_{unique_id}.mp4"
+    local_video_path = f"/static/vids/{filename}"
+    
+    # Copy the temporary video to our local storage
+    shutil.copy2(video_path, local_video_path)
+    print(f"✅ Video saved locally: {local_video_path}")
+    
+    # Upload to Cloudinary using the video-specific function
+    public_id = f"{platform.lower()}_{content_type.lower().replace(' ', '_')}_{company_id}_{timestamp}_{unique_id}"
+    
+    try:
+        cloudinary_url = upload_video_to_cloudinary(local_video_path, public_id)
+        print(f"✅ Video uploaded to Cloudinary: {cloudinary_url}")
+        
+        # Move a LinkedIn video into the media cache, so the LinkedIn relay reads
+        # it from disk instead of downloading it back from Cloudinary; the
+        # other platforms publish from the URL, so their copy is just removed
+        if platform.lower() == "linkedin" and media_cache.adopt(cloudinary_url, local_video_path):
+            print("✅ Local video moved to the media cache after Cloudinary upload")
+        else:
+            remove_quietly(local_video_path)
+            
+    except Exception as e:
+        print(f"[ERROR] Failed to upload video to Cloudinary: {e}")
+        # Use local path if Cloudinary fails
+        cloudinary_url = f"/static/vids/{filename}"
+    
+    return cloudinary_url
+
+def upload_reel_cover(cover_path, logo_url, company_id, public_id):
+    """Frame an extracted cover frame with the brand kit (rails, logo, website) and upload it"""
+    cover_image = load_cover(cover_path)
+    logo_image = download_logo_image(logo_url)
+    framed_cover = universal_framer.build_frame_with_elements(
+        cover_image,
+        logo_image,
+        "Instagram",
+        "Instagram Stories",  # Full-screen 9:16, same as the reel
+        company_id,
+        website_text=universal_framer.get_company_website(company_id),
+    )
+    encoded_cover = encode_image(framed_cover, "instagram")
+    cover_url = upload_image_to_cloudinary(encoded_cover.stream(), public_id=public_id)
+    print(f"✅ Reel cover uploaded: {cover_url}")
+    return cover_url
+
+def finalize_video_job(job, video_url):
+    """Video job finisher: brand the generated video and store it, with a cover for reels"""
+    wants_cover = (job["platform"] or "").lower() == "instagram" and bool(job["logo_url"])
+    cover_path = None
+    if wants_cover:
+        fd, cover_path = tempfile.mkstemp(suffix=".jpg")
+        os.close(fd)
+    
+    video_path = None
+    try:
+        video_path = finish_generated_video(video_url, job["logo_url"], job["platform"], cover_path)
+        if not video_path:
+            raise RuntimeError("Failed to post-process generated video")
+        
+        media_url = store_generated_video(video_path, job["platform"], job["content_type"], job["company_id"])
+        
+        # The cover is optional: a failure here must not fail the video
+        cover_url = None
+        if cover_path and os.path.getsize(cover_path) > 0:
+            try:
+                cover_url = upload_reel_cover(cover_path, job["logo_url"], job["company_id"],
+                                              f"reel_cover_{job['content_id']}_{int(time.time())}")
+            except Exception as e:
+                print(f"⚠️  Could not create reel cover: {e}")
+        
+        return {"media_url": media_url, "cover_url": cover_url}
+    finally:
+        # Clean up temporary files
+        remove_quietly(video_path)
+        remove_quietly(cover_path)
+
+# Background video generation: Replicate predictions are polled (or reported
+# through the webhook) and finished by worker threads
+video_job_manager = VideoJobManager(finalize_video_job)
 
 # Image Drame Random generated Overlay Text :
 async def generate_overlay_text(company_id: int) -> str:
     """
     Generate a dynamic 4-word overlay text based on company profile
     """
+    return await asyncio.to_thread(generate_overlay_text_sync, company_id)
+
+def generate_overlay_text_sync(company_id: int, logo_description: Optional[str] = None, use_pool: bool = True) -> str:
+    """
+    Blocking overlay text generation; safe to run in a worker thread since it
+    uses its own pooled connection. Pass logo_description to reuse an analysis
+    the caller already has.
+    
+    Phrases come from the company's phrase pool when possible; the one-off
+    LLM call below is the fallback when the pool can't produce one.
+    """
+    if use_pool:
+        pooled_text = overlay_phrase_pool.draw(company_id)
+        if pooled_text:
+            print(f"[INFO] Using pooled overlay text: '{pooled_text}'")
+            return pooled_text
+    
     try:
         print(f"[INFO] Generating overlay text for company_id: {company_id}")
         
         # Fetch company data from database
-        cursor.execute("""
-            SELECT name, slogan, description, products, services, 
-                   target_age_groups, target_audience_types, target_business_types, 
-                   target_geographics, preferred_platforms, special_events, 
-                   brand_tone, monthly_budget, marketing_goals, logo_url
-            FROM companies 
-            WHERE id = %s
-        """, (company_id,))
+        overlay_conn = get_db_connection()
+        overlay_cursor = get_db_cursor(overlay_conn)
+        try:
+            overlay_cursor.execute("""
+                SELECT name, slogan, description, products, services, 
+                       target_age_groups, target_audience_types, target_business_types, 
+                       target_geographics, preferred_platforms, special_events, 
+                       brand_tone, monthly_budget, marketing_goals, logo_url
+                FROM companies 
+                WHERE id = %s
+            """, (company_id,))
+            company_data = overlay_cursor.fetchone()
+        finally:
+            overlay_cursor.close()
+            release_db_connection(overlay_conn)
         
-        company_data = cursor.fetchone()
         if not company_data:
             print(f"[WARNING] Company not found, using fallback text")
             return "Company not found"
@@ -1779,7 +1794,8 @@ async def generate_overlay_text(company_id: int) -> str:
          marketing_goals, logo_url) = company_data
         
         # Get logo description if available
-        logo_description = get_logo_description(logo_url) if logo_url else "No logo"
+        if logo_description is None:
+            logo_description = get_logo_description(logo_url) if logo_url else "No logo"
         
         # Build target audience string
         target_audience = f"""
@@ -1860,9 +1876,46 @@ async def generate_overlay_text(company_id: int) -> str:
         return "Error"
 
 
+# -------- Base image helpers --------
+FLUX_MODEL = "black-forest-labs/FLUX.1-schnell-Free"
+
+# Content types that are rendered as framed images
+IMAGE_CONTENT_TYPES = ['feed', 'Stories', 'Story', 'Image', 'Feed Image Posts', 'Instagram Stories', 'Image Posts', 'LinkedIn Image Posts','Facebook Image Posts']
+
+def generate_base_image(prompt: str) -> Image.Image:
+    """Generate an unframed base image with FLUX and load it as RGBA"""
+    response = together_client.images.generate(
+        prompt=prompt,
+        model=FLUX_MODEL,
+        steps=4,
+        n=1,
+    )
+    
+    if not response.data:
+        print("[ERROR] No image data received from API")
+        raise ValueError("No image data in response")
+        
+    first_image = response.data[0]
+    
+    if not hasattr(first_image, 'url') or not first_image.url:
+        print("[ERROR] No image URL in response")
+        raise ValueError("No image URL in response")
+    
+    # Download the generated image
+    return media_fetcher.fetch_image(first_image.url, mode="RGBA")
+
+def download_logo_image(logo_url: str) -> Image.Image:
+    """Download the company logo as an RGBA image"""
+    return media_fetcher.fetch_image(logo_url, mode="RGBA")
+
+
 # -------- API Endpoint --------
 @app.post("/generate_for_post_type/{content_id}")
-async def generate_for_post_type(content_id: int, user: dict = Depends(get_current_user)):
+async def generate_for_post_type(
+    content_id: int,
+    reuse_base: bool = Query(default=True),
+    user: dict = Depends(get_current_user)
+):
     print(f"\n[INFO] Starting content generation for content_id: {content_id}")
     
     try:
@@ -1912,47 +1965,45 @@ async def generate_for_post_type(content_id: int, user: dict = Depends(get_curre
         # Get the appropriate aspect ratio prompt
         aspect_prompt = aspect_ratio_prompts.get(platform, {}).get(content_type, "")
         
-        if platform in ['Instagram', 'Facebook', 'Linkedin','instagram', 'facebook', 'linkedin','FaceBook', 'LinkedIn'] and content_type in ['feed', 'Stories', 'Story', 'Image', 'Feed Image Posts', 'Instagram Stories', 'Image Posts', 'LinkedIn Image Posts','Facebook Image Posts']:
+        if platform in ['Instagram', 'Facebook', 'Linkedin','instagram', 'facebook', 'linkedin','FaceBook', 'LinkedIn'] and content_type in IMAGE_CONTENT_TYPES:
             print(f"[INFO] Generating {platform} {content_type} image...")
-            logo_description = get_logo_description(logo_url) if logo_url else ""
-            
-            # Generate dynamic overlay text
-            dynamic_overlay_text = await generate_overlay_text(company_id)
-            
-            # Add platform-specific aspect ratio to the prompt
-            enhanced_prompt = f"{image_prompt} - IMPORTANT: {logo_description}. {aspect_prompt}"
             
-            # Use different FLUX models based on aspect ratio needs
-            flux_model = "black-forest-labs/FLUX.1-schnell-Free"
-            
-            response = together_client.images.generate(
-                prompt=enhanced_prompt,
-                model=flux_model,
-                steps=4,
-                n=1,
-            )
-            
-            if not response.data:
-                print("[ERROR] No image data received from API")
-                return JSONResponse({"error": "No image data in response"}, status_code=500)
+            def generate_base(logo_description):
+                # Add platform-specific aspect ratio to the prompt
+                enhanced_prompt = f"{image_prompt} - IMPORTANT: {logo_description}. {aspect_prompt}"
                 
-            first_image = response.data[0]
-            
-            if not hasattr(first_image, 'url') or not first_image.url:
-                print("[ERROR] No image URL in response")
-                return JSONResponse({"error": "No image URL in response"}, status_code=500)
-            
-            # Download the generated image
-            img_response = requests.get(first_image.url)
-            img_response.raise_for_status()
+                # Reuse a library base image for this prompt, or generate and store one
+                if reuse_base:
+                    return base_image_library.get_or_generate(
+                        company_id,
+                        image_prompt,
+                        lambda: generate_base_image(enhanced_prompt)
+                    )
+                return generate_base_image(enhanced_prompt), {"reused": False}
+            
+            # Logo download feeds one logo analysis, which both the FLUX prompt
+            # and the overlay text use; FLUX and the overlay LLM then run side by side
+            graph = StageGraph(name=f"generate_for_post_type[{content_id}]")
+            graph.add("logo_image", lambda: download_logo_image(logo_url))
+            graph.add("logo_description",
+                      lambda logo_image: get_logo_description(logo_url, image=logo_image.copy()) if logo_url else "",
+                      deps=["logo_image"])
+            graph.add("overlay_text",
+                      lambda logo_description: generate_overlay_text_sync(company_id, logo_description=logo_description or "No logo"),
+                      deps=["logo_description"])
+            graph.add("base_image", generate_base, deps=["logo_description"])
             
-            # Load the generated image and logo
-            generated_img = Image.open(io.BytesIO(img_response.content)).convert("RGBA")
+            try:
+                stage_results = await graph.run()
+            except StageError as e:
+                if e.stage == "base_image" and isinstance(e.error, ValueError):
+                    return JSONResponse({"error": str(e.error)}, status_code=500)
+                raise e.error
             
-            # Download the company logo
-            logo_response = requests.get(logo_url)
-            logo_response.raise_for_status()
-            logo_img = Image.open(io.BytesIO(logo_response.content)).convert("RGBA")
+            generated_img, base_info = stage_results["base_image"]
+            logo_img = stage_results["logo_image"]
+            dynamic_overlay_text = stage_results["overlay_text"]
+            print(f"[INFO] Stage timings: {graph.report()}")
             
             # Apply the universal frame
             framed_image = universal_framer.create_post_from_images(
@@ -1964,23 +2015,19 @@ async def generate_for_post_type(content_id: int, user: dict = Depends(get_curre
                 overlay_text = dynamic_overlay_text
             )
             
-            # Save the framed image to a temporary file
+            # Verify the final image dimensions on the in-memory image
+            expected_width, expected_height = universal_framer.get_platform_dimensions(platform, content_type)
+            check_dimensions(framed_image, (expected_width, expected_height))
+
+            # Encode once into memory in the platform's format (no temp file on disk)
+            encoded_image = encode_image(framed_image, platform)
+
+            # Upload to Cloudinary straight from the buffer
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             unique_id = str(uuid.uuid4())[:8]
-            filename = f"{platform.lower()}_{content_type.lower().replace(' ', '_')}_{company_id}_{timestamp}_{unique_id}.png"
-            filepath = f"/static/imgs/generated_campagin_img/{filename}"
-            
-            framed_image.save(filepath, "PNG")
-            
-            # Verify the final image dimensions
-            final_img = Image.open(filepath)
-            expected_width, expected_height = universal_framer.get_platform_dimensions(platform, content_type)
-            if final_img.size != (expected_width, expected_height):
-                print(f"[WARNING] Final image size {final_img.size} doesn't match expected size {(expected_width, expected_height)}")
-            
-            # Upload to Cloudinary
-            cloudinary_url = upload_image_to_cloudinary(
-                filepath,
+            cloudinary_url = await asyncio.to_thread(
+                upload_image_to_cloudinary,
+                encoded_image.stream(),
                 public_id=f"{platform.lower()}_{content_type.lower().replace(' ', '_')}_{company_id}_{timestamp}_{unique_id}"
             )
             
@@ -1996,7 +2043,9 @@ async def generate_for_post_type(content_id: int, user: dict = Depends(get_curre
                 "image_url": cloudinary_url,
                 "content_type": content_type.lower().replace(' ', '_'),
                 "platform": platform.lower(),
-                "dimensions": f"{expected_width}x{expected_height}"
+                "dimensions": f"{expected_width}x{expected_height}",
+                "base_image": base_info,
+                "timings": graph.report()
             })
                 
         elif content_type in ['Text Posts', 'Text Posts (Status Updates / Announcements)', 'Articles', 'Article', 'Text','Status']:
@@ -2017,67 +2066,25 @@ async def generate_for_post_type(content_id: int, user: dict = Depends(get_curre
         elif content_type in ['Instagram Reels', 'Facebook Videos', 'Linkedin Videos','LinkedIn Videos', 'Reel', 'Reels', 'Video Post', 'Video Posts', 'Videos']:
             print(f"[INFO] Processing {platform} Video...")
             
-            # Generate video using the video placeholder as prompt
-            video_path = generate_video_with_logo(video_placeholder, logo_url)
-            
-            if not video_path:
-                return JSONResponse({"error": "Failed to generate video"}, status_code=500)
-            
-            # Save the video locally first
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            unique_id = str(uuid.uuid4())[:8]
-            filename = f"{platform.lower()}_{content_type.lower().replace(' ', '_')}_{company_id}_{timestamp}_{unique_id}.mp4"
-            local_video_path = f"/static/vids/{filename}"
-            
-            # Copy the temporary video to our local storage
-            shutil.copy2(video_path, local_video_path)
-            print(f"✅ Video saved locally: {local_video_path}")
-            
-            # Upload to Cloudinary using the video-specific function
-            public_id = f"{platform.lower()}_{content_type.lower().replace(' ', '_')}_{company_id}_{timestamp}_{unique_id}"
-            cloudinary_url = None
-            
+            # Start the generation as a background job: the Replicate prediction
+            # runs for minutes, so the client polls /video_jobs/{job_id} instead
             try:
-                cloudinary_url = upload_video_to_cloudinary(local_video_path, public_id)
-                print(f"✅ Video uploaded to Cloudinary: {cloudinary_url}")
-                
-                # Delete local video after successful Cloudinary upload
-                try:
-                    os.remove(local_video_path)
-                    print(f"✅ Local video deleted after Cloudinary upload: {local_video_path}")
-                except Exception as e:
-                    print(f"⚠️  Could not delete local video: {e}")
-                    
-            except Exception as e:
-                print(f"[ERROR] Failed to upload video to Cloudinary: {e}")
-                # Use local path if Cloudinary fails
-                cloudinary_url = f"/static/vids/{filename}"
-            
-            # Clean up temporary file
-            try:
-                os.remove(video_path)
-            except Exception as e:
-                print(f"⚠️  Could not delete temp video file: {e}")
-            
-            # Save the Cloudinary URL to database (not local path)
-            try:
-                cursor.execute("""
-                    UPDATE content_items 
-                    SET media_link = %s
-                    WHERE id = %s
-                """, (cloudinary_url, content_id))
-                conn.commit()
-                print(f"✅ Video URL saved to database: {cloudinary_url}")
+                job = await asyncio.to_thread(
+                    video_job_manager.submit,
+                    content_id, user["user_id"], company_id,
+                    platform, content_type, video_placeholder, logo_url
+                )
             except Exception as e:
-                print(f"❌ Failed to save video URL to database: {e}")
-                return JSONResponse({"error": "Failed to save video URL to database"}, status_code=500)
+                print(f"❌ Failed to start video generation: {e}")
+                return JSONResponse({"error": "Failed to start video generation"}, status_code=500)
             
             return JSONResponse({
-                "video_url": cloudinary_url,  # This will be Cloudinary URL
+                "job_id": job["id"],
+                "status": job["status"],
                 "content_type": "video",
                 "platform": platform.lower(),
-                "message": "Video generated successfully"
-            })
+                "message": "Video generation started"
+            }, status_code=202)
             
         else:
             print(f"[ERROR] Unsupported platform: {platform}")
@@ -2090,6 +2097,160 @@ async def generate_for_post_type(content_id: int, user: dict = Depends(get_curre
     
     
     
+# -------- Video generation jobs --------
+@app.get("/video_jobs/{job_id}")
+async def get_video_job(job_id: int, user: dict = Depends(get_current_user)):
+    job = await asyncio.to_thread(video_job_manager.get, job_id, user["user_id"])
+    if not job:
+        raise HTTPException(status_code=404, detail="Video job not found")
+    return JSONResponse(video_job_manager.to_response(job))
+
+@app.post("/video_jobs/webhook")
+async def video_job_webhook(request: Request, job_id: int = Query(...), token: str = Query(...)):
+    """Replicate prediction webhook (URL from VIDEO_JOB_WEBHOOK_URL, with a per-job token)"""
+    if not await asyncio.to_thread(video_job_manager.verify_webhook, job_id, token):
+        raise HTTPException(status_code=403, detail="Invalid webhook token")
+    
+    prediction = await request.json()
+    print(f"[INFO] Webhook for video job {job_id}: prediction {prediction.get('id')} {prediction.get('status')}")
+    await asyncio.to_thread(video_job_manager.handle_prediction, job_id, prediction)
+    return JSONResponse({"received": True})
+
+# -------- Base image library --------
+@app.get("/base_images/search")
+def search_base_images(
+    company_id: int = Query(...),
+    prompt: str = Query(..., min_length=1),
+    limit: int = Query(default=5, ge=1, le=20),
+    user: dict = Depends(get_current_user)
+):
+    """Offer the company's stored base images matching a prompt before generating a new one"""
+    cursor.execute("SELECT id FROM companies WHERE id = %s AND user_id = %s", (company_id, user["user_id"]))
+    if not cursor.fetchone():
+        raise HTTPException(status_code=404, detail="Company not found")
+    return {"matches": base_image_library.search(company_id, prompt, limit=limit)}
+
+@app.get("/base_images/stats")
+def base_image_stats(user: dict = Depends(get_current_user)):
+    """Library size and reuse rate for this process"""
+    return base_image_library.stats()
+
+
+# -------- Multi-platform variants --------
+from pydantic import BaseModel
+
+class VariantRequest(BaseModel):
+    content_ids: List[int] = []
+
+@app.post("/generate_variants/{content_id}")
+async def generate_variants(content_id: int, request: VariantRequest, user: dict = Depends(get_current_user)):
+    """
+    Generate one base image from a content item's prompt and render the framed
+    variant of every requested image item (Instagram feed, Facebook, LinkedIn...)
+    from it, instead of one FLUX generation per item.
+    """
+    print(f"\n[INFO] Starting variant generation from content_id: {content_id}")
+    
+    try:
+        cursor.execute("""
+            SELECT ci.image_prompt, c.id as company_id, c.logo_url
+            FROM content_items ci
+            JOIN companies c ON ci.company_id = c.id
+            WHERE ci.id = %s AND ci.user_id = %s
+        """, (content_id, user["user_id"]))
+        
+        base_item = cursor.fetchone()
+        if not base_item:
+            raise HTTPException(status_code=404, detail="Content not found")
+        
+        image_prompt, company_id, logo_url = base_item
+        
+        # The source item is always part of the batch
+        content_ids = list(dict.fromkeys([content_id] + request.content_ids))
+        
+        cursor.execute("""
+            SELECT id, platform, content_type
+            FROM content_items
+            WHERE id = ANY(%s) AND user_id = %s AND company_id = %s
+        """, (content_ids, user["user_id"], company_id))
+        
+        items = [row for row in cursor.fetchall() if row[2] in IMAGE_CONTENT_TYPES]
+        if not items:
+            return JSONResponse({"error": "No image content items to render"}, status_code=400)
+        
+        targets = [(platform, content_type) for _, platform, content_type in items]
+        print(f"[INFO] Rendering {len(targets)} variants: {targets}")
+        
+        logo_description = get_logo_description(logo_url) if logo_url else ""
+        dynamic_overlay_text = await generate_overlay_text(company_id)
+        
+        # One generation for every variant; no aspect ratio hint since the
+        # base is fitted into each platform canvas by the framer
+        enhanced_prompt = f"{image_prompt} - IMPORTANT: {logo_description}."
+        try:
+            generated_img, base_info = base_image_library.get_or_generate(
+                company_id,
+                image_prompt,
+                lambda: generate_base_image(enhanced_prompt)
+            )
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=500)
+        
+        logo_img = download_logo_image(logo_url)
+        
+        framed_images = universal_framer.render_platform_variants(
+            generated_img,
+            logo_img,
+            targets,
+            company_id,
+            overlay_text=dynamic_overlay_text
+        )
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        
+        async def upload_variant(item, framed_image):
+            item_id, platform, content_type = item
+            check_dimensions(framed_image, universal_framer.get_platform_dimensions(platform, content_type))
+            encoded_image = encode_image(framed_image, platform)
+            public_id = f"{platform.lower()}_{content_type.lower().replace(' ', '_')}_{company_id}_{timestamp}_{str(uuid.uuid4())[:8]}"
+            url = await asyncio.to_thread(upload_image_to_cloudinary, encoded_image.stream(), public_id)
+            return item_id, platform, content_type, url
+        
+        # Upload every variant concurrently
+        uploads = await asyncio.gather(*[
+            upload_variant(item, framed_image) for item, framed_image in zip(items, framed_images)
+        ])
+        
+        variants = []
+        for item_id, platform, content_type, url in uploads:
+            cursor.execute("""
+                UPDATE content_items 
+                SET media_link = %s
+                WHERE id = %s
+            """, (url, item_id))
+            width, height = universal_framer.get_platform_dimensions(platform, content_type)
+            variants.append({
+                "content_id": item_id,
+                "image_url": url,
+                "platform": platform.lower(),
+                "content_type": content_type.lower().replace(' ', '_'),
+                "dimensions": f"{width}x{height}"
+            })
+        conn.commit()
+        
+        print(f"[INFO] Generated {len(variants)} variants from one base image")
+        return JSONResponse({"variants": variants, "base_image": base_info})
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        conn.rollback()
+        print(f"[ERROR] Variant generation failed: {str(e)}")
+        logger.error(f"Variant generation error: {str(e)}", exc_info=True)
+        return JSONResponse({"error": str(e)}, status_code=500)
+    
+    
+    
 @app.post("/post_to_instagram/{company_id}")
 async def post_to_instagram(
     company_id: int,
@@ -2165,7 +2326,8 @@ async def post_to_instagram(
                 return JSONResponse({"error": "Image file not found"}, status_code=404)
             
             print("[INFO] Uploading image to Cloudinary...")
-            cloudinary_url = upload_image_to_cloudinary(
+            cloudinary_url = await asyncio.to_thread(
+                upload_image_to_cloudinary,
                 image_path, 
                 public_id=f"insta_{content_type}_{company_id}_{int(time.time())}"
             )
@@ -2173,31 +2335,44 @@ async def post_to_instagram(
             
             if content_type == 'feed':
                 print("[INFO] Publishing to Instagram feed...")
-                success = publish_instagram_post(
+                success = await publish_instagram_post(
                     account_id=instagram_account_id,
                     access_token=access_token,
                     image_url=cloudinary_url,
-                    caption=caption
+                    caption=caption,
+                    content_id=content_id
                 )
             else:  # story
                 print("[INFO] Publishing to Instagram story...")
-                success = publish_instagram_story(
+                success = await publish_instagram_story(
                     account_id=instagram_account_id,
                     access_token=access_token,
-                    image_url=cloudinary_url
+                    image_url=cloudinary_url,
+                    content_id=content_id
                 )
                 
         elif content_type == 'reel':
-            # Post reel
+            # Post reel (with the cover extracted when the video was finished)
+            cursor.execute("SELECT cover_link FROM content_items WHERE id = %s", (content_id,))
+            cover_data = cursor.fetchone()
             print("[INFO] Publishing Instagram reel...")
-            success = publish_instagram_reel(
+            success = await publish_instagram_reel(
                 account_id=instagram_account_id,
                 access_token=access_token,
                 video_url=filename,
-                caption=caption
+                caption=caption,
+                cover_url=cover_data[0] if cover_data else None,
+                content_id=content_id
             )
         
-        if success:
+        if success and success.pending:
+            print(f"[INFO] Instagram {content_type} accepted, publishing in the background")
+            return JSONResponse({
+                "success": True,
+                "status": "publishing",
+                "message": f"Publishing {content_type} to Instagram..."
+            }, status_code=202)
+        elif success:
             print(f"[SUCCESS] Successfully posted {content_type} to Instagram!")
             return JSONResponse({
                 "success": True,
@@ -2216,127 +2391,20 @@ async def post_to_instagram(
 
 
 
-def publish_instagram_post(account_id, access_token, image_url, caption):
-    """Publish a regular post to Instagram"""
-    # 1. Create Container
-    create_container_url = f'https://graph.facebook.com/v22.0/{account_id}/media'
-    payload = {
-        'image_url': image_url,
-        'caption': caption,
-        'access_token': access_token
-    }
-    
-    container_response = requests.post(create_container_url, data=payload)
-    container_data = container_response.json()
-    
-    if 'id' not in container_data:
-        return False
-    
-    container_id = container_data['id']
-    
-    # 2. Publish Container
-    publish_url = f'https://graph.facebook.com/v22.0/{account_id}/media_publish'
-    publish_payload = {
-        'creation_id': container_id,
-        'access_token': access_token
-    }
-    
-    time.sleep(5)  # Wait before publishing
-    
-    publish_response = requests.post(publish_url, data=publish_payload)
-    publish_data = publish_response.json()
-    
-    return 'id' in publish_data
+async def publish_instagram_post(account_id, access_token, image_url, caption, content_id=None):
+    """Publish a regular post to Instagram (container published in the background)"""
+    return await instagram_containers.submit("post", account_id, access_token, image_url,
+                                             caption=caption, content_id=content_id)
 
-def publish_instagram_story(account_id, access_token, image_url):
-    """Publish a story to Instagram"""
-    create_container_url = f'https://graph.facebook.com/v22.0/{account_id}/media'
-    
-    payload = {
-        'image_url': image_url,
-        'media_type': 'STORIES',
-        'access_token': access_token
-    }
-    
-    container_response = requests.post(create_container_url, data=payload)
-    container_data = container_response.json()
-    
-    if 'id' not in container_data:
-        return False
-    
-    container_id = container_data['id']
-    
-    publish_url = f'https://graph.facebook.com/v22.0/{account_id}/media_publish'
-    publish_payload = {
-        'creation_id': container_id,
-        'access_token': access_token
-    }
-    
-    time.sleep(5)
-    
-    publish_response = requests.post(publish_url, data=publish_payload)
-    publish_data = publish_response.json()
-    
-    return 'id' in publish_data
+async def publish_instagram_story(account_id, access_token, image_url, content_id=None):
+    """Publish a story to Instagram (container published in the background)"""
+    return await instagram_containers.submit("story", account_id, access_token, image_url,
+                                             content_id=content_id)
 
-def publish_instagram_reel(account_id, access_token, video_url, caption, cover_url=None):
-    """Publish a reel to Instagram"""
-    create_container_url = f'https://graph.facebook.com/v22.0/{account_id}/media'
-    
-    payload = {
-        'media_type': 'REELS',
-        'video_url': video_url,
-        'caption': caption,
-        'access_token': access_token,
-        'share_to_feed': True
-    }
-    
-    if cover_url:
-        payload['thumbnail_url'] = cover_url
-    
-    container_response = requests.post(create_container_url, data=payload)
-    container_data = container_response.json()
-    
-    if 'id' not in container_data:
-        return False
-    
-    container_id = container_data['id']
-    
-    # Check upload status
-    status_url = f'https://graph.facebook.com/v22.0/{container_id}'
-    status_payload = {
-        'fields': 'status_code',
-        'access_token': access_token
-    }
-    
-    timeout = 60
-    start_time = time.time()
-    status_code = ''
-    
-    while status_code != 'FINISHED' and (time.time() - start_time) < timeout:
-        time.sleep(5)
-        status_response = requests.get(status_url, params=status_payload)
-        status_data = status_response.json()
-        
-        if 'status_code' in status_data:
-            status_code = status_data['status_code']
-            if status_code == 'ERROR':
-                return False
-                
-    if status_code != 'FINISHED':
-        return False
-    
-    # Publish the reel
-    publish_url = f'https://graph.facebook.com/v22.0/{account_id}/media_publish'
-    publish_payload = {
-        'creation_id': container_id,
-        'access_token': access_token
-    }
-    
-    publish_response = requests.post(publish_url, data=publish_payload)
-    publish_data = publish_response.json()
-    
-    return 'id' in publish_data        
+async def publish_instagram_reel(account_id, access_token, video_url, caption, cover_url=None, content_id=None):
+    """Publish a reel to Instagram (container published once Instagram has processed the video)"""
+    return await instagram_containers.submit("reel", account_id, access_token, video_url,
+                                             caption=caption, cover_url=cover_url, content_id=content_id)
 
 
 @app.post("/post_to_facebook/{company_id}")
@@ -2394,7 +2462,7 @@ async def post_to_facebook(
         
         if content_type_db == 'Text Posts (Status Updates / Announcements)':
             # Post text status
-            success = publish_facebook_text_post(
+            success = await publish_facebook_text_post(
                 page_id=facebook_page_id,
                 access_token=access_token,
                 message=message
@@ -2405,7 +2473,7 @@ async def post_to_facebook(
                 raise HTTPException(status_code=400, detail="No image URL found")
             
             print(f"[INFO] Posting image from URL: {media_link}")
-            success = publish_facebook_image_post(
+            success = await publish_facebook_image_post(
                 page_id=facebook_page_id,
                 access_token=access_token,
                 image_url=media_link,  # Use the Cloudinary URL directly
@@ -2418,7 +2486,7 @@ async def post_to_facebook(
                 raise HTTPException(status_code=400, detail="No video URL found")
             
             print(f"[INFO] Posting video from URL: {video_placeholder}")
-            success = publish_facebook_video_post(
+            success = await publish_facebook_video_post(
                 page_id=facebook_page_id,
                 access_token=access_token,
                 video_url=video_placeholder,
@@ -2436,126 +2504,33 @@ async def post_to_facebook(
         raise HTTPException(status_code=500, detail=str(e))
     
     
-def publish_facebook_text_post(page_id, access_token, message):
+async def publish_facebook_text_post(page_id, access_token, message):
     """
     Publish a text-only post to a Facebook page
-    Returns True if successful, False otherwise
+    Returns a PublishResult (truthy if successful)
     """
     print(f"[FB] Starting text post publication to page {page_id}")
-    
-    try:
-        url = f'https://graph.facebook.com/v22.0/{page_id}/feed'
-        
-        payload = {
-            'message': message,
-            'access_token': access_token
-        }
-        
-        print("[FB] Sending text post request...")
-        response = requests.post(url, data=payload)
-        response.raise_for_status()
-        data = response.json()
-        
-        if 'id' in data:
-            post_id = data['id']
-            print(f"[FB] Text post published successfully! Post ID: {post_id}")
-            return True
-        else:
-            print("[FB] Failed to publish text post. Response:", data)
-            return False
-            
-    except requests.exceptions.RequestException as e:
-        print(f"[FB] Text post request failed: {str(e)}")
-        return False
-    except Exception as e:
-        print(f"[FB] Unexpected error in text post: {str(e)}")
-        return False
+    return await publishing_client.facebook_text(page_id, access_token, message)
 
 
-def publish_facebook_image_post(page_id, access_token, image_url, message=None):
+async def publish_facebook_image_post(page_id, access_token, image_url, message=None):
     """
     Publish an image post to a Facebook page
-    Returns True if successful, False otherwise
+    Returns a PublishResult (truthy if successful)
     """
     print(f"[FB] Starting image post publication to page {page_id}")
     print(f"[FB] Image URL: {image_url}")
-    
-    try:
-        url = f'https://graph.facebook.com/v22.0/{page_id}/photos'
-        
-        payload = {
-            'url': image_url,
-            'access_token': access_token
-        }
-        
-        if message:
-            print("[FB] Adding caption to image post")
-            payload['caption'] = message
-        
-        print("[FB] Sending image post request...")
-        response = requests.post(url, data=payload)
-        response.raise_for_status()
-        data = response.json()
-        
-        if 'id' in data or 'post_id' in data:
-            post_id = data.get('id') or data.get('post_id')
-            print(f"[FB] Image post published successfully! Post ID: {post_id}")
-            return True
-        else:
-            print("[FB] Failed to publish image post. Response:", data)
-            return False
-            
-    except requests.exceptions.RequestException as e:
-        print(f"[FB] Image post request failed: {str(e)}")
-        return False
-    except Exception as e:
-        print(f"[FB] Unexpected error in image post: {str(e)}")
-        return False
+    return await publishing_client.facebook_image(page_id, access_token, image_url, message)
 
 
-def publish_facebook_video_post(page_id, access_token, video_url, title=None, description=None):
+async def publish_facebook_video_post(page_id, access_token, video_url, title=None, description=None):
     """
     Publish a video post to a Facebook page
-    Returns True if successful, False otherwise
+    Returns a PublishResult (truthy if successful)
     """
     print(f"[FB] Starting video post publication to page {page_id}")
     print(f"[FB] Video URL: {video_url}")
-    
-    try:
-        url = f'https://graph.facebook.com/v22.0/{page_id}/videos'
-        
-        payload = {
-            'file_url': video_url,
-            'access_token': access_token
-        }
-        
-        if title:
-            print("[FB] Adding title to video post")
-            payload['title'] = title
-        
-        if description:
-            print("[FB] Adding description to video post")
-            payload['description'] = description
-        
-        print("[FB] Sending video post request...")
-        response = requests.post(url, data=payload)
-        response.raise_for_status()
-        data = response.json()
-        
-        if 'id' in data:
-            video_id = data['id']
-            print(f"[FB] Video post published successfully! Video ID: {video_id}")
-            return True
-        else:
-            print("[FB] Failed to publish video post. Response:", data)
-            return False
-            
-    except requests.exceptions.RequestException as e:
-        print(f"[FB] Video post request failed: {str(e)}")
-        return False
-    except Exception as e:
-        print(f"[FB] Unexpected error in video post: {str(e)}")
-        return False    
+    return await publishing_client.facebook_video(page_id, access_token, video_url, title, description)
 
 
 
@@ -2721,6 +2696,7 @@ def get_todays_posts(company_id: int, user: dict = Depends(get_current_user)):
         now = datetime.now()
         current_day = now.strftime("%A")
         current_time = now.time()
+        today_start = datetime(now.year, now.month, now.day)
         print(f"[DEBUG] Current day: {current_day}, Current time: {current_time}")
         
         # Get posts scheduled for today FROM THE APPROVED STRATEGY ONLY - FIXED: Add error handling
@@ -2730,21 +2706,21 @@ def get_todays_posts(company_id: int, user: dict = Depends(get_current_user)):
                 SELECT 
                     ci.id, ci.platform, ci.content_type, ci.caption, ci.hashtags, 
                     ci.image_prompt, ci.video_placeholder, ci.best_time,
-                    ci.status, c.name as company_name, c.logo_url
+                    ci.status, c.name as company_name, c.logo_url, ci.schedule_hour
                 FROM content_items ci
                 JOIN companies c ON ci.company_id = c.id
                 WHERE ci.company_id = %s 
                 AND ci.strategy_id = %s
-                AND ci.best_time LIKE %s
                 AND ci.status IN ('pending', 'needs_approval')
+                AND ci.scheduled_at >= %s AND ci.scheduled_at < %s
                 ORDER BY 
                     CASE 
                         WHEN ci.status = 'needs_approval' THEN 0
                         WHEN ci.status = 'pending' THEN 1
                         ELSE 2
                     END,
-                    ci.best_time
-            """, (company_id, strategy_id, f"%{current_day}%"))
+                    ci.scheduled_at
+            """, (company_id, strategy_id, today_start, today_start + timedelta(days=1)))
             
             print(f"[DEBUG] Posts query executed, fetching results...")
             rows = cursor.fetchall()
@@ -2756,21 +2732,21 @@ def get_todays_posts(company_id: int, user: dict = Depends(get_current_user)):
                 SELECT 
                     ci.id, ci.platform, ci.content_type, ci.caption, ci.hashtags, 
                     ci.image_prompt, ci.video_placeholder, ci.best_time,
-                    ci.status, c.name as company_name, c.logo_url
+                    ci.status, c.name as company_name, c.logo_url, ci.schedule_hour
                 FROM content_items ci
                 JOIN companies c ON ci.company_id = c.id
                 WHERE ci.company_id = %s 
                 AND ci.strategy_id = %s
-                AND ci.best_time LIKE %s
                 AND ci.status IN ('pending', 'needs_approval')
+                AND ci.scheduled_at >= %s AND ci.scheduled_at < %s
                 ORDER BY 
                     CASE 
                         WHEN ci.status = 'needs_approval' THEN 0
                         WHEN ci.status = 'pending' THEN 1
                         ELSE 2
                     END,
-                    ci.best_time
-            """, (company_id, strategy_id, f"%{current_day}%"))
+                    ci.scheduled_at
+            """, (company_id, strategy_id, today_start, today_start + timedelta(days=1)))
             rows = cursor.fetchall() or [] 
         
         # FIXED: Proper handling of empty results
@@ -2783,22 +2759,8 @@ def get_todays_posts(company_id: int, user: dict = Depends(get_current_user)):
         
         for i, row in enumerate(rows):
             print(f"[DEBUG] Processing row {i+1}/{len(rows)}: {row[0]}")
-            # Extract hour from best_time (e.g., "Monday 9AM" -> 9)
-            time_str = row[7] if row[7] else ""
-            scheduled_hour = None
-            if time_str:
-                try:
-                    time_part = time_str.split()[1]  # Get "9AM" part
-                    if 'AM' in time_part or 'PM' in time_part:
-                        hour = int(time_part.replace('AM', '').replace('PM', ''))
-                        if 'PM' in time_part and hour != 12:
-                            hour += 12
-                        elif 'AM' in time_part and hour == 12:
-                            hour = 0
-                        scheduled_hour = hour
-                except (IndexError, ValueError) as e:
-                    print(f"[WARNING] Could not parse time from '{time_str}': {e}")
-                    pass
+            # Hour normalized from best_time (e.g., "Monday 9AM" -> 9)
+            scheduled_hour = row[11]
           
             should_show = False
             is_past_due = False
@@ -2874,14 +2836,21 @@ def approve_post(
         clean_caption = re.sub(r'#\w+', '', caption).strip()
         final_hashtags = ' '.join(hashtags) if hashtags else None
         
-        # Update status to approved and save caption
+        # Update status to approved and save caption. A new approval gets a new
+        # approval_generation (so it is queued under a new outbox key); a post
+        # the outbox is already publishing only has its caption updated.
         cursor.execute("""
             UPDATE content_items 
-            SET status = 'approved', caption = %s, hashtags = %s
+            SET caption = %s, hashtags = %s,
+                approval_generation = approval_generation
+                    + CASE WHEN status IN ('approved', 'publishing') THEN 0 ELSE 1 END,
+                status = CASE WHEN status = 'publishing' THEN status ELSE 'approved' END
             WHERE id = %s
         """, (clean_caption, final_hashtags, content_id))
         
         conn.commit()  # Explicitly commit the transaction
+        # The post may already be due
+        posting_scheduler.wake()
         return {"success": True}
         
     except Exception as e:
@@ -2928,7 +2897,10 @@ async def check_approved_posts(
     company_id: int, 
     user: dict = Depends(get_current_user)
 ):
-    """Background endpoint to check for approved posts ready to post FROM APPROVED STRATEGY ONLY"""
+    """
+    Queue this company's due posts right away. Auto-posting itself no longer
+    needs this endpoint: the posting scheduler does the same for every company.
+    """
     try:
         # Verify company belongs to user
         cursor.execute("SELECT id FROM companies WHERE id = %s AND user_id = %s", 
@@ -2938,107 +2910,9 @@ async def check_approved_posts(
             print(f"[BACKGROUND] Company {company_id} not found for user {user['user_id']}")
             raise HTTPException(status_code=404, detail="Company not found")
         
-        # Get the approved strategy for this company
-        cursor.execute("""
-            SELECT id FROM strategies 
-            WHERE company_id = %s AND status = 'approved'
-            ORDER BY approved_at DESC 
-            LIMIT 1
-        """, (company_id,))
-        
-        approved_strategy = cursor.fetchone()
-        if not approved_strategy:
-            print(f"[BACKGROUND] No approved strategy found for company {company_id}")
-            return {"posts_posted": 0}  # No approved strategy
-        
-        strategy_id = approved_strategy[0]
-        print(f"[BACKGROUND] Using approved strategy ID {strategy_id} for auto-posting (company {company_id})")
-        
-        now = datetime.now()
-        current_day = now.strftime("%A")
-        current_hour = now.hour
-        
-        # Get approved posts for current day and hour FROM THE APPROVED STRATEGY ONLY
-        cursor.execute("""
-            SELECT id, platform, content_type, best_time, status, caption, hashtags
-            FROM content_items 
-            WHERE company_id = %s 
-            AND strategy_id = %s
-            AND status = 'approved'
-            AND best_time LIKE %s
-        """, (company_id, strategy_id, f"%{current_day}%"))
-        
-        # FIXED: Check if there are results before processing
-        posts_results = cursor.fetchall()
-        if not posts_results:
-            # No approved posts ready - this is normal, not an error
-            return {"posts_posted": 0}
-        
-        posts_to_post = []
-        for row in posts_results:
-            content_id, platform, content_type, time_str, status, caption, hashtags = row
-            
-            # Extract scheduled hour
-            try:
-                time_part = time_str.split()[1]  # Get "9AM" part
-                if 'AM' in time_part or 'PM' in time_part:
-                    hour = int(time_part.replace('AM', '').replace('PM', ''))
-                    if 'PM' in time_part and hour != 12:
-                        hour += 12
-                    elif 'AM' in time_part and hour == 12:
-                        hour = 0
-                    
-                    # Post if current hour matches scheduled hour OR if past due
-                    if current_hour >= hour:
-                        posts_to_post.append({
-                            "id": content_id,
-                            "platform": platform,
-                            "content_type": content_type,
-                            "caption": caption,
-                            "hashtags": hashtags,
-                            "is_past_due": current_hour > hour,
-                            "strategy_id": strategy_id,
-                            "scheduled_time": time_str  # <-- This is the best_time value you fetched earlier
-                        })
-            except Exception as e:
-                print(f"[BACKGROUND] Error parsing time for content {content_id}: {str(e)}")
-                continue
-        
-        # Sort by past due first, then by scheduled time
-        posts_to_post.sort(key=lambda x: (not x["is_past_due"], x["id"]))
-        
-        # Process posts with 5-second delay between past due posts
-        posted_count = 0
-        if posts_to_post:
-            print(f"[BACKGROUND] Found {len(posts_to_post)} posts ready for auto-posting from strategy {strategy_id}")
-        
-        for i, post in enumerate(posts_to_post):
-            try:
-                success = await post_content_automatically(
-                    company_id=company_id,
-                    post=post,
-                    current_user=user
-                )
-                
-                if success:
-                    posted_count += 1
-                    print(f"[BACKGROUND] Successfully auto-posted content {post['id']}")
-                    
-                    # Add 5-second delay between past due posts
-                    if post["is_past_due"] and i < len(posts_to_post) - 1:
-                        await asyncio.sleep(5)
-                        
-            except Exception as e:
-                print(f"[BACKGROUND] Error posting content {post['id']}: {str(e)}")
-                continue
-        
-        if posted_count > 0:
-            print(f"[BACKGROUND] Auto-posted {posted_count} posts for company {company_id}")
-            
-        #return {"posts_posted": posted_count}
-        #New return
+        queued = await asyncio.to_thread(posting_scheduler.dispatch_due, company_id)
         return {
-                "posts_posted": posted_count,
+                "posts_posted": len(queued),
                 "posted_posts": [
                     {
                         "id": post["id"],
@@ -3047,8 +2921,7 @@ async def check_approved_posts(
                         "scheduled_time": post.get("scheduled_time"),
                         "was_past_due": post["is_past_due"]
                     }
-                    for post in posts_to_post
-                    if post.get("was_posted_successfully", True)  # Optional: mark posted successfully
+                    for post in queued
                 ]
             }
         
@@ -3057,11 +2930,53 @@ async def check_approved_posts(
         raise
     except Exception as e:
         print(f"[BACKGROUND] Unexpected error in check_approved_posts: {str(e)}")
-        # Don't rollback here - this is a read operation mostly
         return {"posts_posted": 0, "error": str(e)}
 
+@app.get("/publish_headroom")
+async def publish_headroom(user: dict = Depends(get_current_user)):
+    """Publishing headroom of each linked account under the rate governor"""
+    accounts = await asyncio.to_thread(credential_provider.get_accounts, user["user_id"])
+    return {
+        "accounts": [
+            await asyncio.to_thread(rate_governor.headroom, platform, account_key(platform, account))
+            for platform, account in accounts.items()
+            if platform in PLATFORM_QUOTAS
+        ]
+    }
+
+async def publish_outbox_job(job: dict):
+    """Publisher for the publish outbox"""
+    return await post_content_automatically(
+        company_id=job["company_id"],
+        post=job["payload"],
+        current_user={"user_id": job["user_id"]}
+    )
+
+
+publish_outbox = PublishOutbox(publish_outbox_job)
+posting_scheduler = PostingScheduler(publish_outbox)
+
+
+def load_content_media(content_id: int):
+    """media_link, video_placeholder and cover_link of a content item, from its own pooled connection"""
+    media_conn = get_db_connection()
+    media_cursor = get_db_cursor(media_conn)
+    try:
+        media_cursor.execute("""
+            SELECT media_link, video_placeholder, cover_link 
+            FROM content_items WHERE id = %s
+        """, (content_id,))
+        return media_cursor.fetchone()
+    finally:
+        media_cursor.close()
+        release_db_connection(media_conn)
+
+
 async def post_content_automatically(company_id: int, post: dict, current_user: dict):
-    """Automatically post approved content using existing posting functions"""
+    """
+    Publish approved content using existing posting functions.
+    Returns the PublishResult; the publish outbox records the outcome and retries.
+    """
     try:
         content_id = post["id"]
         platform = post["platform"].lower()
@@ -3072,27 +2987,17 @@ async def post_content_automatically(company_id: int, post: dict, current_user:
         if post["hashtags"]:
             full_caption += " " + post["hashtags"]
         
-        # Get the media URL (Cloudinary URL)
-        cursor.execute("""
-            SELECT media_link, video_placeholder 
-            FROM content_items WHERE id = %s
-        """, (content_id,))
-        result = cursor.fetchone()
+        # Get the media URL (Cloudinary URL) without blocking the event loop
+        result = await asyncio.to_thread(load_content_media, content_id)
         media_url = result[0] if result else None
         video_url = result[1] if result else None
+        cover_url = result[2] if result else None
         
-        # Get the stored account credentials from database
-        cursor.execute("""
-            SELECT platform, account_id, account_name, access_token, page_id, instagram_id
-            FROM user_linked_accounts 
-            WHERE user_id = %s AND platform IN ('facebook', 'instagram','linkedin')
-            ORDER BY created_at DESC
-        """, (current_user["user_id"],))
-        
-        accounts = cursor.fetchall()
-        facebook_account = next((acc for acc in accounts if acc[0] == 'facebook'), None)
-        instagram_account = next((acc for acc in accounts if acc[0] == 'instagram'), None)
-        linkedin_account = next((acc for acc in accounts if acc[0] == 'linkedin'), None)
+        # Get the linked account credentials (decrypted, cached per user)
+        accounts = await asyncio.to_thread(credential_provider.get_accounts, current_user["user_id"])
+        facebook_account = accounts.get('facebook')
+        instagram_account = accounts.get('instagram')
+        linkedin_account = accounts.get('linkedin')
 
         if platform == 'facebook' and not facebook_account:
             raise Exception("No Facebook account linked for this user")
@@ -3103,18 +3008,10 @@ async def post_content_automatically(company_id: int, post: dict, current_user:
 
         success = False
         
-        # Encryption For linked meta account
-        ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY").encode()
-        meta_oauth = MetaOAuth(ENCRYPTION_KEY)
-        linkedin_oauth = LinkedInOAuth(ENCRYPTION_KEY)
-        
         if platform == 'facebook':
             # Use the Facebook API directly instead of calling the endpoint
-            facebook_page_id = facebook_account[4]
-            
-            encrypted_access_token = facebook_account[3]  # access_token field
-            decrypted_fb_access_token = meta_oauth._decrypt_token(encrypted_access_token)
-            access_token = decrypted_fb_access_token
+            facebook_page_id = facebook_account.page_id
+            access_token = facebook_account.access_token
             
             success = False
             
@@ -3127,7 +3024,7 @@ async def post_content_automatically(company_id: int, post: dict, current_user:
                     raise Exception("No image URL found for Facebook post")
                 
                 print(f"[INFO] Posting image from URL: {media_url}")
-                success = publish_facebook_image_post(
+                success = await publish_facebook_image_post(
                     page_id=facebook_page_id,
                     access_token=access_token,
                     image_url=media_url,
@@ -3139,7 +3036,7 @@ async def post_content_automatically(company_id: int, post: dict, current_user:
                     raise Exception("No video URL found for Facebook post")
                 
                 print(f"[INFO] Posting video from URL: {video_url}")
-                success = publish_facebook_video_post(
+                success = await publish_facebook_video_post(
                     page_id=facebook_page_id,
                     access_token=access_token,
                     video_url=video_url,
@@ -3149,7 +3046,7 @@ async def post_content_automatically(company_id: int, post: dict, current_user:
                 
             else:  # Text post
                 print(f"[INFO] Posting text status: {full_caption}")
-                success = publish_facebook_text_post(
+                success = await publish_facebook_text_post(
                     page_id=facebook_page_id,
                     access_token=access_token,
                     message=full_caption
@@ -3157,11 +3054,8 @@ async def post_content_automatically(company_id: int, post: dict, current_user:
             
         elif platform == 'instagram':
             # Instagram credentials
-            instagram_account_id = instagram_account[5] 
-            
-            encrypted_access_token = instagram_account[3]  # access_token field
-            decrypted_ig_access_token = meta_oauth._decrypt_token(encrypted_access_token)
-            access_token = decrypted_ig_access_token
+            instagram_account_id = instagram_account.instagram_id
+            access_token = instagram_account.access_token
             
             success = False
             
@@ -3173,11 +3067,12 @@ async def post_content_automatically(company_id: int, post: dict, current_user:
                     raise Exception("No image URL found for Instagram post")
                 
                 print(f"[INFO] Posting Instagram feed image from URL: {media_url}")
-                success = publish_instagram_post(
+                success = await publish_instagram_post(
                     account_id=instagram_account_id,
                     access_token=access_token,
                     image_url=media_url,
-                    caption=full_caption
+                    caption=full_caption,
+                    content_id=content_id
                 )
                 
             elif 'Story' in content_type or 'Stories' in content_type or "Instagram Stories" in content_type :
@@ -3189,10 +3084,11 @@ async def post_content_automatically(company_id: int, post: dict, current_user:
                 print(f"[INFO] Posting Instagram story from URL: {media_url}")
                 print(f"[DEBUG] Content type check: '{content_type}' contains 'Story' or 'Stories'")
                 
-                success = publish_instagram_story(
+                success = await publish_instagram_story(
                     account_id=instagram_account_id,
                     access_token=access_token,
-                    image_url=media_url
+                    image_url=media_url,
+                    content_id=content_id
                 )
                 
             elif 'Reel' in content_type:
@@ -3200,18 +3096,18 @@ async def post_content_automatically(company_id: int, post: dict, current_user:
                     raise Exception("No video URL found for Instagram reel")
                 
                 print(f"[INFO] Posting Instagram reel from URL: {video_url}")
-                success = publish_instagram_reel(
+                success = await publish_instagram_reel(
                     account_id=instagram_account_id,
                     access_token=access_token,
                     video_url=video_url,
-                    caption=full_caption
+                    caption=full_caption,
+                    cover_url=cover_url,
+                    content_id=content_id
                 )
         elif platform == 'linkedin':
             
             # LinkedIn posting logic
-            encrypted_access_token = linkedin_account[3] 
-            decrypted_li_access_token = linkedin_oauth._decrypt_token(encrypted_access_token)
-            access_token = decrypted_li_access_token
+            access_token = linkedin_account.access_token
             
             success = False
             
@@ -3219,14 +3115,14 @@ async def post_content_automatically(company_id: int, post: dict, current_user:
                 raise Exception("LinkedIn access token not found in environment variables")
             
             # Get LinkedIn user ID
-            user_id = f"urn:li:person:{linkedin_account[1]}"
+            user_id = f"urn:li:person:{linkedin_account.account_id}"
             
             if 'Image' in content_type:
                 if not media_url:
                     raise Exception("No image URL found for LinkedIn post")
                 
                 print(f"[INFO] Posting image to LinkedIn from URL: {media_url}")
-                success = publish_linkedin_image_post(
+                success = await publish_linkedin_image_post(
                     access_token=access_token,
                     user_id=user_id,
                     image_url=media_url,
@@ -3238,7 +3134,7 @@ async def post_content_automatically(company_id: int, post: dict, current_user:
                     raise Exception("No video URL found for LinkedIn post")
                 
                 print(f"[INFO] Posting video to LinkedIn from URL: {video_url}")
-                success = publish_linkedin_video_post(
+                success = await publish_linkedin_video_post(
                     access_token=access_token,
                     user_id=user_id,
                     video_url=video_url,
@@ -3247,35 +3143,19 @@ async def post_content_automatically(company_id: int, post: dict, current_user:
                 
             else:  # Text post
                 print(f"[INFO] Posting text to LinkedIn: {full_caption}")
-                success = publish_linkedin_text_post(
+                success = await publish_linkedin_text_post(
                     access_token=access_token,
                     user_id=user_id,
                     text=full_caption
                 )
         
         if success:
-            # Update status to posted
-            cursor.execute("""
-                UPDATE content_items 
-                SET status = 'posted'
-                WHERE id = %s
-            """, (content_id,))
-            conn.commit()
-            print(f"[SUCCESS] Successfully posted content {content_id} to {platform}")
-            return True
+            print(f"[SUCCESS] Published content {content_id} to {platform}")
         else:
-            # If posting fails, set back to needs_approval
-            cursor.execute("""
-                UPDATE content_items 
-                SET status = 'needs_approval'
-                WHERE id = %s
-            """, (content_id,))
-            conn.commit()
             print(f"[ERROR] Failed to post content {content_id} to {platform}")
-            raise Exception(f"Failed to post content to {platform}")
+        return success
             
     except Exception as e:
-        conn.rollback()
         error_msg = f"Error in post_content_automatically for content {content_id}: {str(e)}"
         logger.error(error_msg)
         print(f"[ERROR] {error_msg}")
@@ -3494,264 +3374,20 @@ async def send_launch_emails(company_id: int, user: dict = Depends(get_current_u
    
    
 # LinkedIn Publishing Functions (add these to your existing code)
-def publish_linkedin_text_post(access_token: str, user_id: str, text: str):
-    """Publish a text-only post to LinkedIn with enhanced error handling"""
-    try:
-        # Validate inputs
-        if not user_id.startswith("urn:li:person:"):
-            raise ValueError("Invalid user_id format. Must start with 'urn:li:person:'")
-        if not text.strip():
-            raise ValueError("Text content cannot be empty")
-        
-        url = "https://api.linkedin.com/v2/ugcPosts"
-        
-        payload = {
-            "author": user_id,
-            "lifecycleState": "PUBLISHED",
-            "specificContent": {
-                "com.linkedin.ugc.ShareContent": {
-                    "shareCommentary": {
-                        "text": text
-                    },
-                    "shareMediaCategory": "NONE"
-                }
-            },
-            "visibility": {
-                "com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"
-            }
-        }
-        
-        headers = {
-            'Authorization': f'Bearer {access_token}',
-            'Content-Type': 'application/json',
-            'X-Restli-Protocol-Version': '2.0.0',
-            'LinkedIn-Version': '202402'
-        }
-        
-        print("[LINKEDIN] Creating text post...")
-        response = requests.post(
-            url, 
-            headers=headers, 
-            data=json.dumps(payload),
-            timeout=10
-        )
-        
-        if response.status_code != 201:
-            raise Exception(f"API returned {response.status_code}: {response.text}")
-        
-        post_id = response.headers.get('X-RestLi-Id')
-        print(f"[LINKEDIN] Text post published successfully! Post ID: {post_id}")
-        return True
-            
-    except requests.exceptions.RequestException as e:
-        error_detail = f"Request failed: {str(e)}"
-        if hasattr(e, 'response') and e.response:
-            error_detail += f"\nResponse: {e.response.text}"
-        raise Exception(f"LinkedIn text post failed: {error_detail}")
-    except Exception as e:
-        raise Exception(f"Unexpected error in text post: {str(e)}")
+async def publish_linkedin_text_post(access_token: str, user_id: str, text: str):
+    """Publish a text-only post to LinkedIn"""
+    print("[LINKEDIN] Creating text post...")
+    return await publishing_client.linkedin_text(access_token, user_id, text)
 
-def publish_linkedin_image_post(access_token: str, user_id: str, image_url: str, text: str):
-    """Publish an image post to LinkedIn with improved reliability"""
-    try:
-        # Validate inputs
-        if not user_id.startswith("urn:li:person:"):
-            raise ValueError("Invalid user_id format. Must start with 'urn:li:person:'")
-        if not image_url.startswith(('http://', 'https://')):
-            raise ValueError("Invalid image URL format")
-        
-        headers = {
-            'Authorization': f'Bearer {access_token}',
-            'Content-Type': 'application/json',
-            'X-Restli-Protocol-Version': '2.0.0',
-            'LinkedIn-Version': '202402'
-        }
-        
-        # 1. Register upload
-        register_payload = {
-            "registerUploadRequest": {
-                "recipes": ["urn:li:digitalmediaRecipe:feedshare-image"],
-                "owner": user_id,
-                "serviceRelationships": [{
-                    "relationshipType": "OWNER",
-                    "identifier": "urn:li:userGeneratedContent"
-                }]
-            }
-        }
-        
-        print("[LINKEDIN] Registering image upload...")
-        register_response = requests.post(
-            "https://api.linkedin.com/v2/assets?action=registerUpload",
-            headers=headers,
-            data=json.dumps(register_payload),
-            timeout=10
-        )
-        register_response.raise_for_status()
-        register_data = register_response.json()
-        
-        upload_url = register_data['value']['uploadMechanism']['com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest']['uploadUrl']
-        asset_urn = register_data['value']['asset']
-        
-        # 2. Upload image with retry logic
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                with requests.Session() as session:
-                    # Download image first
-                    image_response = session.get(image_url, stream=True, timeout=30)
-                    image_response.raise_for_status()
-                    
-                    # Upload to LinkedIn
-                    upload_response = session.put(
-                        upload_url,
-                        headers={'Authorization': f'Bearer {access_token}'},
-                        data=image_response.iter_content(chunk_size=8192),
-                        timeout=30
-                    )
-                    upload_response.raise_for_status()
-                break  # Success - exit retry loop
-            except requests.exceptions.RequestException as e:
-                if attempt == max_retries - 1:
-                    raise
-                time.sleep(2 ** attempt)  # Exponential backoff
-        
-        # 3. Create post
-        post_payload = {
-            "author": user_id,
-            "lifecycleState": "PUBLISHED",
-            "specificContent": {
-                "com.linkedin.ugc.ShareContent": {
-                    "shareCommentary": {"text": text},
-                    "shareMediaCategory": "IMAGE",
-                    "media": [{
-                        "status": "READY",
-                        "description": {"text": text[:200]},
-                        "media": asset_urn,
-                        "title": {"text": "Shared Image"}
-                    }]
-                }
-            },
-            "visibility": {
-                "com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"
-            }
-        }
-        
-        print("[LINKEDIN] Creating image post...")
-        post_response = requests.post(
-            "https://api.linkedin.com/v2/ugcPosts",
-            headers=headers,
-            data=json.dumps(post_payload),
-            timeout=10
-        )
-        post_response.raise_for_status()
-        
-        return True
-        
-    except requests.exceptions.RequestException as e:
-        error_detail = f"Request failed: {str(e)}"
-        if e.response:
-            error_detail += f"\nStatus: {e.response.status_code}\nResponse: {e.response.text[:500]}"
-        raise Exception(f"LinkedIn image post failed: {error_detail}")
-    except Exception as e:
-        raise Exception(f"Unexpected error in image post: {str(e)}")
+async def publish_linkedin_image_post(access_token: str, user_id: str, image_url: str, text: str):
+    """Publish an image post to LinkedIn (image streamed from its URL to LinkedIn)"""
+    print("[LINKEDIN] Creating image post...")
+    return await publishing_client.linkedin_image(access_token, user_id, image_url, text)
 
-def publish_linkedin_video_post(access_token: str, user_id: str, video_url: str, text: str):
-    """Publish a video post to LinkedIn with enhanced error handling"""
-    try:
-        # Validate inputs
-        if not user_id.startswith("urn:li:person:"):
-            raise ValueError("Invalid user_id format")
-        if not video_url.startswith(('http://', 'https://')):
-            raise ValueError("Invalid video URL")
-        
-        headers = {
-            'Authorization': f'Bearer {access_token}',
-            'Content-Type': 'application/json',
-            'X-Restli-Protocol-Version': '2.0.0',
-            'LinkedIn-Version': '202402'
-        }
-        
-        # 1. Register upload
-        register_payload = {
-            "registerUploadRequest": {
-                "recipes": ["urn:li:digitalmediaRecipe:feedshare-video"],
-                "owner": user_id,
-                "serviceRelationships": [{
-                    "relationshipType": "OWNER",
-                    "identifier": "urn:li:userGeneratedContent"
-                }]
-            }
-        }
-        
-        register_response = requests.post(
-            "https://api.linkedin.com/v2/assets?action=registerUpload",
-            headers=headers,
-            data=json.dumps(register_payload),
-            timeout=10
-        )
-        register_response.raise_for_status()
-        register_data = register_response.json()
-        
-        upload_url = register_data['value']['uploadMechanism']['com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest']['uploadUrl']
-        asset_urn = register_data['value']['asset']
-        
-        # 2. Upload video with retry logic
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                with requests.Session() as session:
-                    # Stream video upload in chunks
-                    with session.get(video_url, stream=True, timeout=30) as video_response:
-                        video_response.raise_for_status()
-                        
-                        upload_response = session.put(
-                            upload_url,
-                            headers={'Authorization': f'Bearer {access_token}'},
-                            data=video_response.iter_content(chunk_size=8192),
-                            timeout=30
-                        )
-                        upload_response.raise_for_status()
-                
-                break  # Success - exit retry loop
-            except requests.exceptions.RequestException as e:
-                if attempt == max_retries - 1:
-                    raise
-                time.sleep(2 ** attempt)  # Exponential backoff
-        
-        # 3. Create post
-        post_payload = {
-            "author": user_id,
-            "lifecycleState": "PUBLISHED",
-            "specificContent": {
-                "com.linkedin.ugc.ShareContent": {
-                    "shareCommentary": {"text": text},
-                    "shareMediaCategory": "VIDEO",
-                    "media": [{
-                        "status": "READY",
-                        "description": {"text": text[:200]},
-                        "media": asset_urn,
-                        "title": {"text": "Shared Video"}
-                    }]
-                }
-            },
-            "visibility": {
-                "com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"
-            }
-        }
-        
-        post_response = requests.post(
-            "https://api.linkedin.com/v2/ugcPosts",
-            headers=headers,
-            data=json.dumps(post_payload),
-            timeout=10
-        )
-        post_response.raise_for_status()
-        
-        return True
-        
-    except Exception as e:
-        print(f"[LINKEDIN] Video post error: {str(e)}")
-        raise Exception(f"LinkedIn video post failed: {str(e)}") 
+async def publish_linkedin_video_post(access_token: str, user_id: str, video_url: str, text: str):
+    """Publish a video post to LinkedIn (video streamed from its URL to LinkedIn)"""
+    print("[LINKEDIN] Creating video post...")
+    return await publishing_client.linkedin_video(access_token, user_id, video_url, text)
     
     
     
@@ -3771,27 +3407,29 @@ async def upload_custom_media(
         if not cursor.fetchone():
             raise HTTPException(status_code=404, detail="Content not found")
 
-        # Save the file temporarily
-        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-            shutil.copyfileobj(file.file, temp_file)
-            temp_path = temp_file.name
+        # Save the file temporarily (removed even if the upload fails)
+        with temporary_path() as temp_path:
+            with open(temp_path, "wb") as temp_file:
+                shutil.copyfileobj(file.file, temp_file)
 
-        # Upload to Cloudinary
-        resource_type = "video" if is_video else "image"
-        public_id = f"custom_{resource_type}_{content_id}_{int(time.time())}"
-        
-        cloudinary_url = upload_image_to_cloudinary(
-            temp_path,
-            public_id=public_id,
-            resource_type=resource_type
-        )
+            # Upload to Cloudinary
+            resource_type = "video" if is_video else "image"
+            public_id = f"custom_{resource_type}_{content_id}_{int(time.time())}"
+            
+            cloudinary_url = await asyncio.to_thread(
+                upload_image_to_cloudinary,
+                temp_path,
+                public_id=public_id,
+                resource_type=resource_type
+            )
 
         # Update the content item in database
         if is_video:
-            # For videos, update both media_link and video_placeholder
+            # For videos, update both media_link and video_placeholder; the old
+            # cover frame belongs to the replaced video
             cursor.execute("""
                 UPDATE content_items 
-                SET media_link = %s, video_placeholder = %s
+                SET media_link = %s, video_placeholder = %s, cover_link = NULL
                 WHERE id = %s
             """, (cloudinary_url, cloudinary_url, content_id))
         else:
@@ -3804,9 +3442,6 @@ async def upload_custom_media(
         
         conn.commit()
 
-        # Clean up temp file
-        os.unlink(temp_path)
-
         return {"media_url": cloudinary_url}
 
     except Exception as e:
@@ -3906,30 +3541,30 @@ async def create_content_item(
         # Handle file upload if exists
         media_link = None
         if media and media.filename:
-            # Save the file temporarily
-            with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-                shutil.copyfileobj(media.file, temp_file)
-                temp_path = temp_file.name
-            
-            # Upload to Cloudinary
-            resource_type = "video" if "video" in content_type.lower() else "image"
-            public_id = f"content_{strategy_id}_{int(time.time())}"
-            
-            media_link = upload_image_to_cloudinary(
-                temp_path,
-                public_id=public_id,
-                resource_type=resource_type
-            )
-            
-            # Clean up temp file
-            os.unlink(temp_path)
+            # Save the file temporarily (removed even if the upload fails)
+            with temporary_path() as temp_path:
+                with open(temp_path, "wb") as temp_file:
+                    shutil.copyfileobj(media.file, temp_file)
+                
+                # Upload to Cloudinary
+                resource_type = "video" if "video" in content_type.lower() else "image"
+                public_id = f"content_{strategy_id}_{int(time.time())}"
+                
+                media_link = await asyncio.to_thread(
+                    upload_image_to_cloudinary,
+                    temp_path,
+                    public_id=public_id,
+                    resource_type=resource_type
+                )
         
         # Insert into database with the provided status
+        schedule = schedule_columns(best_time)
         cursor.execute("""
             INSERT INTO content_items (
                 strategy_id, company_id, user_id, platform, content_type,
-                caption, hashtags, media_link, best_time, status
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                caption, hashtags, media_link, best_time, status,
+                schedule_day, schedule_hour, schedule_minute, scheduled_at
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
             RETURNING id
         """, (
             strategy_id,
@@ -3941,7 +3576,11 @@ async def create_content_item(
             hashtags,
             media_link,
             best_time,
-            status  # Use the status from form data
+            status,  # Use the status from form data
+            schedule["schedule_day"],
+            schedule["schedule_hour"],
+            schedule["schedule_minute"],
+            schedule["scheduled_at"]
         ))
         
         content_id = cursor.fetchone()[0]
@@ -3992,25 +3631,24 @@ async def update_content_item(
         
         # Handle file upload if exists
         if media and media.filename:
-            # Save the file temporarily
-            with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-                shutil.copyfileobj(media.file, temp_file)
-                temp_path = temp_file.name
-            
-            # Upload to Cloudinary
-            resource_type = "video" if "video" in content_type.lower() else "image"
-            public_id = f"content_{content_id}_{int(time.time())}"
-            
-            media_link = upload_image_to_cloudinary(
-                temp_path,
-                public_id=public_id,
-                resource_type=resource_type
-            )
-            
-            # Clean up temp file
-            os.unlink(temp_path)
+            # Save the file temporarily (removed even if the upload fails)
+            with temporary_path() as temp_path:
+                with open(temp_path, "wb") as temp_file:
+                    shutil.copyfileobj(media.file, temp_file)
+                
+                # Upload to Cloudinary
+                resource_type = "video" if "video" in content_type.lower() else "image"
+                public_id = f"content_{content_id}_{int(time.time())}"
+                
+                media_link = await asyncio.to_thread(
+                    upload_image_to_cloudinary,
+                    temp_path,
+                    public_id=public_id,
+                    resource_type=resource_type
+                )
         
         # Update in database
+        schedule = schedule_columns(best_time)
         cursor.execute("""
             UPDATE content_items
             SET platform = %s,
@@ -4018,8 +3656,13 @@ async def update_content_item(
                 caption = %s,
                 hashtags = %s,
                 media_link = %s,
+                cover_link = CASE WHEN media_link IS DISTINCT FROM %s THEN NULL ELSE cover_link END,
                 best_time = %s,
-                status = %s
+                status = %s,
+                schedule_day = %s,
+                schedule_hour = %s,
+                schedule_minute = %s,
+                scheduled_at = %s
             WHERE id = %s
         """, (
             platform,
@@ -4027,8 +3670,13 @@ async def update_content_item(
             caption,
             hashtags,
             media_link,
+            media_link,
             best_time,
             final_status,
+            schedule["schedule_day"],
+            schedule["schedule_hour"],
+            schedule["schedule_minute"],
+            schedule["scheduled_at"],
             content_id
         ))
         
@@ -0,0 +1,117 @@
+"""
+Local stand-in for Cloudinary's upload API, for running uploads offline.
+
+Implements what components/media/upload_manager.py uses:
+    POST /v1_1/{cloud}/{resource_type}/upload   single or chunked upload
+    GET  /files/{resource_type}/{public_id}     the stored file
+
+Chunked uploads follow Cloudinary's protocol: every chunk carries the same
+X-Unique-Upload-Id and its own Content-Range; the last chunk returns the
+resource. Chunks may arrive again after a retry and are simply rewritten.
+OBJECT_STORE_STUB_FAIL_RATE (0-1, default 0) makes that share of requests
+answer 503, to exercise retries and resuming.
+
+Run from the Backend folder and point the app at it:
+    uvicorn mocks.object_store_stub:app --port 8101
+    CLOUDINARY_UPLOAD_BASE=http://localhost:8101
+"""
+import os
+import random
+import re
+import tempfile
+import threading
+import uuid
+
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import FileResponse, JSONResponse
+
+FAIL_RATE = float(os.environ.get("OBJECT_STORE_STUB_FAIL_RATE", "0"))
+CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+app = FastAPI(title="Object store stand-in")
+store_dir = tempfile.mkdtemp(prefix="object_store_stub_")
+# upload id -> {"path", "total", "received": set of (start, end)}
+partial_uploads = {}
+lock = threading.Lock()
+
+
+def stored_path(resource_type: str, public_id: str) -> str:
+    folder = os.path.join(store_dir, resource_type)
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, public_id.replace("/", "_"))
+
+
+def resource(request: Request, resource_type: str, public_id: str, path: str, file_format: str) -> dict:
+    base_url = str(request.base_url).rstrip("/")
+    return {
+        "public_id": public_id,
+        "resource_type": resource_type,
+        "format": file_format,
+        "bytes": os.path.getsize(path),
+        "secure_url": f"{base_url}/files/{resource_type}/{public_id}",
+        "done": True,
+    }
+
+
+@app.post("/v1_1/{cloud}/{resource_type}/upload")
+async def upload(
+    cloud: str,
+    resource_type: str,
+    request: Request,
+    file: UploadFile = File(...),
+    api_key: str = Form(None),
+    signature: str = Form(None),
+    public_id: str = Form(None),
+    format: str = Form(None),
+):
+    if not api_key or not signature:
+        raise HTTPException(status_code=401, detail="Missing api_key or signature")
+    if FAIL_RATE and random.random() < FAIL_RATE:
+        return JSONResponse({"error": {"message": "Injected failure"}}, status_code=503)
+
+    public_id = public_id or uuid.uuid4().hex
+    file_format = format or os.path.splitext(file.filename or "")[1].lstrip(".") or "bin"
+    data = await file.read()
+
+    upload_id = request.headers.get("X-Unique-Upload-Id")
+    content_range = request.headers.get("Content-Range")
+    if not upload_id or not content_range:
+        path = stored_path(resource_type, public_id)
+        with open(path, "wb") as out:
+            out.write(data)
+        return resource(request, resource_type, public_id, path, file_format)
+
+    match = CONTENT_RANGE.match(content_range)
+    if not match:
+        raise HTTPException(status_code=400, detail="Bad Content-Range")
+    start, end, total = (int(value) for value in match.groups())
+    if end - start + 1 != len(data):
+        raise HTTPException(status_code=400, detail="Chunk size does not match Content-Range")
+
+    with lock:
+        state = partial_uploads.setdefault(upload_id, {
+            "path": os.path.join(store_dir, f"{upload_id}.part"),
+            "total": total,
+            "received": set(),
+        })
+        mode = "r+b" if os.path.exists(state["path"]) else "wb"
+        with open(state["path"], mode) as out:
+            out.seek(start)
+            out.write(data)
+        state["received"].add((start, end))
+        received = sum(chunk_end - chunk_start + 1 for chunk_start, chunk_end in state["received"])
+        if received < total:
+            return {"done": False, "upload_id": upload_id, "bytes_received": received}
+
+        path = stored_path(resource_type, public_id)
+        os.replace(state["path"], path)
+        del partial_uploads[upload_id]
+    return resource(request, resource_type, public_id, path, file_format)
+
+
+@app.get("/files/{resource_type}/{public_id}")
+async def get_file(resource_type: str, public_id: str):
+    path = stored_path(resource_type, public_id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="File not found")
+    return FileResponse(path)
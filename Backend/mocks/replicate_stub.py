@@ -0,0 +1,120 @@
+"""
+Local stand-in for the Replicate predictions API, for running video jobs offline.
+
+Implements just what components/media/video_jobs.py uses:
+    POST /v1/models/{owner}/{name}/predictions   create a prediction
+    GET  /v1/predictions/{id}                    poll it
+    GET  /files/{id}.mp4                         the generated "video"
+
+Predictions go starting -> processing -> succeeded over REPLICATE_STUB_SECONDS
+(default 5) and produce a short synthetic clip. A prompt containing "[fail]"
+ends in "failed". When the prediction was created with a webhook, the final
+state is POSTed to it, like Replicate does.
+
+Run from the Backend folder and point the app at it:
+    uvicorn mocks.replicate_stub:app --port 8100
+    REPLICATE_API_BASE=http://localhost:8100
+"""
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+import cv2
+import numpy as np
+import requests
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse
+
+GENERATION_SECONDS = float(os.environ.get("REPLICATE_STUB_SECONDS", "5"))
+CLIP_SIZE = (720, 1280)
+CLIP_FPS = 25
+CLIP_SECONDS = 3
+
+app = FastAPI(title="Replicate stand-in")
+predictions = {}
+lock = threading.Lock()
+files_dir = tempfile.mkdtemp(prefix="replicate_stub_")
+
+
+def make_clip(path: str):
+    """Moving gradient clip, encoded like a downloaded generation"""
+    width, height = CLIP_SIZE
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), CLIP_FPS, (width, height))
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    for i in range(CLIP_FPS * CLIP_SECONDS):
+        frame[..., 0] = (x + i * 3) % 256
+        frame[..., 1] = (y + i * 2) % 256
+        frame[..., 2] = ((x + y[:, :1]) / 2 + i) % 256
+        out.write(frame)
+    out.release()
+
+
+def public(prediction: dict) -> dict:
+    return {key: value for key, value in prediction.items() if not key.startswith("_")}
+
+
+def run_prediction(prediction_id: str, base_url: str):
+    """Fake the generation, then notify the webhook if there is one"""
+    time.sleep(GENERATION_SECONDS / 2)
+    with lock:
+        predictions[prediction_id]["status"] = "processing"
+    time.sleep(GENERATION_SECONDS / 2)
+
+    prediction = predictions[prediction_id]
+    if "[fail]" in str(prediction["input"].get("prompt", "")):
+        update = {"status": "failed", "error": "Stub generation failed"}
+    else:
+        make_clip(os.path.join(files_dir, f"{prediction_id}.mp4"))
+        update = {"status": "succeeded", "output": f"{base_url}/files/{prediction_id}.mp4"}
+
+    with lock:
+        prediction.update(update, completed_at=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()))
+
+    webhook = prediction.get("_webhook")
+    if webhook:
+        try:
+            requests.post(webhook, json=public(prediction), timeout=10)
+        except Exception as e:
+            print(f"[STUB] Webhook {webhook} failed: {e}")
+
+
+@app.post("/v1/models/{owner}/{name}/predictions", status_code=201)
+async def create_prediction(owner: str, name: str, request: Request):
+    body = await request.json()
+    prediction_id = uuid.uuid4().hex[:20]
+    base_url = str(request.base_url).rstrip("/")
+    prediction = {
+        "id": prediction_id,
+        "model": f"{owner}/{name}",
+        "input": body.get("input", {}),
+        "status": "starting",
+        "output": None,
+        "error": None,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "urls": {"get": f"{base_url}/v1/predictions/{prediction_id}"},
+        "_webhook": body.get("webhook"),
+    }
+    with lock:
+        predictions[prediction_id] = prediction
+    threading.Thread(target=run_prediction, args=(prediction_id, base_url), daemon=True).start()
+    return public(prediction)
+
+
+@app.get("/v1/predictions/{prediction_id}")
+async def get_prediction(prediction_id: str):
+    prediction = predictions.get(prediction_id)
+    if not prediction:
+        raise HTTPException(status_code=404, detail="Prediction not found")
+    return public(prediction)
+
+
+@app.get("/files/{filename}")
+async def get_file(filename: str):
+    path = os.path.join(files_dir, os.path.basename(filename))
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="File not found")
+    return FileResponse(path, media_type="video/mp4")
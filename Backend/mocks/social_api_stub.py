@@ -0,0 +1,335 @@
+"""
+Local stand-in for the Meta Graph API and LinkedIn, for load-testing publishing offline.
+
+Implements what components/publishing/client.py and the insights use:
+    POST /{version}/                              Graph batch request
+    POST /{version}/{ig_user}/media               create a container
+    GET  /{version}/{container}?fields=status_code
+    POST /{version}/{ig_user}/media_publish
+    POST /{version}/{page}/feed | photos | videos
+    GET  /{version}/{id}                          account fields (fan_count, followers_count, ...)
+    GET  /{version}/{id}/insights
+    POST /linkedin/v2/assets?action=registerUpload | completeMultiPartUpload
+    PUT  /linkedin/upload/{asset}                 single and multipart uploads
+    POST /linkedin/v2/ugcPosts
+    GET  /media/{name}?bytes=N                    media to publish (N random bytes)
+
+Containers report IN_PROGRESS until they are SOCIAL_STUB_CONTAINER_SECONDS old
+(SOCIAL_STUB_REEL_SECONDS for reels), then FINISHED, and PUBLISHED once
+published; publishing a container twice is refused, as on Instagram. Every request waits
+SOCIAL_STUB_LATENCY_MS plus an exponential tail with mean
+SOCIAL_STUB_JITTER_MS; SOCIAL_STUB_ERROR_RATE (0-1) of the calls fail with
+500. With SOCIAL_STUB_RATE_LIMIT set, each access token gets that many calls
+per SOCIAL_STUB_RATE_WINDOW seconds (batch operations count one by one),
+then 429 with Graph error code 4. POST /_stub/config changes any of these
+while running, GET /_stub/stats reports what was served, POST /_stub/reset
+clears both.
+
+Run from the Backend folder and point the app at it:
+    uvicorn mocks.social_api_stub:app --port 8102
+    GRAPH_API_BASE=http://localhost:8102/v22.0
+    LINKEDIN_API_BASE=http://localhost:8102/linkedin
+"""
+import asyncio
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter, deque
+from typing import Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from fastapi import FastAPI, Query, Request, Response
+from fastapi.responses import JSONResponse
+
+DEFAULTS = {
+    "latency_ms": float(os.environ.get("SOCIAL_STUB_LATENCY_MS", "50")),
+    "jitter_ms": float(os.environ.get("SOCIAL_STUB_JITTER_MS", "20")),
+    "error_rate": float(os.environ.get("SOCIAL_STUB_ERROR_RATE", "0")),
+    "rate_limit": int(os.environ.get("SOCIAL_STUB_RATE_LIMIT", "0")),
+    "rate_window": float(os.environ.get("SOCIAL_STUB_RATE_WINDOW", "60")),
+    "container_seconds": float(os.environ.get("SOCIAL_STUB_CONTAINER_SECONDS", "1")),
+    "reel_seconds": float(os.environ.get("SOCIAL_STUB_REEL_SECONDS", "5")),
+    "part_bytes": int(os.environ.get("SOCIAL_STUB_PART_BYTES", str(4 * 1024 * 1024))),
+}
+
+app = FastAPI(title="Social API stand-in")
+config = dict(DEFAULTS)
+stats = Counter()
+ids = itertools.count(17841400000000000)
+# container id -> (created monotonic time, kind)
+containers = {}
+published_containers = set()
+# access token -> call times within the rate window
+calls_by_token = {}
+media_bodies = {}
+lock = threading.Lock()
+
+
+def next_id() -> str:
+    with lock:
+        return str(next(ids))
+
+
+async def delay():
+    seconds = config["latency_ms"] / 1000
+    if config["jitter_ms"] > 0:
+        seconds += random.expovariate(1000 / config["jitter_ms"])
+    await asyncio.sleep(seconds)
+
+
+def throttled(token: Optional[str]) -> bool:
+    """Count one call for the token; True if it is over the limit"""
+    if not config["rate_limit"] or not token:
+        return False
+    now = time.monotonic()
+    with lock:
+        window = calls_by_token.setdefault(token, deque())
+        while window and window[0] <= now - config["rate_window"]:
+            window.popleft()
+        if len(window) >= config["rate_limit"]:
+            return True
+        window.append(now)
+        return False
+
+
+def graph_error(status: int, message: str, code: int) -> Tuple[int, dict]:
+    return status, {"error": {"message": message, "type": "OAuthException", "code": code}}
+
+
+# -------- Graph API --------
+def graph_call(method: str, path: str, params: dict) -> Tuple[int, dict]:
+    """One Graph operation (a plain request or one entry of a batch) -> (status, body)"""
+    stats[f"graph {method} {path.split('/')[-1] if '/' in path else 'node'}"] += 1
+    if throttled(params.get("access_token")):
+        stats["graph 429"] += 1
+        return graph_error(429, "Application request limit reached", 4)
+    if random.random() < config["error_rate"]:
+        stats["graph 500"] += 1
+        return graph_error(500, "An unexpected error has occurred. Please retry your request later.", 2)
+    if not params.get("access_token"):
+        return graph_error(400, "An active access token must be used", 2500)
+
+    parts = [part for part in path.split("/") if part]
+    node, edge = parts[0], (parts[1] if len(parts) > 1 else None)
+
+    if method == "POST" and edge == "media":
+        container_id = next_id()
+        kind = "reel" if params.get("media_type") == "REELS" else "image"
+        with lock:
+            containers[container_id] = (time.monotonic(), kind)
+        return 200, {"id": container_id}
+    if method == "POST" and edge == "media_publish":
+        container = containers.get(params.get("creation_id", ""))
+        if not container:
+            return graph_error(400, "Invalid creation_id", 100)
+        ready = config["reel_seconds"] if container[1] == "reel" else config["container_seconds"]
+        if time.monotonic() - container[0] < ready:
+            return graph_error(400, "Media ID is not available", 9007)
+        with lock:
+            if params["creation_id"] in published_containers:
+                stats["graph republish"] += 1
+                return graph_error(400, "The media has already been published", 9007)
+            published_containers.add(params["creation_id"])
+        stats["published"] += 1
+        return 200, {"id": next_id()}
+    if method == "POST" and edge in ("feed", "photos", "videos"):
+        stats["published"] += 1
+        post_id = f"{node}_{next_id()}"
+        return 200, {"id": next_id(), "post_id": post_id} if edge == "photos" else {"id": post_id}
+    if method == "GET" and edge == "insights":
+        metrics = (params.get("metric") or "page_impressions").split(",")
+        return 200, {"data": [
+            {"name": metric, "period": params.get("period", "day"),
+             "values": [{"value": random.randint(10, 1000), "end_time": "2024-01-01T08:00:00+0000"}
+                        for _ in range(7)],
+             "total_value": {"value": random.randint(100, 10000)}}
+            for metric in metrics
+        ]}
+    if method == "GET" and edge is None:
+        if node in containers:
+            created, kind = containers[node]
+            ready = config["reel_seconds"] if kind == "reel" else config["container_seconds"]
+            if node in published_containers:
+                status_code = "PUBLISHED"
+            else:
+                status_code = "FINISHED" if time.monotonic() - created >= ready else "IN_PROGRESS"
+            return 200, {"id": node, "status_code": status_code}
+        fields = (params.get("fields") or "id").split(",")
+        body = {"id": node}
+        for field in fields:
+            if field.endswith("_count"):
+                body[field] = random.randint(100, 100000)
+            elif field not in body:
+                body[field] = f"stub {field}"
+        return 200, body
+    return graph_error(400, f"Unsupported request: {method} {path}", 100)
+
+
+async def request_params(request: Request) -> dict:
+    params = dict(request.query_params)
+    if request.method == "POST":
+        params.update((await request.form()).items())
+    return params
+
+
+@app.post("/{version}/")
+async def graph_batch(version: str, request: Request):
+    await delay()
+    params = await request_params(request)
+    stats["graph batch requests"] += 1
+    try:
+        operations = json.loads(params.get("batch") or "[]")
+    except ValueError:
+        return JSONResponse(graph_error(400, "Invalid batch", 100)[1], status_code=400)
+    if len(operations) > 50:
+        return JSONResponse(graph_error(400, "Too many requests in batch message. Maximum batch size is 50", 1)[1],
+                            status_code=400)
+
+    results = []
+    for operation in operations:
+        url = urlsplit(operation.get("relative_url", ""))
+        op_params = {"access_token": params.get("access_token"), **dict(parse_qsl(url.query))}
+        op_params.update(parse_qsl(operation.get("body") or ""))
+        status, body = graph_call(operation.get("method", "GET").upper(), url.path, op_params)
+        results.append({"code": status, "headers": [], "body": json.dumps(body)})
+    stats["graph batch operations"] += len(operations)
+    return JSONResponse(results)
+
+
+# -------- LinkedIn --------
+def linkedin_gate(request: Request) -> Optional[JSONResponse]:
+    token = request.headers.get("Authorization", "").replace("Bearer ", "")
+    if throttled(token):
+        stats["linkedin 429"] += 1
+        return JSONResponse({"status": 429, "message": "Resource level throttle limit reached"}, status_code=429)
+    if random.random() < config["error_rate"]:
+        stats["linkedin 500"] += 1
+        return JSONResponse({"status": 500, "message": "Injected failure"}, status_code=500)
+    return None
+
+
+@app.post("/linkedin/v2/assets")
+async def linkedin_assets(action: str, request: Request):
+    await delay()
+    stats[f"linkedin {action}"] += 1
+    refused = linkedin_gate(request)
+    if refused:
+        return refused
+    body = await request.json()
+    if action == "completeMultiPartUpload":
+        responses = body["completeMultipartUploadRequest"]["partUploadResponses"]
+        if not all(part.get("headers", {}).get("ETag") for part in responses):
+            return JSONResponse({"status": 400, "message": "Missing part ETag"}, status_code=400)
+        return JSONResponse({})
+    if action != "registerUpload":
+        return JSONResponse({"status": 400, "message": f"Unknown action {action}"}, status_code=400)
+
+    asset = next_id()
+    base_url = str(request.base_url).rstrip("/")
+    upload = body["registerUploadRequest"]
+    size = upload.get("fileSize")
+    if size and "MULTIPART_UPLOAD" in upload.get("supportedUploadMechanism", []):
+        part_bytes = config["part_bytes"]
+        mechanism = {"com.linkedin.digitalmedia.uploading.MultipartUpload": {
+            "metadata": f"stub-{asset}",
+            "partUploadRequests": [
+                {"url": f"{base_url}/linkedin/upload/{asset}?part={index}",
+                 "byteRange": {"firstByte": start, "lastByte": min(start + part_bytes, size) - 1},
+                 "headers": {"Content-Type": "application/octet-stream"}}
+                for index, start in enumerate(range(0, size, part_bytes))
+            ],
+        }}
+    else:
+        mechanism = {"com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest": {
+            "uploadUrl": f"{base_url}/linkedin/upload/{asset}",
+            "headers": {"media-type-family": "STILLIMAGE"},
+        }}
+    return JSONResponse({"value": {
+        "asset": f"urn:li:digitalmediaAsset:{asset}",
+        "mediaArtifact": f"urn:li:digitalmediaMediaArtifact:(urn:li:digitalmediaAsset:{asset},stub)",
+        "uploadMechanism": mechanism,
+    }})
+
+
+@app.put("/linkedin/upload/{asset}")
+async def linkedin_upload(asset: str, request: Request, part: Optional[int] = None):
+    await delay()
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+    stats["linkedin upload bytes"] += received
+    stats["linkedin upload parts" if part is not None else "linkedin uploads"] += 1
+    if random.random() < config["error_rate"]:
+        stats["linkedin 500"] += 1
+        return Response(status_code=500)
+    return Response(status_code=201 if part is None else 200, headers={"ETag": f'"{asset}-{part}"'})
+
+
+@app.post("/linkedin/v2/ugcPosts")
+async def linkedin_ugc_posts(request: Request):
+    await delay()
+    stats["linkedin ugcPosts"] += 1
+    refused = linkedin_gate(request)
+    if refused:
+        return refused
+    body = await request.json()
+    if not body.get("author", "").startswith("urn:li:person:"):
+        return JSONResponse({"status": 422, "message": "Invalid author"}, status_code=422)
+    stats["published"] += 1
+    share = f"urn:li:share:{next_id()}"
+    return JSONResponse({"id": share}, status_code=201, headers={"X-RestLi-Id": share})
+
+
+# -------- Media and control --------
+@app.get("/media/{name}")
+async def media(name: str, size: int = Query(256 * 1024, alias="bytes")):
+    with lock:
+        body = media_bodies.get(size)
+        if body is None:
+            body = media_bodies[size] = os.urandom(size)
+    stats["media downloads"] += 1
+    return Response(body, media_type="video/mp4" if name.endswith(".mp4") else "image/jpeg")
+
+
+@app.get("/_stub/stats")
+async def get_stats():
+    return {"config": config, "stats": dict(stats), "containers": len(containers)}
+
+
+@app.post("/_stub/config")
+async def set_config(request: Request):
+    changes = await request.json()
+    for key, value in changes.items():
+        if key in config:
+            config[key] = type(DEFAULTS[key])(value)
+    return config
+
+
+@app.post("/_stub/reset")
+async def reset():
+    with lock:
+        config.clear()
+        config.update(DEFAULTS)
+        stats.clear()
+        containers.clear()
+        published_containers.clear()
+        calls_by_token.clear()
+    return {"reset": True}
+
+
+# Graph node and edge routes last, so they do not shadow the routes above
+@app.api_route("/{version}/{node}", methods=["GET", "POST"])
+async def graph_node(version: str, node: str, request: Request):
+    await delay()
+    status, body = graph_call(request.method, node, await request_params(request))
+    return JSONResponse(body, status_code=status)
+
+
+@app.api_route("/{version}/{node}/{edge}", methods=["GET", "POST"])
+async def graph_edge(version: str, node: str, edge: str, request: Request):
+    await delay()
+    status, body = graph_call(request.method, f"{node}/{edge}", await request_params(request))
+    return JSONResponse(body, status_code=status)